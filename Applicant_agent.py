@@ -1,83 +1,43 @@
 from dotenv import load_dotenv
 import os
-import openai
-from autogen_ext.models.openai import AzureOpenAIChatCompletionClient
-from PyPDF2 import PdfReader
+import time
 import gradio as gr
-import asyncio
-from pydantic import BaseModel
 from openai import OpenAI
-import json
-import re
-from typing import List, Dict, Optional
 
-load_dotenv()  # Load environment variables from .env file
-
-def set_env():
-    api_key = os.getenv("AZURE_OPENAI_API_KEY")
-    deployment = os.getenv("AZURE_OPENAI_DEPLOYMENT_NAME")
-    api_version = os.getenv("AZURE_OPENAI_API_VERSION")
-    endpoint = os.getenv("AZURE_OPENAI_ENDPOINT")
-    model = os.getenv("AZURE_OPENAI_MODEL")
-
-    # Create the Azure OpenAI client
-    az_model_client = AzureOpenAIChatCompletionClient(
-        azure_deployment=deployment,
-        model=model,
-        api_version=api_version,
-        azure_endpoint=endpoint,
-        api_key=api_key,
-    )
-    client = openai.AzureOpenAI(
-        api_version=api_version,
-        api_key=api_key,
-        azure_endpoint=endpoint
-    )
- 
-    return az_model_client, client
-
-def read_pdf(file_path):
-    """Extract text from PDF file"""
-    try:
-        reader = PdfReader(file_path)
-        text = ""
-        for page in reader.pages:
-            text += page.extract_text() + "\n"
-        return text
-    except Exception as e:
-        return f"Error reading PDF: {str(e)}"
+from metrics import instrument_event, record_span, start_http_server
 
-def extract_name_from_resume(resume_text):
-    """Extract name from resume text using simple heuristics"""
-    try:
-        lines = resume_text.strip().split('\n')
-        # Usually the name is in the first few lines
-        for line in lines[:5]:
-            line = line.strip()
-            if len(line) > 2 and len(line) < 50:
-                # Check if it looks like a name (not email, phone, address)
-                if not any(char in line for char in ['@', '.com', '+', 'www', 'http']):
-                    if not line.isupper() and not line.islower():  # Mixed case suggests name
-                        return line
-        return "Candidate"  # Default if can't extract
-    except:
-        return "Candidate"
+# Shared logic lives in the import-light core
+from recruiter_core import (
+    set_env,
+    get_context_manager,
+    read_pdf,
+    extract_name_from_resume,
+    parse_pdf_document,
+    ATSAnalysis,
+    InterviewEvaluation,
+    calculate_ats_score,
+    set_interviewer_prompt,
+    set_candidate_prompt,
+    get_job_registry,
+    candidate_context,
+    stream_chat_completion
+)
 
-class ATSAnalysis(BaseModel):
-    ats_score: int  # 0-100
-    keyword_matches: List[str]
-    missing_keywords: List[str]
-    recommendations: List[str]
-    strengths: List[str]
-    weaknesses: List[str]
+# Names this module defined before the core was split out; still importable from here for existing callers
+__all__ = [
+    'set_env',
+    'read_pdf',
+    'extract_name_from_resume',
+    'ATSAnalysis',
+    'InterviewEvaluation',
+    'calculate_ats_score',
+    'set_interviewer_prompt',
+    'set_candidate_prompt'
+]
 
-class InterviewEvaluation(BaseModel):
-    is_acceptable: bool
-    feedback: str
-    professionalism_score: int  # 1-10
-    relevance_score: int  # 1-10
+load_dotenv()  # Load environment variables from .env file
 
-# Global state management
+# Per-session state; every Gradio session gets its own copy through gr.State
 class GlobalState:
     def __init__(self):
         self.reset()
@@ -86,146 +46,25 @@ class GlobalState:
         self.current_mode = "job_seeker"
         self.candidate_name = "Candidate"
         self.resume_text = ""
+        self.candidate_profile = None
         self.cover_letter_text = ""
         self.job_description = ""
         self.ats_analysis_result = None
         self.chat_history = []
 
-# Create global state instance
-app_state = GlobalState()
-
-def calculate_ats_score(resume_text: str, job_description: str, client) -> ATSAnalysis:
-    """Calculate ATS score by comparing resume with job description"""
-    
-    ats_prompt = f"""
-    You are an ATS (Applicant Tracking System) analyzer. Analyze the following resume against the job description and provide a comprehensive evaluation.
-
-    JOB DESCRIPTION:
-    {job_description}
-
-    RESUME:
-    {resume_text}
-
-    Please analyze and provide:
-    1. ATS Score (0-100) based on keyword matching, relevance, and formatting
-    2. Keywords that match between resume and job description
-    3. Important keywords missing from the resume
-    4. Specific recommendations to improve ATS score
-    5. Key strengths of the resume for this position
-    6. Areas of weakness or improvement
-
-    Consider factors like:
-    - Keyword density and relevance
-    - Skills alignment
-    - Experience relevance
-    - Education requirements
-    - Technical skills match
-    - Industry-specific terms
-    """
-    
-    try:
-        messages = [{"role": "system", "content": ats_prompt}]
-        
-        response = client.chat.completions.create(
-            model=os.getenv("AZURE_OPENAI_DEPLOYMENT_NAME"),
-            messages=messages
-        )
-        
-        # Parse the response manually since we can't use structured output reliably
-        content = response.choices[0].message.content
-        
-        # Extract score (simple regex)
-        score_match = re.search(r'(\d+)/100|(\d+)%|Score[:\s]*(\d+)', content, re.IGNORECASE)
-        ats_score = 50  # default
-        if score_match:
-            ats_score = int(score_match.group(1) or score_match.group(2) or score_match.group(3))
-        
-        return ATSAnalysis(
-            ats_score=ats_score,
-            keyword_matches=["Skills analysis completed"],
-            missing_keywords=["Detailed in analysis"],
-            recommendations=[content[:500] + "..." if len(content) > 500 else content],
-            strengths=["Resume processed successfully"],
-            weaknesses=["See detailed analysis"]
-        )
-        
-    except Exception as e:
-        return ATSAnalysis(
-            ats_score=0,
-            keyword_matches=[],
-            missing_keywords=[],
-            recommendations=[f"Error in analysis: {str(e)}"],
-            strengths=[],
-            weaknesses=["Could not perform analysis"]
-        )
-
-def set_interviewer_prompt(candidate_name: str, resume_text: str, job_description: str, cover_letter: str = ""):
-    """Set system prompt for job seeker mode - AI acts as interviewer"""
-    system_prompt = f"""You are a professional HR interviewer conducting an interview with {candidate_name}. 
-    You are interviewing them for the position described in the job description below.
-    
-    Your role as the interviewer:
-    - Ask relevant, thoughtful questions based on the job requirements
-    - Evaluate the candidate's experience against the role requirements
-    - Ask behavioral questions (STAR method)
-    - Probe into specific experiences mentioned in their resume
-    - Ask technical questions relevant to the role
-    - Be professional, friendly, and thorough
-    - Follow up on answers with deeper questions
-    - Ask about motivation, career goals, and cultural fit
-    
-    Interview Guidelines:
-    - Start with a warm introduction and overview of the role
-    - Ask one question at a time
-    - Build questions based on their resume and the job requirements
-    - Include a mix of: experience questions, technical questions, behavioral questions, and situational questions
-    - Be encouraging but thorough in your evaluation
-    - End with asking if they have questions for you
-    
-    ## Job Description (Role you're hiring for):
-    {job_description}
-    
-    ## Candidate's Resume:
-    {resume_text}
-    
-    {f"## Candidate's Cover Letter: {cover_letter}" if cover_letter else ""}
-    
-    Conduct a professional interview, asking questions that help evaluate {candidate_name}'s fit for this specific role. 
-    Make your questions specific to their background and the job requirements.
-    """
-    return system_prompt
-
-def set_candidate_prompt(candidate_name: str, resume_text: str, job_description: str, cover_letter: str = ""):
-    """Set system prompt for HR/recruiter mode - AI acts as the candidate"""
-    system_prompt = f"""You are {candidate_name}, a job candidate being interviewed for a position. 
-    The person talking to you is an HR recruiter or hiring manager interviewing you for the role.
-    
-    Your approach as the candidate:
-    - Be professional, confident, and enthusiastic about the opportunity
-    - Answer questions based on the experiences in your resume
-    - Provide specific examples and stories from your background
-    - Show genuine interest in the role and company
-    - Ask thoughtful questions when appropriate
-    - Be honest about your strengths and acknowledge areas for growth
-    - Use the STAR method (Situation, Task, Action, Result) for behavioral questions
-    
-    ## Job Description (Position you're applying for):
-    {job_description}
-    
-    ## Your Background (Resume):
-    {resume_text}
-    
-    {f"## Your Cover Letter: {cover_letter}" if cover_letter else ""}
-    
-    The interviewer may ask about your experience, motivations, technical skills, or behavioral questions. 
-    Respond authentically as {candidate_name} would, using specific examples from your resume and showing 
-    genuine enthusiasm for the opportunity.
-    """
-    return system_prompt
+# Gradio queue limits: chat replies stream for seconds, ATS scoring is heavier and rarer
+CHAT_CONCURRENCY = int(os.getenv("GRADIO_CHAT_CONCURRENCY", 32))
+ATS_CONCURRENCY = int(os.getenv("GRADIO_ATS_CONCURRENCY", 4))
+UPLOAD_CONCURRENCY = int(os.getenv("GRADIO_UPLOAD_CONCURRENCY", 8))
+DEFAULT_CONCURRENCY = int(os.getenv("GRADIO_DEFAULT_CONCURRENCY", 16))
+QUEUE_MAX_SIZE = int(os.getenv("GRADIO_QUEUE_MAX_SIZE", 256))
 
 # Initialize Azure OpenAI client
 az_model_client, client = set_env()
 
+# Keeps per-turn prompts within CONTEXT_TOKEN_BUDGET by summarizing older turns
+context_manager = get_context_manager()
+
 # Initialize Gemini client for evaluation (optional)
 try:
     gemini = OpenAI(
@@ -235,40 +74,50 @@ try:
 except:
     gemini = client  # Fallback to Azure OpenAI
 
-def process_resume_pdf(pdf_file):
+@instrument_event('process_resume_pdf')
+def process_resume_pdf(pdf_file, app_state):
     """Process uploaded PDF resume"""
     if pdf_file is None:
         return "❌ No file uploaded.", "", ""
     
     try:
-        resume_text = read_pdf(pdf_file.name)
+        with open(pdf_file.name, "rb") as f:
+            document = parse_pdf_document(f.read())
+        resume_text = document['text']
         app_state.resume_text = resume_text
-        app_state.candidate_name = extract_name_from_resume(resume_text)
+        app_state.candidate_name = document['candidate_name']
+        app_state.candidate_profile = document['profile']
         
         preview = resume_text[:300] + "..." if len(resume_text) > 300 else resume_text
         return f"✅ Resume uploaded! Name detected: {app_state.candidate_name}", preview, app_state.candidate_name
     except Exception as e:
         return f"❌ Error processing PDF: {str(e)}", "", ""
 
-def process_cover_letter_pdf(pdf_file):
+@instrument_event('process_cover_letter_pdf')
+def process_cover_letter_pdf(pdf_file, app_state):
     """Process uploaded PDF cover letter"""
     if pdf_file is None:
         app_state.cover_letter_text = ""
         return "No cover letter uploaded."
     
     try:
-        cover_letter_text = read_pdf(pdf_file.name)
+        with open(pdf_file.name, "rb") as f:
+            cover_letter_text = parse_pdf_document(f.read())['text']
         app_state.cover_letter_text = cover_letter_text
         return f"✅ Cover letter uploaded! ({len(cover_letter_text)} characters)"
     except Exception as e:
         return f"❌ Error processing cover letter PDF: {str(e)}"
 
-def update_job_description(job_desc):
+@instrument_event('update_job_description')
+def update_job_description(job_desc, app_state):
     """Update job description"""
     app_state.job_description = job_desc
+    if job_desc.strip():
+        get_job_registry().register(job_desc)
     return "✅ Job description updated!" if job_desc.strip() else "⚠️ Job description cleared"
 
-def switch_mode(new_mode):
+@instrument_event('switch_mode')
+def switch_mode(new_mode, app_state):
     """Switch between job seeker and HR recruiter modes"""
     # Store current state
     previous_resume = app_state.resume_text
@@ -291,7 +140,8 @@ def switch_mode(new_mode):
     else:
         return "🔄 Switched to HR Recruiter Mode: I'll act as the candidate you're interviewing", []
 
-def get_ats_analysis():
+@instrument_event('get_ats_analysis')
+def get_ats_analysis(app_state):
     """Get ATS analysis for uploaded resume and job description"""
     if not app_state.job_description.strip():
         return "❌ Please enter a job description first."
@@ -303,7 +153,8 @@ def get_ats_analysis():
         app_state.ats_analysis_result = calculate_ats_score(
             app_state.resume_text, 
             app_state.job_description, 
-            client
+            client,
+            profile=app_state.candidate_profile
         )
         
         result = f"""# 📊 ATS Analysis Results for {app_state.candidate_name}
@@ -316,6 +167,12 @@ def get_ats_analysis():
 ### 💡 **Key Recommendations:**
 {chr(10).join('• ' + rec for rec in app_state.ats_analysis_result.recommendations[1:]) if len(app_state.ats_analysis_result.recommendations) > 1 else '• Review the detailed analysis above'}
 
+### ✅ **Matching Keywords:**
+{', '.join(app_state.ats_analysis_result.keyword_matches) or 'None found'}
+
+### ❌ **Missing Keywords:**
+{', '.join(app_state.ats_analysis_result.missing_keywords) or 'None'}
+
 ---
 *This analysis compares the resume against the job description for keyword matching, skills alignment, and overall relevance.*
         """
@@ -323,51 +180,66 @@ def get_ats_analysis():
     except Exception as e:
         return f"❌ Error performing ATS analysis: {str(e)}"
 
-def chat_interface(message, history):
-    """Main chat interface function"""
+@instrument_event('chat_interface')
+def chat_interface(message, history, app_state, request: gr.Request = None):
+    """Main chat interface function, streaming the reply as it is generated"""
+    conversation_id = f"gradio:{request.session_hash}" if request and request.session_hash else None
     
     # Check if we have the necessary information
     if not app_state.resume_text.strip():
-        return "⚠️ Please upload a resume first before starting the conversation."
+        yield "⚠️ Please upload a resume first before starting the conversation."
+        return
     
     # Set system prompt based on current mode
+    prompt_started = time.perf_counter()
     if app_state.current_mode == "job_seeker":
         # AI acts as interviewer, user is the job seeker
         if not app_state.job_description.strip():
-            return "⚠️ Please provide a job description first so I can conduct a proper interview."
+            yield "⚠️ Please provide a job description first so I can conduct a proper interview."
+            return
         
+        resume_text, cover_letter, profile = candidate_context(
+            app_state.resume_text, app_state.cover_letter_text, app_state.job_description, message,
+            app_state.candidate_profile
+        )
         system_prompt = set_interviewer_prompt(
             app_state.candidate_name, 
-            app_state.resume_text, 
+            resume_text, 
             app_state.job_description,
-            app_state.cover_letter_text
+            cover_letter,
+            profile
         )
             
     else:  # hr_recruiter mode
         # AI acts as the candidate, user is the recruiter
         if not app_state.job_description.strip():
-            return "⚠️ Please provide a job description first so I know what role I'm interviewing for."
+            yield "⚠️ Please provide a job description first so I know what role I'm interviewing for."
+            return
         
+        resume_text, cover_letter, profile = candidate_context(
+            app_state.resume_text, app_state.cover_letter_text, app_state.job_description, message,
+            app_state.candidate_profile
+        )
         system_prompt = set_candidate_prompt(
             app_state.candidate_name,
-            app_state.resume_text,
+            resume_text,
             app_state.job_description,
-            app_state.cover_letter_text
+            cover_letter,
+            profile
         )
     
     # Generate response
-    messages = [{"role": "system", "content": system_prompt}] + history + [{"role": "user", "content": message}]
+    messages = context_manager.build_messages(system_prompt, history, message, conversation_id=conversation_id)
+    record_span('prompt_build', time.perf_counter() - prompt_started, route='chat')
     
+    partial = ""
     try:
-        response = client.chat.completions.create(
-            model=os.getenv("AZURE_OPENAI_DEPLOYMENT_NAME"),
-            messages=messages
-        )
-        
-        return response.choices[0].message.content
+        for delta in stream_chat_completion(client, messages):
+            partial += delta
+            yield partial
         
     except Exception as e:
-        return f"❌ I apologize, but I encountered an error: {str(e)}"
+        yield f"{partial}\n\n❌ I apologize, but I encountered an error: {str(e)}"
 
 def create_interface():
     """Create the Gradio interface with improved layout"""
@@ -402,6 +274,9 @@ def create_interface():
     """
     
     with gr.Blocks(title="🎯 AI Recruitment Assistant", theme=gr.themes.Soft(), css=custom_css) as interface:
+        # Resume, JD and mode are kept per browser session, so concurrent users don't overwrite each other
+        session_state = gr.State(GlobalState())
+        
         
         # Header
         with gr.Row():
@@ -524,6 +399,8 @@ def create_interface():
                 
                 chat_interface_component = gr.ChatInterface(
                     fn=chat_interface,
+                    additional_inputs=[session_state],
+                    concurrency_limit=CHAT_CONCURRENCY,
                     chatbot=gr.Chatbot(
                         label="Interview Session",
                         height=600,
@@ -539,8 +416,8 @@ def create_interface():
                 ats_result = gr.Markdown("📋 Upload resume and job description, then click 'Analyze' for ATS insights")
         
         # Event Handlers
-        def on_mode_change(new_mode):
-            status, cleared_history = switch_mode(new_mode)
+        def on_mode_change(new_mode, app_state):
+            status, cleared_history = switch_mode(new_mode, app_state)
             
             if new_mode == "job_seeker":
                 mode_description = "🧑‍💼 **Job Seeker Mode Active:** Upload your resume and JD, then I'll interview you"
@@ -556,11 +433,12 @@ def create_interface():
                 "⚠️ No job description provided",
                 "No cover letter uploaded",
                 "📋 Upload resume and job description, then click 'Analyze' for ATS insights",
-                gr.update(visible=False)
+                gr.update(visible=False),
+                app_state
             )
         
-        def on_resume_upload(file):
-            status, preview, name = process_resume_pdf(file)
+        def on_resume_upload(file, app_state):
+            status, preview, name = process_resume_pdf(file, app_state)
             
             # Update overall status
             if app_state.resume_text and app_state.job_description:
@@ -578,15 +456,16 @@ def create_interface():
                 preview, 
                 gr.update(visible=bool(preview.strip())), 
                 name,
-                overall_status_text
+                overall_status_text,
+                app_state
             )
         
-        def on_cover_letter_upload(file):
-            status = process_cover_letter_pdf(file)
-            return status
+        def on_cover_letter_upload(file, app_state):
+            status = process_cover_letter_pdf(file, app_state)
+            return status, app_state
         
-        def on_job_desc_change(text):
-            status = update_job_description(text)
+        def on_job_desc_change(text, app_state):
+            status = update_job_description(text, app_state)
             
             # Update overall status
             if app_state.resume_text and app_state.job_description:
@@ -596,15 +475,15 @@ def create_interface():
             else:
                 overall_status_text = "⚠️ Job description cleared"
             
-            return status, overall_status_text
+            return status, overall_status_text, app_state
         
-        def on_ats_click():
-            return get_ats_analysis()
+        def on_ats_click(app_state):
+            return get_ats_analysis(app_state), app_state
         
         # Connect Events
         mode_selector.change(
             fn=on_mode_change,
-            inputs=[mode_selector],
+            inputs=[mode_selector, session_state],
             outputs=[
                 mode_status,
                 candidate_name_display,
@@ -612,42 +491,56 @@ def create_interface():
                 job_status,
                 cover_letter_status,
                 ats_result,
-                resume_preview
+                resume_preview,
+                session_state
             ]
         )
         
         resume_file.upload(
             fn=on_resume_upload,
-            inputs=[resume_file],
+            inputs=[resume_file, session_state],
             outputs=[
                 mode_status,  # Using mode_status as a proxy for resume status
                 resume_preview, 
                 resume_preview, 
                 candidate_name_display,
-                overall_status
-            ]
+                overall_status,
+                session_state
+            ],
+            concurrency_limit=UPLOAD_CONCURRENCY,
+            concurrency_id="uploads"
         )
         
         cover_letter_file.upload(
             fn=on_cover_letter_upload,
-            inputs=[cover_letter_file],
-            outputs=[cover_letter_status]
+            inputs=[cover_letter_file, session_state],
+            outputs=[cover_letter_status, session_state],
+            concurrency_limit=UPLOAD_CONCURRENCY,
+            concurrency_id="uploads"
         )
         
         job_desc_input.change(
             fn=on_job_desc_change,
-            inputs=[job_desc_input],
-            outputs=[job_status, overall_status]
+            inputs=[job_desc_input, session_state],
+            outputs=[job_status, overall_status, session_state]
         )
         
         ats_button.click(
             fn=on_ats_click,
-            outputs=[ats_result]
+            inputs=[session_state],
+            outputs=[ats_result, session_state],
+            concurrency_limit=ATS_CONCURRENCY,
+            concurrency_id="ats"
         )
     
     return interface
 
 # Launch the interface
 if __name__ == "__main__":
+    if os.getenv("METRICS_PORT"):
+        start_http_server(int(os.getenv("METRICS_PORT")))
     interface = create_interface()
-    interface.queue().launch(share=True, debug=True)
\ No newline at end of file
+    interface.queue(
+        default_concurrency_limit=DEFAULT_CONCURRENCY,
+        max_size=QUEUE_MAX_SIZE
+    ).launch(share=True, debug=True)
\ No newline at end of file
@@ -7,10 +7,30 @@ import gradio as gr
 import asyncio
 from pydantic import BaseModel
 from openai import OpenAI
+import time
+import logging
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+from metrics import FALLBACKS
+from reply_evaluator import TieredEvaluator
 
 load_dotenv()  # Load environment variables from .env file
 serper_api_key = os.getenv("SERPER_API_KEY")
 
+logger = logging.getLogger(__name__)
+
+# Pipelined quality control: the evaluator runs on the reply while it streams, the verdict is awaited
+# for a bounded time once it has streamed, and a rejected reply is replaced within the same turn
+PIPELINED_QC = os.getenv("INTERVIEWEE_PIPELINED_QC", "true").lower() in ("1", "true", "yes")
+MAX_RERUNS = int(os.getenv("INTERVIEWEE_MAX_RERUNS", 1))
+GENERATION_TIMEOUT = float(os.getenv("INTERVIEWEE_GENERATION_TIMEOUT", 60))
+EVALUATION_TIMEOUT = float(os.getenv("INTERVIEWEE_EVALUATION_TIMEOUT", 15))
+# Full evaluations started on the partial reply, one at a time, from its first complete sentence
+SPECULATIVE_EVALUATIONS = int(os.getenv("INTERVIEWEE_SPECULATIVE_EVALUATIONS", 3))
+SENTENCE_END_RE = re.compile(r"[.!?][\"')\]]*\s*$|\n\s*$")
+CORRECTION_NOTICE = "_(Revised answer)_"
+
 def set_env():
     api_key = os.getenv("AZURE_OPENAI_API_KEY")
     deployment = os.getenv("AZURE_OPENAI_DEPLOYMENT_NAME")
@@ -100,6 +120,132 @@ def rerun(reply, message, history, feedback):
     response = openai.chat.completions.create(model="gpt-4o-mini", messages=messages)
     return response.choices[0].message.content
 
+def rerun_messages(reply, message, history, feedback):
+    updated_system_prompt = system_prompt + "\n\n## Previous answer rejected\nYou just tried to reply, but the quality control rejected your reply\n"
+    updated_system_prompt += f"## Your attempted answer:\n{reply}\n\n"
+    updated_system_prompt += f"## Reason for rejection:\n{feedback}\n\n"
+    return [{"role": "system", "content": updated_system_prompt}] + history + [{"role": "user", "content": message}]
+
+def judge_reply(reply, message, history):
+    messages = [{"role": "system", "content": evaluate_prompt}] + [{"role": "user", "content": evaluator_user_prompt(reply, message, history)}]
+    feedback = gemini.with_options(timeout=EVALUATION_TIMEOUT).beta.chat.completions.parse(
+        model="gemini-2.0-flash", messages=messages, response_format=Evaluation
+    )
+    return feedback.choices[0].message.parsed
+
+# Local checks settle most replies; uncertain ones and an EVAL_SAMPLE_RATE sample go to Gemini
+tiered_evaluator = TieredEvaluator(name, f"{summary}\n{linkedin}", judge_reply)
+
+def evaluate(reply, message, history):
+    verdict = tiered_evaluator.evaluate(reply, message, history)
+    logger.debug("Evaluation (%s): %s %s", verdict.tier, verdict.feedback, tiered_evaluator.stats())
+    return verdict
+
+def stream_reply(messages, timeout=GENERATION_TIMEOUT):
+    """Yield reply deltas, giving up once the whole generation has taken longer than timeout"""
+    deadline = time.monotonic() + timeout
+    stream = client.with_options(timeout=timeout).chat.completions.create(
+        model=os.getenv("AZURE_OPENAI_DEPLOYMENT_NAME"),
+        messages=messages,
+        stream=True
+    )
+    try:
+        for chunk in stream:
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"generation took longer than {timeout:.0f}s")
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+    finally:
+        stream.close()
+
+# Evaluations run here so the turn can stop waiting after EVALUATION_TIMEOUT
+evaluation_pool = ThreadPoolExecutor(max_workers=int(os.getenv("INTERVIEWEE_EVALUATION_WORKERS", 8)))
+
+def review_reply(reply, message, history, future=None):
+    """Feedback if quality control rejects the reply; None if it is accepted or no verdict arrives in time
+
+    Pass the future of an evaluation of this exact reply that is already running to reuse it.
+    """
+    future = future or evaluation_pool.submit(evaluate, reply, message, history)
+    try:
+        verdict = future.result(timeout=EVALUATION_TIMEOUT)
+    except Exception as e:
+        FALLBACKS.inc(step='interviewee_evaluation')
+        logger.warning("Evaluation skipped, keeping the reply: %s", str(e) or "timed out")
+        return None
+    return None if verdict.is_acceptable else verdict.feedback
+
+class SpeculativeReview:
+    """Full evaluations of a reply started while it is still streaming
+
+    At each sentence boundary, if no evaluation is running, the reply so far is submitted to
+    the evaluator pool (at most SPECULATIVE_EVALUATIONS times). A reply usually ends on a
+    sentence boundary, so the last one submitted often covers the finished reply and the
+    judge's latency overlaps generation instead of following it. Verdicts on a shorter
+    prefix are not used; they only warm the evaluator's cache.
+    """
+
+    def __init__(self, message, history):
+        self.message = message
+        self.history = history
+        self.futures = {}
+        self.running = None
+
+    def observe(self, reply):
+        if len(self.futures) >= SPECULATIVE_EVALUATIONS or not SENTENCE_END_RE.search(reply):
+            return
+        if self.running is not None and not self.running.done():
+            return
+        self.running = self.futures[reply] = evaluation_pool.submit(evaluate, reply, self.message, self.history)
+
+    def feedback(self, reply):
+        return review_reply(reply, self.message, self.history, self.futures.get(reply))
+
+def chat_pipelined(message, history):
+    """Stream the reply while quality control runs on it, replacing a rejected reply in the same turn
+
+    The local checks run on every delta and cut the reply off as soon as it breaks
+    character; the full evaluation is started on the partial reply (see SpeculativeReview).
+    Once the reply has streamed, its verdict is awaited for at most EVALUATION_TIMEOUT. A
+    rejected reply is overwritten by a rerun that carries the evaluator's feedback (at most
+    MAX_RERUNS times). An evaluator error or timeout keeps the reply as it is.
+    """
+    messages = [{"role": "system", "content": system_prompt}] + history + [{"role": "user", "content": message}]
+    prefix = ""
+    for attempt in range(MAX_RERUNS + 1):
+        checked = attempt < MAX_RERUNS
+        review = SpeculativeReview(message, history)
+        reply = ""
+        feedback = None
+        deltas = stream_reply(messages)
+        try:
+            for delta in deltas:
+                reply += delta
+                yield prefix + reply
+                if not checked:
+                    continue
+                feedback = tiered_evaluator.early_rejection(reply)
+                if feedback:
+                    break
+                review.observe(reply)
+        except Exception as e:
+            FALLBACKS.inc(step='interviewee_generation')
+            logger.warning("Generation failed: %s", e)
+            yield f"{prefix}{reply}\n\n(Sorry, I couldn't finish that answer: {e})"
+            return
+        finally:
+            deltas.close()
+        if not checked:
+            return
+        feedback = feedback or review.feedback(reply)
+        if feedback is None:
+            return
+        logger.info("Reply rejected: %s", feedback)
+        # Withdraw the rejected reply right away; the rerun streams in its place
+        prefix = f"{CORRECTION_NOTICE}\n\n"
+        yield prefix
+        messages = rerun_messages(reply, message, history, feedback)
+
 def chat(message, history):
     messages = [{"role": "system", "content": system_prompt}] + history + [{"role": "user", "content": message}]
     response = client.chat.completions.create(
@@ -107,14 +253,12 @@ def chat(message, history):
         messages=messages
     )
     print("Response:", response.choices[0].message.content)
-    messages = [{"role": "system", "content": evaluate_prompt}] + [{"role": "user", "content": evaluator_user_prompt(response, message, history)}]
-    feedback = gemini.beta.chat.completions.parse(model="gemini-2.0-flash", messages=messages, response_format=Evaluation)
-    print("\n Evaluation:", feedback.choices[0].message.parsed)
-    if not feedback.choices[0].message.parsed.is_acceptable:
-        return rerun(response.choices[0].message.content, message, history, feedback.choices[0].message.parsed.feedback)
+    evaluation = evaluate(response.choices[0].message.content, message, history)
+    if not evaluation.is_acceptable:
+        return rerun(response.choices[0].message.content, message, history, evaluation.feedback)
     return response.choices[0].message.content
 
 ######################################Gemini Evaluator#########################################
 # chat("Hello, can you tell me about your background?", [])
 
-gr.ChatInterface(chat, type="messages").queue().launch()
+gr.ChatInterface(chat_pipelined if PIPELINED_QC else chat, type="messages").queue().launch()
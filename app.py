@@ -1,18 +1,35 @@
-from flask import Flask, request, jsonify, render_template, session
+from flask import Flask, Request, request, jsonify, render_template, session, Response, stream_with_context, g
 from flask_cors import CORS
 import uuid
+import io
 import os
+import time
 
-# Import all functions from your existing file
-# Replace 'your_existing_file' with the actual name of your original Python file
+from session_store import create_session_store
+from interview import build_chat_messages, append_chat_turn, sse_event
+from batch_screen import batch_slots, iter_zip_pdfs, screen_candidates, stream_results
+from candidate_index import CandidateIndex, IndexLocked
+from cache import content_hash
+from llm_scheduler import scheduler, BATCH
+from resilience import CircuitOpenError, guarded_call, stats as resilience_stats
+from metrics import (
+    CONTENT_TYPE as METRICS_CONTENT_TYPE, begin_request, end_request, render as render_metrics, request_spans, server_timing
+)
+from profiler import discard_profile, finish_profile, start_profile
+
+# Import the shared logic from the import-light core (no Gradio or autogen)
 try:
-    from Applicant_agent import (
-        set_env,
-        read_pdf,
-        extract_name_from_resume,
+    from recruiter_core import (
+        get_client,
+        singleton,
+        parse_pdf_document,
         calculate_ats_score,
-        set_interviewer_prompt,
-        set_candidate_prompt,
+        get_ats_cache,
+        get_job_registry,
+        get_document_cache,
+        stream_chat_completion,
+        record_usage,
+        prompt_cache_stats,
         ATSAnalysis
     )
 except ImportError:
@@ -21,32 +38,98 @@ except ImportError:
     print("from recruitment_assistant import (...)")
     raise
 
+BATCH_ROUTE = '/api/batch-ats'
+
+class InMemoryUploadRequest(Request):
+    """Keep multipart file parts in memory instead of spooling large ones to a temp file"""
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        if self.path == BATCH_ROUTE:
+            # Batch archives can be large; let werkzeug spool them
+            return super()._get_file_stream(total_content_length, content_type, filename, content_length)
+        return io.BytesIO()
+
+    @property
+    def max_content_length(self):
+        if self.path == BATCH_ROUTE:
+            return int(os.getenv('MAX_BATCH_UPLOAD_MB', 500)) * 1024 * 1024
+        return int(os.getenv('MAX_UPLOAD_MB', 10)) * 1024 * 1024
+
 app = Flask(__name__)
+app.request_class = InMemoryUploadRequest
 app.secret_key = os.getenv('SECRET_KEY', 'your-secret-key-here')
 CORS(app)
 
-# Configure upload folder
-UPLOAD_FOLDER = 'uploads'
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
+# The Azure OpenAI client is created lazily, once per worker process, by get_client()
+
+# Persistent BM25 index of every resume added through /api/candidates. It is opened on first use
+# by the one worker allowed to write it (see candidate_index.py); other workers answer 503.
+def get_candidate_index():
+    return singleton('candidate_index', lambda: CandidateIndex(
+        os.getenv('CANDIDATE_INDEX_DIR', 'data/candidate_index'),
+        autosave_every=int(os.getenv('CANDIDATE_INDEX_AUTOSAVE_EVERY', 1000))
+    ))
 
-# Initialize Azure OpenAI client using your existing function
-az_model_client, client = set_env()
+@app.errorhandler(IndexLocked)
+def candidate_index_locked(e):
+    return jsonify({'error': 'The candidate index is served by another worker process'}), 503
+
+# Server-side session storage; the cookie only holds the session id. Opened on first use so
+# each worker gets its own SQLite connection
+def get_session_store():
+    return singleton('session_store', create_session_store)
 
 # Initialize session variables
 def init_session():
-    if 'current_mode' not in session:
-        session['current_mode'] = "job_seeker"
-    if 'candidate_name' not in session:
-        session['candidate_name'] = "Candidate"
-    if 'resume_text' not in session:
-        session['resume_text'] = ""
-    if 'cover_letter_text' not in session:
-        session['cover_letter_text'] = ""
-    if 'job_description' not in session:
-        session['job_description'] = ""
-    if 'chat_history' not in session:
-        session['chat_history'] = []
+    if 'sid' not in session:
+        session['sid'] = uuid.uuid4().hex
+    return get_session_store().load(session['sid'])
+
+def save_session(state):
+    get_session_store().save(session['sid'], state)
+
+@app.before_request
+def start_request_timer():
+    g.request_started = begin_request()
+    g.profile = start_profile()
+
+@app.after_request
+def record_request_metrics(response):
+    """Observe the request latency and list its spans in a Server-Timing header
+
+    A streamed body (e.g. the SSE chat stream) is generated after this hook
+    returns, so its latency, spans and profile are recorded when the server
+    closes the response; its Server-Timing header can only list the spans
+    recorded before the stream started.
+    """
+    if 'request_started' not in g:
+        return response
+    started = g.request_started
+    endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+    method, status = request.method, response.status_code
+    profile = g.pop('profile', None)
+    spans = request_spans() or []
+    if spans:
+        response.headers['Server-Timing'] = server_timing(spans)
+
+    def finish(**info):
+        duration = time.perf_counter() - started
+        end_request(started, endpoint, method, status, spans)
+        finish_profile(profile, f"{method} {endpoint}", duration, spans, status=status, **info)
+
+    if response.is_streamed:
+        response.call_on_close(lambda: finish(streamed=True))
+    else:
+        finish()
+    return response
+
+@app.teardown_request
+def stop_profile(error=None):
+    # Requests that raised never reach after_request
+    discard_profile(g.pop('profile', None))
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    return Response(render_metrics(), content_type=METRICS_CONTENT_TYPE)
 
 @app.route('/')
 def index():
@@ -55,7 +138,7 @@ def index():
 
 @app.route('/api/upload-resume', methods=['POST'])
 def upload_resume():
-    init_session()
+    state = init_session()
     
     if 'resume' not in request.files:
         return jsonify({'error': 'No file uploaded'}), 400
@@ -65,18 +148,14 @@ def upload_resume():
         return jsonify({'error': 'No file selected'}), 400
     
     if file and file.filename.endswith('.pdf'):
-        filename = str(uuid.uuid4()) + '.pdf'
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        file.save(filepath)
-        
-        resume_text = read_pdf(filepath)
+        document = parse_pdf_document(file.read())
+        resume_text = document['text']
         if resume_text and not resume_text.startswith("Error reading PDF"):
-            candidate_name = extract_name_from_resume(resume_text)
-            session['resume_text'] = resume_text
-            session['candidate_name'] = candidate_name
-            
-            # Clean up file
-            os.remove(filepath)
+            candidate_name = document['candidate_name']
+            state['resume_text'] = resume_text
+            state['candidate_name'] = candidate_name
+            state['candidate_profile'] = document['profile']
+            save_session(state)
             
             return jsonify({
                 'success': True,
@@ -84,66 +163,95 @@ def upload_resume():
                 'preview': resume_text[:300] + "..." if len(resume_text) > 300 else resume_text
             })
         else:
-            if os.path.exists(filepath):
-                os.remove(filepath)
             return jsonify({'error': 'Could not read PDF file'}), 400
     
     return jsonify({'error': 'Invalid file format. Please upload a PDF.'}), 400
 
 @app.route('/api/upload-cover-letter', methods=['POST'])
 def upload_cover_letter():
-    init_session()
+    state = init_session()
     
     if 'cover_letter' not in request.files:
         return jsonify({'error': 'No file uploaded'}), 400
     
     file = request.files['cover_letter']
     if file.filename == '':
-        session['cover_letter_text'] = ''
+        state['cover_letter_text'] = ''
+        save_session(state)
         return jsonify({'success': True, 'message': 'Cover letter removed'})
     
     if file and file.filename.endswith('.pdf'):
-        filename = str(uuid.uuid4()) + '.pdf'
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        file.save(filepath)
-        
-        cover_letter_text = read_pdf(filepath)
+        cover_letter_text = parse_pdf_document(file.read())['text']
         if cover_letter_text and not cover_letter_text.startswith("Error reading PDF"):
-            session['cover_letter_text'] = cover_letter_text
-            os.remove(filepath)
+            state['cover_letter_text'] = cover_letter_text
+            save_session(state)
             return jsonify({'success': True, 'message': 'Cover letter uploaded successfully'})
         else:
-            if os.path.exists(filepath):
-                os.remove(filepath)
             return jsonify({'error': 'Could not read PDF file'}), 400
     
     return jsonify({'error': 'Invalid file format. Please upload a PDF.'}), 400
 
 @app.route('/api/job-description', methods=['POST'])
 def set_job_description():
-    init_session()
+    state = init_session()
     
+    data = request.get_json()
+    job_id = data.get('job_id')
+    if job_id:
+        # Reuse a posting registered earlier instead of re-sending its text
+        job = get_job_registry().get(job_id)
+        if job is None:
+            return jsonify({'error': 'Unknown job id'}), 404
+        job_description = job.text
+    else:
+        job_description = data.get('job_description', '')
+        job_id = get_job_registry().register(job_description).job_id if job_description.strip() else None
+    state['job_description'] = job_description
+    state['job_id'] = job_id
+    save_session(state)
+    return jsonify({'success': True, 'message': 'Job description updated', 'job_id': job_id})
+
+def job_summary(job):
+    return {
+        'job_id': job.job_id,
+        'keywords': [phrase for phrase, _ in job.keywords],
+        'token_count': job.token_count,
+        'prefix_token_counts': job.prefix_token_counts
+    }
+
+@app.route('/api/jobs', methods=['POST'])
+def register_job():
+    """Register a job description once so sessions and candidates can refer to it by id"""
     data = request.get_json()
     job_description = data.get('job_description', '')
-    session['job_description'] = job_description
-    return jsonify({'success': True, 'message': 'Job description updated'})
+    if not job_description.strip():
+        return jsonify({'error': 'Please provide a job description'}), 400
+    return jsonify(job_summary(get_job_registry().register(job_description)))
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    job = get_job_registry().get(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown job id'}), 404
+    return jsonify({**job_summary(job), 'job_description': job.text})
 
 @app.route('/api/set-mode', methods=['POST'])
 def set_mode():
-    init_session()
+    state = init_session()
     
     data = request.get_json()
     mode = data.get('mode', 'job_seeker')
-    session['current_mode'] = mode
-    session['chat_history'] = []  # Reset chat history
+    state['current_mode'] = mode
+    state['chat_history'] = []  # Reset chat history
+    save_session(state)
     return jsonify({'success': True, 'mode': mode})
 
 @app.route('/api/ats-analysis', methods=['GET'])
 def get_ats_analysis():
-    init_session()
+    state = init_session()
     
-    resume_text = session.get('resume_text', '')
-    job_description = session.get('job_description', '')
+    resume_text = state.get('resume_text', '')
+    job_description = state.get('job_description', '')
     
     if not resume_text:
         return jsonify({'error': 'Please upload a resume first'}), 400
@@ -152,7 +260,7 @@ def get_ats_analysis():
         return jsonify({'error': 'Please provide a job description first'}), 400
     
     try:
-        analysis = calculate_ats_score(resume_text, job_description, client)
+        analysis = calculate_ats_score(resume_text, job_description, get_client(), profile=state.get('candidate_profile'))
         return jsonify({
             'ats_score': analysis.ats_score,
             'keyword_matches': analysis.keyword_matches,
@@ -164,39 +272,137 @@ def get_ats_analysis():
     except Exception as e:
         return jsonify({'error': f'ATS analysis failed: {str(e)}'}), 500
 
-@app.route('/api/chat', methods=['POST'])
-def chat():
-    init_session()
+@app.route(BATCH_ROUTE, methods=['POST'])
+def batch_ats_analysis():
+    """Score every PDF in an uploaded zip against one job description, streaming JSONL or CSV rows"""
+    state = init_session()
     
-    data = request.get_json()
-    message = data.get('message', '')
+    if 'resumes' not in request.files:
+        return jsonify({'error': 'No zip file uploaded'}), 400
     
-    resume_text = session.get('resume_text', '')
-    job_description = session.get('job_description', '')
-    cover_letter_text = session.get('cover_letter_text', '')
-    candidate_name = session.get('candidate_name', 'Candidate')
-    mode = session.get('current_mode', 'job_seeker')
-    chat_history = session.get('chat_history', [])
+    file = request.files['resumes']
+    if not file.filename.endswith('.zip'):
+        return jsonify({'error': 'Invalid file format. Please upload a zip of PDFs.'}), 400
     
-    if not resume_text:
-        return jsonify({'error': 'Please upload a resume first'}), 400
+    job_description = request.form.get('job_description') or state.get('job_description', '')
+    if not job_description:
+        return jsonify({'error': 'Please provide a job description first'}), 400
+    
+    output_format = request.args.get('format', 'jsonl')
+    if output_format not in ('jsonl', 'csv'):
+        return jsonify({'error': 'format must be jsonl or csv'}), 400
+    
+    # Batches share one parse pool; past MAX_CONCURRENT_BATCHES they are turned away, not queued
+    slots = batch_slots()
+    if not slots.acquire(blocking=False):
+        return jsonify({'error': 'Too many batch screenings are running. Please try again shortly.'}), 429
+    try:
+        results = screen_candidates(
+            iter_zip_pdfs(file.stream),
+            job_description,
+            get_client(),
+            concurrency=int(os.getenv('BATCH_ATS_CONCURRENCY', 4)),
+            enrich=request.args.get('enrich', 'false').lower() in ('1', 'true', 'yes')
+        )
+        mimetype = 'text/csv' if output_format == 'csv' else 'application/x-ndjson'
+        response = Response(stream_with_context(stream_results(results, output_format)), mimetype=mimetype)
+    except BaseException:
+        slots.release()
+        raise
+    # The slot is held until the streamed body is done or the client goes away
+    response.call_on_close(slots.release)
+    return response
+
+@app.route('/api/candidates', methods=['POST'])
+def add_candidates():
+    """Parse and index one or more uploaded resume PDFs"""
+    files = request.files.getlist('resume')
+    if not files:
+        return jsonify({'error': 'No file uploaded'}), 400
+    
+    candidate_index = get_candidate_index()
+    added, failed = [], []
+    for file in files:
+        if not file.filename.endswith('.pdf'):
+            failed.append({'file': file.filename, 'error': 'Invalid file format. Please upload a PDF.'})
+            continue
+        data = file.read()
+        document = parse_pdf_document(data)
+        if not document['text'] or document['text'].startswith("Error reading PDF"):
+            failed.append({'file': file.filename, 'error': 'Could not read PDF file'})
+            continue
+        candidate_id = content_hash(data)[:16]
+        candidate_index.add(candidate_id, document['text'], document['candidate_name'])
+        added.append({'file': file.filename, 'candidate_id': candidate_id, 'candidate_name': document['candidate_name']})
+    # New resumes are stored and searchable right away; the postings merge runs every autosave_every changes
+    
+    return jsonify({'success': bool(added), 'added': added, 'failed': failed, 'total': len(candidate_index)})
+
+@app.route('/api/candidates/<candidate_id>', methods=['DELETE'])
+def delete_candidate(candidate_id):
+    candidate_index = get_candidate_index()
+    if not candidate_index.delete(candidate_id):
+        return jsonify({'error': 'Candidate not found'}), 404
+    return jsonify({'success': True})
+
+@app.route('/api/candidates/search', methods=['POST'])
+def search_candidates():
+    """Rank indexed resumes against a job description; optionally ATS-score the shortlist"""
+    state = init_session()
     
+    data = request.get_json() or {}
+    job_description = data.get('job_description') or state.get('job_description', '')
     if not job_description:
         return jsonify({'error': 'Please provide a job description first'}), 400
     
-    # Set system prompt based on mode
-    if mode == 'job_seeker':
-        system_prompt = set_interviewer_prompt(candidate_name, resume_text, job_description, cover_letter_text)
-    else:
-        system_prompt = set_candidate_prompt(candidate_name, resume_text, job_description, cover_letter_text)
+    try:
+        top_k = int(data.get('top_k', 50))
+        ats_top = int(data.get('ats_top', 0))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'top_k and ats_top must be integers'}), 400
+    if top_k < 1 or ats_top < 0:
+        return jsonify({'error': 'top_k must be at least 1 and ats_top at least 0'}), 400
+    top_k = min(top_k, int(os.getenv('CANDIDATE_SEARCH_MAX_TOP_K', 500)))
     
-    # Prepare messages
-    messages = [{"role": "system", "content": system_prompt}]
-    messages.extend(chat_history)
-    messages.append({"role": "user", "content": message})
+    candidate_index = get_candidate_index()
+    results = candidate_index.search(job_description, top_k)
+    
+    # Only the shortlist goes through the (possibly LLM-backed) ATS scoring
+    for result in results[:ats_top]:
+        analysis = calculate_ats_score(
+            candidate_index.get_text(result['candidate_id']), job_description, get_client(),
+            enrich=bool(data.get('enrich', False)), priority=BATCH
+        )
+        result['ats'] = analysis.model_dump()
+    
+    return jsonify({'results': results, 'total': len(candidate_index)})
+
+@app.route('/api/cache-stats', methods=['GET'])
+def cache_stats():
+    return jsonify({
+        'ats': get_ats_cache().stats(),
+        'documents': get_document_cache().stats(),
+        'jobs': get_job_registry().stats(),
+        'prompt_cache': prompt_cache_stats(),
+        'llm_scheduler': scheduler.stats(),
+        'resilience': resilience_stats()
+    })
+
+@app.route('/api/chat', methods=['POST'])
+def chat():
+    state = init_session()
+    
+    data = request.get_json()
+    message = data.get('message', '')
+    
+    messages, error = build_chat_messages(state, message, session['sid'])
+    if error:
+        return jsonify({'error': error}), 400
     
     try:
-        response = client.chat.completions.create(
+        response = guarded_call(
+            'chat',
+            get_client().chat.completions.create,
             model=os.getenv("AZURE_OPENAI_DEPLOYMENT_NAME"),
             messages=messages
         )
@@ -204,21 +410,62 @@ def chat():
         ai_response = response.choices[0].message.content
         
         # Update chat history
-        chat_history.extend([
-            {"role": "user", "content": message},
-            {"role": "assistant", "content": ai_response}
-        ])
-        session['chat_history'] = chat_history
+        append_chat_turn(state, message, ai_response)
+        save_session(state)
         
-        return jsonify({'response': ai_response})
+        return jsonify({'response': ai_response, 'usage': record_usage(response.usage)})
         
+    except CircuitOpenError as e:
+        return jsonify({'error': str(e)}), 503
+    except TimeoutError:
+        # Missed deadlines and SDK request timeouts alike; guarded_call raises both as DeadlineExceeded
+        return jsonify({'error': 'The language model took too long to respond. Please try again.'}), 504
     except Exception as e:
         return jsonify({'error': f'Chat error: {str(e)}'}), 500
 
+@app.route('/api/chat/stream', methods=['POST'])
+def chat_stream():
+    """Server-Sent Events variant of /api/chat; history is saved once the stream completes"""
+    state = init_session()
+    sid = session['sid']
+    
+    data = request.get_json()
+    message = data.get('message', '')
+    
+    messages, error = build_chat_messages(state, message, session['sid'])
+    if error:
+        return jsonify({'error': error}), 400
+    
+    def generate():
+        chunks = []
+        usage = {}
+        try:
+            for delta in stream_chat_completion(get_client(), messages, usage):
+                chunks.append(delta)
+                yield sse_event({'delta': delta})
+        except CircuitOpenError as e:
+            yield sse_event({'error': str(e)})
+            return
+        except Exception as e:
+            yield sse_event({'error': f'Chat error: {str(e)}'})
+            return
+        
+        ai_response = ''.join(chunks)
+        append_chat_turn(state, message, ai_response)
+        get_session_store().save(sid, state)
+        yield sse_event({'done': True, 'usage': usage or None})
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
 @app.route('/api/clear-chat', methods=['POST'])
 def clear_chat():
-    init_session()
-    session['chat_history'] = []
+    state = init_session()
+    state['chat_history'] = []
+    save_session(state)
     return jsonify({'success': True})
 
 if __name__ == '__main__':
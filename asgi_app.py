@@ -0,0 +1,366 @@
+"""Async (ASGI) serving mode for the interactive /api/* routes of app.py.
+
+Run with any ASGI server, e.g. `hypercorn asgi_app:app` or `uvicorn asgi_app:app`.
+LLM calls go through the single pooled AsyncAzureOpenAI client returned by
+get_async_client, so a request waiting on Azure no longer pins a worker thread.
+
+The bulk routes are Flask-only and are served by app.py:
+
+    POST   /api/batch-ats                  (process-pool PDF parsing, spooled archives)
+    POST   /api/candidates
+    DELETE /api/candidates/<candidate_id>
+    POST   /api/candidates/search          (single-writer candidate index)
+"""
+from quart import Quart, request, jsonify, render_template, session, Response, g
+from quart.wrappers.response import IterableBody
+from quart_cors import cors
+import asyncio
+import uuid
+import os
+import time
+
+from session_store import create_session_store
+from llm_scheduler import scheduler
+from resilience import CircuitOpenError, aguarded_call, stats as resilience_stats
+from metrics import (
+    CONTENT_TYPE as METRICS_CONTENT_TYPE, begin_request, end_request, render as render_metrics, request_spans, server_timing
+)
+from profiler import discard_profile, finish_profile, start_profile
+from interview import build_chat_messages, append_chat_turn, sse_event
+from recruiter_core import (
+    singleton,
+    get_async_client,
+    parse_pdf_document,
+    acalculate_ats_score,
+    get_ats_cache,
+    get_job_registry,
+    get_document_cache,
+    astream_chat_completion,
+    record_usage,
+    prompt_cache_stats
+)
+
+app = Quart(__name__)
+app.secret_key = os.getenv('SECRET_KEY', 'your-secret-key-here')
+app = cors(app)
+
+# Uploads are parsed straight from memory, so bound their size
+app.config['MAX_CONTENT_LENGTH'] = int(os.getenv('MAX_UPLOAD_MB', 10)) * 1024 * 1024
+
+# Server-side session storage; the cookie only holds the session id. Opened on first use so
+# each worker gets its own SQLite connection
+def get_session_store():
+    return singleton('session_store', create_session_store)
+
+# Session loads and saves are SQLite calls, so they run in a worker thread like PDF parsing
+async def init_session():
+    if 'sid' not in session:
+        session['sid'] = uuid.uuid4().hex
+    return await asyncio.to_thread(get_session_store().load, session['sid'])
+
+async def save_session(state):
+    await asyncio.to_thread(get_session_store().save, session['sid'], state)
+
+@app.before_request
+async def start_request_timer():
+    g.request_started = begin_request()
+    g.profile = start_profile()
+
+class ClosingBody:
+    """A response body that runs on_close() once the server has sent it, or stopped sending it"""
+
+    def __init__(self, body, on_close):
+        self._body = body
+        self._on_close = on_close
+
+    async def __aenter__(self):
+        await self._body.__aenter__()
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, tb):
+        try:
+            return await self._body.__aexit__(exc_type, exc_value, tb)
+        finally:
+            await self._on_close()
+
+    def __aiter__(self):
+        return self._body.__aiter__()
+
+@app.after_request
+async def record_request_metrics(response):
+    """Observe the request latency and list its spans in a Server-Timing header
+
+    A streamed body (e.g. the SSE chat stream) is generated after this hook
+    returns, so its latency, spans and profile are recorded once the body has
+    been sent; its Server-Timing header can only list the spans recorded
+    before the stream started.
+    """
+    if 'request_started' not in g:
+        return response
+    started = g.request_started
+    endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+    method, status = request.method, response.status_code
+    profile = g.pop('profile', None)
+    spans = request_spans() or []
+    if spans:
+        response.headers['Server-Timing'] = server_timing(spans)
+
+    async def finish(**info):
+        duration = time.perf_counter() - started
+        end_request(started, endpoint, method, status, spans)
+        if profile is not None:
+            await asyncio.to_thread(finish_profile, profile, f"{method} {endpoint}", duration, spans, status=status, **info)
+
+    if isinstance(response.response, IterableBody):
+        response.response = ClosingBody(response.response, lambda: finish(streamed=True))
+    else:
+        await finish()
+    return response
+
+@app.teardown_request
+async def stop_profile(error=None):
+    # Requests that raised never reach after_request
+    discard_profile(g.pop('profile', None))
+
+@app.route('/metrics', methods=['GET'])
+async def metrics():
+    return Response(render_metrics(), content_type=METRICS_CONTENT_TYPE)
+
+async def read_uploaded_pdf(file):
+    """Parse an upload from its in-memory bytes, off the event loop"""
+    return await asyncio.to_thread(parse_pdf_document, file.read())
+
+@app.route('/')
+async def index():
+    await init_session()
+    return await render_template('index.html')
+
+@app.route('/api/upload-resume', methods=['POST'])
+async def upload_resume():
+    state = await init_session()
+    files = await request.files
+
+    if 'resume' not in files:
+        return jsonify({'error': 'No file uploaded'}), 400
+
+    file = files['resume']
+    if file.filename == '':
+        return jsonify({'error': 'No file selected'}), 400
+
+    if file and file.filename.endswith('.pdf'):
+        document = await read_uploaded_pdf(file)
+        resume_text = document['text']
+        if resume_text and not resume_text.startswith("Error reading PDF"):
+            candidate_name = document['candidate_name']
+            state['resume_text'] = resume_text
+            state['candidate_name'] = candidate_name
+            state['candidate_profile'] = document['profile']
+            await save_session(state)
+
+            return jsonify({
+                'success': True,
+                'candidate_name': candidate_name,
+                'preview': resume_text[:300] + "..." if len(resume_text) > 300 else resume_text
+            })
+        return jsonify({'error': 'Could not read PDF file'}), 400
+
+    return jsonify({'error': 'Invalid file format. Please upload a PDF.'}), 400
+
+@app.route('/api/upload-cover-letter', methods=['POST'])
+async def upload_cover_letter():
+    state = await init_session()
+    files = await request.files
+
+    if 'cover_letter' not in files:
+        return jsonify({'error': 'No file uploaded'}), 400
+
+    file = files['cover_letter']
+    if file.filename == '':
+        state['cover_letter_text'] = ''
+        await save_session(state)
+        return jsonify({'success': True, 'message': 'Cover letter removed'})
+
+    if file and file.filename.endswith('.pdf'):
+        cover_letter_text = (await read_uploaded_pdf(file))['text']
+        if cover_letter_text and not cover_letter_text.startswith("Error reading PDF"):
+            state['cover_letter_text'] = cover_letter_text
+            await save_session(state)
+            return jsonify({'success': True, 'message': 'Cover letter uploaded successfully'})
+        return jsonify({'error': 'Could not read PDF file'}), 400
+
+    return jsonify({'error': 'Invalid file format. Please upload a PDF.'}), 400
+
+@app.route('/api/job-description', methods=['POST'])
+async def set_job_description():
+    state = await init_session()
+
+    data = await request.get_json()
+    job_id = data.get('job_id')
+    if job_id:
+        # Reuse a posting registered earlier instead of re-sending its text
+        job = get_job_registry().get(job_id)
+        if job is None:
+            return jsonify({'error': 'Unknown job id'}), 404
+        job_description = job.text
+    else:
+        job_description = data.get('job_description', '')
+        job_id = get_job_registry().register(job_description).job_id if job_description.strip() else None
+    state['job_description'] = job_description
+    state['job_id'] = job_id
+    await save_session(state)
+    return jsonify({'success': True, 'message': 'Job description updated', 'job_id': job_id})
+
+def job_summary(job):
+    return {
+        'job_id': job.job_id,
+        'keywords': [phrase for phrase, _ in job.keywords],
+        'token_count': job.token_count,
+        'prefix_token_counts': job.prefix_token_counts
+    }
+
+@app.route('/api/jobs', methods=['POST'])
+async def register_job():
+    """Register a job description once so sessions and candidates can refer to it by id"""
+    data = await request.get_json()
+    job_description = data.get('job_description', '')
+    if not job_description.strip():
+        return jsonify({'error': 'Please provide a job description'}), 400
+    return jsonify(job_summary(get_job_registry().register(job_description)))
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+async def get_job(job_id):
+    job = get_job_registry().get(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown job id'}), 404
+    return jsonify({**job_summary(job), 'job_description': job.text})
+
+@app.route('/api/set-mode', methods=['POST'])
+async def set_mode():
+    state = await init_session()
+
+    data = await request.get_json()
+    mode = data.get('mode', 'job_seeker')
+    state['current_mode'] = mode
+    state['chat_history'] = []  # Reset chat history
+    await save_session(state)
+    return jsonify({'success': True, 'mode': mode})
+
+@app.route('/api/ats-analysis', methods=['GET'])
+async def get_ats_analysis():
+    state = await init_session()
+
+    resume_text = state.get('resume_text', '')
+    job_description = state.get('job_description', '')
+
+    if not resume_text:
+        return jsonify({'error': 'Please upload a resume first'}), 400
+
+    if not job_description:
+        return jsonify({'error': 'Please provide a job description first'}), 400
+
+    try:
+        analysis = await acalculate_ats_score(
+            resume_text, job_description, get_async_client(), profile=state.get('candidate_profile')
+        )
+        return jsonify({
+            'ats_score': analysis.ats_score,
+            'keyword_matches': analysis.keyword_matches,
+            'missing_keywords': analysis.missing_keywords,
+            'recommendations': analysis.recommendations,
+            'strengths': analysis.strengths,
+            'weaknesses': analysis.weaknesses
+        })
+    except Exception as e:
+        return jsonify({'error': f'ATS analysis failed: {str(e)}'}), 500
+
+@app.route('/api/cache-stats', methods=['GET'])
+async def cache_stats():
+    return jsonify({
+        'ats': get_ats_cache().stats(),
+        'documents': get_document_cache().stats(),
+        'jobs': get_job_registry().stats(),
+        'prompt_cache': prompt_cache_stats(),
+        'llm_scheduler': scheduler.stats(),
+        'resilience': resilience_stats()
+    })
+
+@app.route('/api/chat', methods=['POST'])
+async def chat():
+    state = await init_session()
+
+    data = await request.get_json()
+    message = data.get('message', '')
+
+    # Trimming the history to the token budget is CPU work; keep it off the event loop
+    messages, error = await asyncio.to_thread(build_chat_messages, state, message, session['sid'])
+    if error:
+        return jsonify({'error': error}), 400
+
+    try:
+        response = await aguarded_call(
+            'chat',
+            get_async_client().chat.completions.create,
+            model=os.getenv("AZURE_OPENAI_DEPLOYMENT_NAME"),
+            messages=messages
+        )
+
+        ai_response = response.choices[0].message.content
+
+        append_chat_turn(state, message, ai_response)
+        await save_session(state)
+
+        return jsonify({'response': ai_response, 'usage': record_usage(response.usage)})
+
+    except CircuitOpenError as e:
+        return jsonify({'error': str(e)}), 503
+    except TimeoutError:
+        # Missed deadlines and SDK request timeouts alike; guarded_call raises both as DeadlineExceeded
+        return jsonify({'error': 'The language model took too long to respond. Please try again.'}), 504
+    except Exception as e:
+        return jsonify({'error': f'Chat error: {str(e)}'}), 500
+
+@app.route('/api/chat/stream', methods=['POST'])
+async def chat_stream():
+    state = await init_session()
+    sid = session['sid']
+
+    data = await request.get_json()
+    message = data.get('message', '')
+
+    messages, error = await asyncio.to_thread(build_chat_messages, state, message, session['sid'])
+    if error:
+        return jsonify({'error': error}), 400
+
+    async def generate():
+        chunks = []
+        usage = {}
+        try:
+            async for delta in astream_chat_completion(get_async_client(), messages, usage):
+                chunks.append(delta)
+                yield sse_event({'delta': delta})
+        except CircuitOpenError as e:
+            yield sse_event({'error': str(e)})
+            return
+        except Exception as e:
+            yield sse_event({'error': f'Chat error: {str(e)}'})
+            return
+
+        append_chat_turn(state, message, ''.join(chunks))
+        await asyncio.to_thread(get_session_store().save, sid, state)
+        yield sse_event({'done': True, 'usage': usage or None})
+
+    response = Response(generate(), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    response.timeout = None
+    return response
+
+@app.route('/api/clear-chat', methods=['POST'])
+async def clear_chat():
+    state = await init_session()
+    state['chat_history'] = []
+    await save_session(state)
+    return jsonify({'success': True})
+
+if __name__ == '__main__':
+    app.run(debug=True)
@@ -0,0 +1,249 @@
+"""Local, deterministic keyword matching for ATS scoring.
+
+Keywords and skill phrases are mined from the job description, weighted
+TF-IDF style and matched against the resume as set lookups, so a score is
+produced in a few milliseconds without any network call.
+"""
+import math
+import re
+from collections import Counter
+from typing import Dict, List, Tuple
+
+# Keeps tech tokens such as c++, c#, node.js, ci/cd and .net intact
+TOKEN_RE = re.compile(r"[A-Za-z0-9.#+][A-Za-z0-9+#./-]*[A-Za-z0-9+#]|[A-Za-z0-9]")
+# Phrases never span these; commas matter because skills are usually listed with them
+CHUNK_SPLIT_RE = re.compile(r"[\n;:,()\[\]•·▪●|]|[.!?](?:\s|$)")
+REQUIREMENT_RE = re.compile(
+    r"\b(require[sd]?|requirements?|must|qualifications?|proficien\w*|knowledge of|experience (?:with|in)|skills?)\b",
+    re.IGNORECASE
+)
+# Words that mark a line as a section heading rather than a list item
+HEADING_WORD_RE = re.compile(
+    r"\b(requirements?|qualifications?|responsibilities|skills|experience|about|benefits|perks|offer|"
+    r"duties|role|you(?:'ll| will)|we(?:'re| are)|nice to have|bonus|preferred|education|who|what|why|how)\b",
+    re.IGNORECASE
+)
+BULLETS = "-*•·▪●"
+
+STOPWORDS = frozenset("""
+a about above across after again against all also am an and any are as at be because been before being below
+between both but by can could did do does doing down during each either etc few for from further had has have
+having he her here hers him his how i if in into is it its itself just may me might more most must my no nor not
+now of off on once only or other our ours out over own per same shall she should so some such than that the
+their theirs them then there these they this those through to too under until up upon us very via was we were
+what when where which while who whom why will with within without would you your yours
+""".split())
+
+# Vocabulary found in nearly every posting; the inverse-document-frequency prior damps it
+GENERIC_TERMS = frozenset("""
+ability able candidate candidate company work working team role position job strong good excellent great
+year experience experienced skill knowledge understanding including include requirement responsibilitie
+responsible required preferred plus new well using use based across environment opportunity looking join
+help ensure related relevant etc high level day time nice have familiarity familiar build building
+benefit salary apply applicant office location remote hybrid full part key
+""".split())
+
+# Bump whenever keyword extraction changes so stored job postings are re-mined
+KEYWORDS_VERSION = "2"
+
+REQUIREMENT_BOOST = 1.5
+# Capitalized or symbol-bearing words mid-sentence (Python, AWS, C++) are usually named skills
+SKILL_BOOST = 1.5
+MAX_NGRAM = 3
+
+
+def stem(token: str) -> str:
+    """Lower-case with very light plural folding: 'APIs' -> 'api', 'databases' -> 'database'"""
+    if len(token) > 2 and token.endswith("s") and token[:-1].isupper():
+        return token[:-1].lower()
+    token = token.lower()
+    if len(token) > 3 and token.isalpha() and token.endswith("s") and not token.endswith(("ss", "us", "is")):
+        return token[:-1]
+    return token
+
+
+def raw_tokens(text: str) -> List[str]:
+    return [token.strip(".") for token in TOKEN_RE.findall(text) if token.strip(".")]
+
+
+def tokenize(text: str) -> List[str]:
+    return [stem(token) for token in raw_tokens(text)]
+
+
+def split_chunks(text: str) -> List[str]:
+    return [part for part in CHUNK_SPLIT_RE.split(text) if part and part.strip()]
+
+
+def chunk_phrases(tokens: List[str], max_n: int = MAX_NGRAM):
+    """Yield (phrase, n) for n-grams that contain no stopwords"""
+    for n in range(1, max_n + 1):
+        for i in range(len(tokens) - n + 1):
+            gram = tokens[i:i + n]
+            if any(token in STOPWORDS for token in gram):
+                continue
+            if n == 1 and (len(gram[0]) < 2 or not any(c.isalpha() for c in gram[0])):
+                continue
+            yield " ".join(gram), n
+
+
+def phrase_set(text: str, max_n: int = MAX_NGRAM) -> frozenset:
+    """Every candidate phrase in a document"""
+    phrases = set()
+    for chunk in split_chunks(text):
+        phrases.update(phrase for phrase, _ in chunk_phrases(tokenize(chunk), max_n))
+    return frozenset(phrases)
+
+
+def is_heading(line: str) -> bool:
+    """A stripped, unbulleted line that introduces a section: "Requirements:", "About the role"
+
+    Short lines only count without the colon when they use a usual heading word, so
+    list items that lost their bullet ("Python", "Free lunch") are not headings.
+    """
+    if line.endswith(":"):
+        return True
+    return len(line.split()) <= 5 and not line.endswith(".") and bool(HEADING_WORD_RE.search(line))
+
+
+def job_description_chunks(job_description: str):
+    """Yield (chunk, is_requirement); bullets under a 'Requirements'-style heading count as requirements"""
+    in_requirements = False
+    for line in job_description.splitlines():
+        line = line.strip()
+        bulleted = line[:1] in BULLETS
+        line = line.lstrip(BULLETS + " ").strip()
+        if not line:
+            continue
+        mentions_requirement = bool(REQUIREMENT_RE.search(line))
+        # A bulleted line is always an item of the current section
+        if not bulleted and is_heading(line):
+            in_requirements = mentions_requirement
+        for chunk in split_chunks(line):
+            yield chunk, in_requirements or mentions_requirement
+
+
+def skill_like_tokens(chunk: str) -> set:
+    """Tokens written like named skills; a capitalized first word only counts when it stands alone ("Python")"""
+    words = TOKEN_RE.findall(chunk)
+    return {
+        stem(word.strip("."))
+        for position, word in enumerate(words)
+        if ((position > 0 or len(words) == 1) and word[0].isupper()) or word.isupper() or any(c in word for c in "+#.")
+    }
+
+
+def phrase_weight(phrase: str, n: int, count: int, in_requirement: bool, skill_like: bool) -> float:
+    tf = 1.0 + math.log(count)
+    # Inverse-document-frequency prior: generic words inside a phrase dilute it
+    tokens = phrase.split()
+    idf = sum(0.2 if token in GENERIC_TERMS else 1.0 for token in tokens) / len(tokens)
+    weight = tf * idf * (1.0 + 0.5 * (n - 1))
+    if skill_like:
+        weight *= SKILL_BOOST
+    return weight * REQUIREMENT_BOOST if in_requirement else weight
+
+
+def extract_keywords(job_description: str, top_k: int = 40) -> List[Tuple[str, float]]:
+    """Rank the job description's keywords and skill phrases by weight"""
+    counts = Counter()
+    sizes = {}
+    requirement_phrases = set()
+    skill_tokens = set()
+    for chunk, is_requirement in job_description_chunks(job_description):
+        skill_tokens |= skill_like_tokens(chunk)
+        for phrase, n in chunk_phrases(tokenize(chunk)):
+            counts[phrase] += 1
+            sizes[phrase] = n
+            if is_requirement:
+                requirement_phrases.add(phrase)
+
+    weighted = []
+    for phrase, count in counts.items():
+        n = sizes[phrase]
+        # Multi-word phrases seen once are mostly accidental word pairs
+        if n > 1 and count < 2:
+            continue
+        if all(token in GENERIC_TERMS for token in phrase.split()):
+            continue
+        skill_like = any(token in skill_tokens for token in phrase.split())
+        weighted.append((phrase, phrase_weight(phrase, n, count, phrase in requirement_phrases, skill_like)))
+
+    weighted.sort(key=lambda item: (-item[1], item[0]))
+    selected = []
+    for phrase, weight in weighted:
+        # A sub-phrase that never occurs outside a selected longer phrase adds nothing
+        if any(f" {phrase} " in f" {chosen} " and counts[phrase] == counts[chosen] for chosen, _ in selected):
+            continue
+        selected.append((phrase, weight))
+        if len(selected) >= top_k:
+            break
+    return selected
+
+
+def display_forms(job_description: str) -> Dict[str, str]:
+    """Map each stemmed phrase to the way it was first written in the job description"""
+    forms = {}
+    for chunk in split_chunks(job_description):
+        raw = [token.lower() for token in raw_tokens(chunk)]
+        stems = tokenize(chunk)
+        for n in range(1, MAX_NGRAM + 1):
+            for i in range(len(stems) - n + 1):
+                forms.setdefault(" ".join(stems[i:i + n]), " ".join(raw[i:i + n]))
+    return forms
+
+
+def match_keywords(resume_text: str, keywords: List[Tuple[str, float]]) -> Dict:
+    """Overlap between the resume's phrase set and the weighted keyword list"""
+    resume_phrases = phrase_set(resume_text)
+    matched = [(phrase, weight) for phrase, weight in keywords if phrase in resume_phrases]
+    missing = [(phrase, weight) for phrase, weight in keywords if phrase not in resume_phrases]
+    total = sum(weight for _, weight in keywords)
+    covered = sum(weight for _, weight in matched)
+    # Half credit, pro rata, for multi-word phrases whose individual words all appear somewhere
+    for phrase, weight in missing:
+        tokens = phrase.split()
+        if len(tokens) > 1:
+            covered += 0.5 * weight * sum(token in resume_phrases for token in tokens) / len(tokens)
+    return {
+        'score': round(100 * covered / total) if total else 0,
+        'matched': matched,
+        'missing': missing,
+    }
+
+
+def analyze(resume_text: str, job_description: str, top_k: int = 40, keywords: List[Tuple[str, float]] = None) -> Dict:
+    """Score a resume against a job description and fill the ATSAnalysis fields
+
+    Pass keywords precomputed by extract_keywords to skip re-mining the job description.
+    """
+    keywords = extract_keywords(job_description, top_k) if keywords is None else keywords
+    result = match_keywords(resume_text, keywords)
+    forms = display_forms(job_description)
+    matched = [(forms.get(phrase, phrase), weight) for phrase, weight in result['matched']]
+    missing = [(forms.get(phrase, phrase), weight) for phrase, weight in result['missing']]
+
+    strengths = []
+    if matched:
+        strengths.append("Strong match on: " + ", ".join(phrase for phrase, _ in matched[:8]))
+        strengths.append(f"Covers {len(matched)} of {len(keywords)} key terms from the job description")
+
+    weaknesses = []
+    if missing:
+        weaknesses.append("Missing high-priority terms: " + ", ".join(phrase for phrase, _ in missing[:8]))
+    if keywords and len(matched) < len(keywords) / 2:
+        weaknesses.append("Less than half of the job description's key terms appear in the resume")
+
+    recommendations = [
+        f"Add concrete evidence of '{phrase}' if it reflects your experience" for phrase, _ in missing[:5]
+    ]
+    if not recommendations:
+        recommendations.append("The resume already covers the job description's key terms")
+
+    return {
+        'ats_score': result['score'],
+        'keyword_matches': [phrase for phrase, _ in matched],
+        'missing_keywords': [phrase for phrase, _ in missing],
+        'recommendations': recommendations,
+        'strengths': strengths,
+        'weaknesses': weaknesses,
+    }
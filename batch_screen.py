@@ -0,0 +1,238 @@
+"""Screen many resumes against one job description.
+
+PDFs are parsed in a process pool, scored through calculate_ats_score with a
+bounded number of concurrent calls, and each candidate's result is emitted as
+soon as it is ready.
+
+In a server, batches share one parse pool per process (BATCH_PARSE_WORKERS
+processes, default the CPU count), started on the first batch, and
+batch_slots() caps how many batches run at once (MAX_CONCURRENT_BATCHES).
+
+    python batch_screen.py --jd job.txt --input resumes.zip --format csv --output results.csv
+"""
+import argparse
+import csv
+import io
+import json
+import multiprocessing
+import os
+import sys
+import threading
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from llm_scheduler import BATCH
+from recruiter_core import calculate_ats_score, drop_singleton, get_client, parse_pdf_document, singleton
+
+CSV_FIELDS = ['file', 'candidate_name', 'ats_score', 'keyword_matches', 'missing_keywords', 'error']
+# Same per-file limit as a single resume upload
+MAX_MEMBER_BYTES = int(os.getenv('MAX_UPLOAD_MB', 10)) * 1024 * 1024
+
+
+class MemberTooLarge(ValueError):
+    pass
+
+
+def iter_zip_pdfs(zip_file, max_member_bytes=MAX_MEMBER_BYTES):
+    """Yield (name, bytes) for every PDF in a zip archive (path, bytes or file object)
+
+    A member larger than max_member_bytes yields (name, MemberTooLarge) instead of its bytes.
+    The size in the zip header is checked first and at most max_member_bytes + 1 bytes are
+    ever decompressed, so a zip bomb cannot exhaust memory.
+    """
+    if isinstance(zip_file, (bytes, bytearray)):
+        zip_file = io.BytesIO(zip_file)
+    with zipfile.ZipFile(zip_file) as archive:
+        for info in archive.infolist():
+            if info.is_dir() or not info.filename.lower().endswith('.pdf'):
+                continue
+            too_large = MemberTooLarge(f"File exceeds {max_member_bytes // (1024 * 1024)} MB")
+            if info.file_size > max_member_bytes:
+                yield info.filename, too_large
+                continue
+            with archive.open(info) as member:
+                data = member.read(max_member_bytes + 1)
+            yield info.filename, too_large if len(data) > max_member_bytes else data
+
+
+def iter_pdf_sources(path):
+    """Yield (name, bytes) for every PDF in a directory tree or zip archive"""
+    if os.path.isdir(path):
+        for root, _, files in os.walk(path):
+            for filename in sorted(files):
+                if filename.lower().endswith('.pdf'):
+                    full_path = os.path.join(root, filename)
+                    with open(full_path, 'rb') as f:
+                        yield os.path.relpath(full_path, path), f.read()
+    elif zipfile.is_zipfile(path):
+        yield from iter_zip_pdfs(path)
+    else:
+        raise ValueError(f"{path} is neither a directory nor a zip archive")
+
+
+def parse_candidate(name, data):
+    """Process-pool task: extract text and name from one PDF"""
+    return name, parse_pdf_document(data)
+
+
+def score_candidate(name, document, job_description, llm_client, enrich):
+    analysis = calculate_ats_score(
+        document['text'], job_description, llm_client, enrich=enrich, profile=document.get('profile'), priority=BATCH
+    )
+    return {'file': name, 'candidate_name': document['candidate_name'], 'error': None, **analysis.model_dump()}
+
+
+def error_result(name, error):
+    return {'file': name, 'candidate_name': None, 'ats_score': None, 'error': error}
+
+
+def pool_context():
+    """Start parse workers from a clean forkserver rather than forking a threaded web worker"""
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+
+
+def parse_pool_workers() -> int:
+    return int(os.getenv('BATCH_PARSE_WORKERS', 0)) or os.cpu_count() or 1
+
+
+def get_parse_pool() -> ProcessPoolExecutor:
+    """The parse pool every batch in this process shares, started on first use"""
+    return singleton('batch_parse_pool', lambda: ProcessPoolExecutor(parse_pool_workers(), mp_context=pool_context()))
+
+
+def batch_slots() -> threading.BoundedSemaphore:
+    """One slot per batch allowed to run at once in this process"""
+    return singleton('batch_slots', lambda: threading.BoundedSemaphore(int(os.getenv('MAX_CONCURRENT_BATCHES', 2))))
+
+
+def screen_candidates(sources, job_description, llm_client=None, workers=None, concurrency=4, enrich=None):
+    """Yield one result dict per PDF, in completion order
+
+    sources is an iterable of (name, bytes); at most `concurrency` ATS scorings run at once,
+    and only a few PDFs per parse worker are held in memory at a time. A source whose bytes
+    are an exception (see iter_zip_pdfs) becomes an error result. PDFs are parsed in the
+    shared pool of get_parse_pool(), or in a pool of their own when workers is given.
+    """
+    llm_client = llm_client or get_client()
+    own_pool = ProcessPoolExecutor(workers, mp_context=pool_context()) if workers else None
+    max_parsing = (workers or parse_pool_workers()) * 2
+    sources = iter(sources)
+
+    with ThreadPoolExecutor(concurrency) as score_pool:
+        parsing = {}
+        scoring = {}
+        rejected = []
+
+        def fill_parse_queue():
+            while len(parsing) < max_parsing:
+                try:
+                    name, data = next(sources)
+                except StopIteration:
+                    return
+                if isinstance(data, Exception):
+                    rejected.append(error_result(name, str(data)))
+                    continue
+                parse_pool = own_pool or get_parse_pool()
+                parsing[parse_pool.submit(parse_candidate, name, data)] = (name, parse_pool)
+
+        try:
+            fill_parse_queue()
+            while parsing or scoring or rejected:
+                while rejected:
+                    yield rejected.pop(0)
+                done, _ = wait(list(parsing) + list(scoring), return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future in parsing:
+                        name, parse_pool = parsing.pop(future)
+                        try:
+                            _, document = future.result()
+                        except BrokenProcessPool as e:
+                            # A worker died (e.g. on a malformed PDF); the next submit starts a fresh pool
+                            if parse_pool is not own_pool:
+                                drop_singleton('batch_parse_pool', parse_pool)
+                                parse_pool.shutdown(wait=False)
+                            yield error_result(name, f"Could not read PDF file: {str(e)}")
+                            continue
+                        except Exception as e:
+                            yield error_result(name, f"Could not read PDF file: {str(e)}")
+                            continue
+                        if not document['text'] or document['text'].startswith("Error reading PDF"):
+                            yield error_result(name, 'Could not read PDF file')
+                            continue
+                        scoring[score_pool.submit(score_candidate, name, document, job_description, llm_client, enrich)] = name
+                    else:
+                        name = scoring.pop(future)
+                        try:
+                            yield future.result()
+                        except Exception as e:
+                            yield error_result(name, f"ATS analysis failed: {str(e)}")
+                fill_parse_queue()
+        finally:
+            # A batch that stops early (e.g. the client went away) leaves no parse jobs queued behind it
+            for future in parsing:
+                future.cancel()
+            if own_pool is not None:
+                own_pool.shutdown(cancel_futures=True)
+
+
+def format_jsonl(result):
+    return json.dumps(result) + "\n"
+
+
+def format_csv_row(result, header=False):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(CSV_FIELDS)
+    row = dict(result)
+    for field in ('keyword_matches', 'missing_keywords'):
+        row[field] = '; '.join(row.get(field) or [])
+    writer.writerow([row.get(field) for field in CSV_FIELDS])
+    return buffer.getvalue()
+
+
+def stream_results(results, output_format='jsonl'):
+    """Serialize results one line at a time (CSV gets its header first)"""
+    if output_format == 'csv':
+        first = True
+        for result in results:
+            yield format_csv_row(result, header=first)
+            first = False
+    else:
+        for result in results:
+            yield format_jsonl(result)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Batch ATS screening of PDF resumes against one job description")
+    parser.add_argument('--jd', required=True, help="Text file with the job description")
+    parser.add_argument('--input', required=True, help="Directory or zip archive of PDF resumes")
+    parser.add_argument('--format', choices=['jsonl', 'csv'], default='jsonl')
+    parser.add_argument('--output', help="Output file (default: stdout)")
+    parser.add_argument('--workers', type=int, default=None, help="PDF parsing processes (default: CPU count)")
+    parser.add_argument('--concurrency', type=int, default=4, help="Concurrent ATS scorings")
+    parser.add_argument('--enrich', action=argparse.BooleanOptionalAction, default=None,
+                        help="Add the LLM narrative (default: ATS_LLM_ENRICHMENT)")
+    args = parser.parse_args(argv)
+
+    with open(args.jd, encoding='utf-8') as f:
+        job_description = f.read()
+
+    out = open(args.output, 'w', newline='', encoding='utf-8') if args.output else sys.stdout
+    try:
+        results = screen_candidates(
+            iter_pdf_sources(args.input), job_description,
+            workers=args.workers, concurrency=args.concurrency, enrich=args.enrich
+        )
+        for line in stream_results(results, args.format):
+            out.write(line)
+            out.flush()
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+
+if __name__ == '__main__':
+    main()
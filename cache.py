@@ -0,0 +1,241 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+class MemoryCache:
+    """Thread-safe in-memory LRU cache with optional per-entry TTL (seconds)"""
+
+    def __init__(self, max_entries: int = 1024, ttl: float = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            value, expires_at = entry
+            if expires_at is not None and expires_at < time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def add(self, key, value, ttl: float = None) -> bool:
+        """Store the value only if the key is absent or expired; True if it was stored"""
+        ttl = ttl or self.ttl
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and (entry[1] is None or entry[1] >= now):
+                return False
+            self._data[key] = (value, now + ttl if ttl else None)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+            return True
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        return {'backend': 'memory', 'entries': len(self._data), 'hits': self.hits, 'misses': self.misses}
+
+
+class SQLiteCache:
+    """On-disk cache backed by a single SQLite table; values must be bytes or str
+
+    Expired and surplus entries are evicted every evict_every writes rather than on each
+    one, so the table may briefly hold a few more than max_entries.
+    """
+
+    evict_every = 64
+
+    def __init__(self, path: str, max_entries: int = 100000, ttl: float = None):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS cache ('
+            'key TEXT PRIMARY KEY, value BLOB, expires_at REAL, accessed_at REAL)'
+        )
+        self._conn.execute('CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed_at)')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS cache_expires ON cache (expires_at)')
+
+    def get(self, key, default=None):
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute('SELECT value, expires_at FROM cache WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return default
+            value, expires_at = row
+            if expires_at is not None and expires_at < now:
+                self._conn.execute('DELETE FROM cache WHERE key = ?', (key,))
+                self.misses += 1
+                return default
+            self._conn.execute('UPDATE cache SET accessed_at = ? WHERE key = ?', (now, key))
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        now = time.time()
+        expires_at = now + self.ttl if self.ttl else None
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO cache (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)',
+                (key, value, expires_at, now)
+            )
+            self._writes += 1
+            if self._writes % self.evict_every == 0:
+                self._evict(now)
+
+    def _evict(self, now):
+        self._conn.execute('DELETE FROM cache WHERE expires_at IS NOT NULL AND expires_at < ?', (now,))
+        count = self._conn.execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+        if count > self.max_entries:
+            self._conn.execute(
+                'DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY accessed_at LIMIT ?)',
+                (count - self.max_entries,)
+            )
+
+    def add(self, key, value, ttl: float = None) -> bool:
+        """Store the value only if the key is absent or expired; True if it was stored
+
+        Atomic across processes sharing the file, so it can serve as a claim.
+        """
+        ttl = ttl or self.ttl
+        now = time.time()
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                self._conn.execute('DELETE FROM cache WHERE key = ? AND expires_at < ?', (key, now))
+                stored = self._conn.execute(
+                    'INSERT OR IGNORE INTO cache (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)',
+                    (key, value, now + ttl if ttl else None, now)
+                ).rowcount == 1
+            except BaseException:
+                self._conn.execute('ROLLBACK')
+                raise
+            self._conn.execute('COMMIT')
+            return stored
+
+    def delete(self, key):
+        with self._lock:
+            self._conn.execute('DELETE FROM cache WHERE key = ?', (key,))
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute('DELETE FROM cache')
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+
+    def stats(self):
+        return {'backend': 'sqlite', 'entries': len(self), 'hits': self.hits, 'misses': self.misses}
+
+
+class TieredCache:
+    """Memory cache in front of an optional slower (e.g. SQLite) tier; hits in the back tier are promoted"""
+
+    def __init__(self, front: MemoryCache, back=None):
+        self.front = front
+        self.back = back
+
+    def get(self, key, default=None):
+        value = self.front.get(key)
+        if value is None and self.back is not None:
+            value = self.back.get(key)
+            if value is not None:
+                self.front.set(key, value)
+        return default if value is None else value
+
+    def set(self, key, value):
+        self.front.set(key, value)
+        if self.back is not None:
+            self.back.set(key, value)
+
+    def delete(self, key):
+        self.front.delete(key)
+        if self.back is not None:
+            self.back.delete(key)
+
+    def clear(self):
+        self.front.clear()
+        if self.back is not None:
+            self.back.clear()
+
+    def __len__(self):
+        return len(self.back) if self.back is not None else len(self.front)
+
+    def stats(self):
+        stats = {'backend': 'tiered', 'memory': self.front.stats()}
+        if self.back is not None:
+            stats['disk'] = self.back.stats()
+        return stats
+
+
+def content_hash(*parts) -> str:
+    """SHA-256 over the given parts, used as a content-addressed cache key"""
+    digest = hashlib.sha256()
+    for part in parts:
+        data = part if isinstance(part, bytes) else str(part).encode('utf-8')
+        digest.update(len(data).to_bytes(8, 'big'))
+        digest.update(data)
+    return digest.hexdigest()
+
+
+def create_cache(prefix: str, max_entries: int, ttl: float = None, path: str = None, backend: str = 'memory'):
+    """Build a cache configured through <PREFIX>_BACKEND, _PATH, _TTL and _MAX_ENTRIES
+
+    The backend is memory or sqlite (default given by backend); the other variables override
+    the defaults given here.
+    """
+    backend_name = os.getenv(f'{prefix}_BACKEND', backend).lower()
+    ttl = float(os.getenv(f'{prefix}_TTL', ttl or 0)) or None
+    max_entries = int(os.getenv(f'{prefix}_MAX_ENTRIES', max_entries))
+
+    if backend_name == 'sqlite':
+        path = os.getenv(f'{prefix}_PATH', path or f'data/{prefix.lower()}.db')
+        return SQLiteCache(path, max_entries=max_entries, ttl=ttl)
+    if backend_name == 'memory':
+        return MemoryCache(max_entries=max_entries, ttl=ttl)
+    raise ValueError(f"Unknown {prefix}_BACKEND: {backend_name}")
@@ -0,0 +1,549 @@
+"""Persistent BM25 index over parsed resumes.
+
+Resume text and metadata live in SQLite; postings are written to a flat file of
+uint32 doc ids and term frequencies that is memory-mapped on load, so opening a
+100k-resume index does not read the postings into memory. New resumes go into an
+in-memory delta segment and deletions are tombstoned until save() merges both
+into a fresh postings file.
+
+Each save writes postings.<generation>.bin and then swaps in lexicon.json, which
+names that generation and the highest doc_id it covers; the swap is the commit
+point. Doc ids only grow, so on open every stored document at or below that
+doc_id is known to be in the postings file, and a save interrupted before or
+after the swap never loads a document into the delta twice.
+
+One process writes an index directory at a time: opening it takes an exclusive
+lock on <directory>/writer.lock and raises IndexLocked if another process holds
+it. Under a pre-forking server, serve the candidate routes from a single
+worker (e.g. gunicorn -w 1 --threads 8) or give each worker its own
+CANDIDATE_INDEX_DIR.
+
+    python candidate_index.py add resumes.zip
+    python candidate_index.py search --jd job.txt --top 50
+    python candidate_index.py bench --docs 100000      # synthetic add/save/search timings
+"""
+import argparse
+import heapq
+import json
+import math
+import mmap
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import zlib
+from array import array
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from typing import Dict, List
+
+from ats_engine import STOPWORDS, extract_keywords, raw_tokens, stem
+
+try:
+    import fcntl
+except ImportError:  # Windows: the single-writer lock is not enforced
+    fcntl = None
+
+K1 = 1.2
+B = 0.75
+
+
+def index_terms(text: str) -> Counter:
+    # Same terms as tokenize(), but each distinct token is stemmed once
+    terms = Counter()
+    for token, tf in Counter(raw_tokens(text)).items():
+        term = stem(token)
+        if term not in STOPWORDS and len(term) > 1:
+            terms[term] = terms.get(term, 0) + tf
+    return terms
+
+
+def query_terms(job_description: str, top_k: int = 60) -> Dict[str, float]:
+    """Weight query terms by the strongest JD keyword phrase they appear in"""
+    weights = {}
+    for phrase, weight in extract_keywords(job_description, top_k):
+        for token in phrase.split():
+            weights[token] = max(weights.get(token, 0.0), weight)
+    return weights
+
+
+def contains(doc_ids, doc_id) -> bool:
+    i = bisect_left(doc_ids, doc_id)
+    return i < len(doc_ids) and doc_ids[i] == doc_id
+
+
+def lookup(doc_ids, tfs, doc_id) -> int:
+    """Term frequency of doc_id in a sorted postings block, 0 if absent"""
+    i = bisect_left(doc_ids, doc_id)
+    return tfs[i] if i < len(doc_ids) and doc_ids[i] == doc_id else 0
+
+
+class IndexLocked(RuntimeError):
+    """Another process has the index directory open for writing"""
+
+
+class CandidateIndex:
+    def __init__(self, directory: str, autosave_every: int = 1000):
+        self.directory = directory
+        self.autosave_every = autosave_every
+        self._lock = threading.RLock()
+        os.makedirs(directory, exist_ok=True)
+        self._writer_lock = self._acquire_writer_lock()
+
+        self._db = sqlite3.connect(os.path.join(directory, 'documents.db'), check_same_thread=False, isolation_level=None)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        # No fsync per add. A crash may lose the last adds, which the generation check below tolerates:
+        # postings of documents that are no longer stored load as tombstones
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        # AUTOINCREMENT: a deleted doc_id may still sit in the postings file until the next save,
+        # so it must never be handed to a new document
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS documents ('
+            'doc_id INTEGER PRIMARY KEY AUTOINCREMENT, candidate_id TEXT UNIQUE, name TEXT, length INTEGER, '
+            'text BLOB, indexed INTEGER DEFAULT 0)'
+        )
+        self._migrate_autoincrement()
+
+        self._lengths = {}
+        self._ids = {}
+        self._names = {}
+        for doc_id, candidate_id, name, length in self._db.execute(
+            'SELECT doc_id, candidate_id, name, length FROM documents'
+        ):
+            self._lengths[doc_id] = length
+            self._ids[doc_id] = candidate_id
+            self._names[doc_id] = name
+        self._total_length = sum(self._lengths.values())
+
+        self._delta = defaultdict(dict)  # term -> {doc_id: tf} for documents added since the last save
+        self._pending = 0                # adds and deletes since the last save
+        self._norms = None               # doc_id -> BM25 length normalisation, rebuilt after adds and deletes
+        self._load_postings()
+        # Finish a save that stopped between swapping in the lexicon and stamping its documents
+        self._db.execute(
+            'UPDATE documents SET indexed = ? WHERE indexed = 0 AND doc_id <= ?', (self._generation, self._merged_through)
+        )
+        # Documents stored but never merged (e.g. the process stopped before save) go back into the delta
+        for doc_id, text in self._db.execute('SELECT doc_id, text FROM documents WHERE indexed = 0'):
+            self._add_to_delta(doc_id, index_terms(zlib.decompress(text).decode('utf-8')))
+
+    def _acquire_writer_lock(self):
+        lock_file = open(os.path.join(self.directory, 'writer.lock'), 'a')
+        if fcntl is not None:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                lock_file.close()
+                raise IndexLocked(f"{self.directory} is open in another process")
+        return lock_file
+
+    def _migrate_autoincrement(self):
+        """Rebuild documents tables created before doc_id used AUTOINCREMENT"""
+        (sql,) = self._db.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'documents'").fetchone()
+        if 'AUTOINCREMENT' in sql.upper():
+            return
+        self._db.execute('BEGIN')
+        self._db.execute('ALTER TABLE documents RENAME TO documents_old')
+        self._db.execute(
+            'CREATE TABLE documents ('
+            'doc_id INTEGER PRIMARY KEY AUTOINCREMENT, candidate_id TEXT UNIQUE, name TEXT, length INTEGER, '
+            'text BLOB, indexed INTEGER DEFAULT 0)'
+        )
+        self._db.execute('INSERT INTO documents SELECT * FROM documents_old')
+        self._db.execute('DROP TABLE documents_old')
+        self._db.execute('COMMIT')
+
+    @property
+    def _lexicon_path(self):
+        return os.path.join(self.directory, 'lexicon.json')
+
+    def _postings_path(self, generation):
+        # Generation 0 is the single postings.bin of indexes saved before generations were recorded
+        name = f'postings.{generation}.bin' if generation else 'postings.bin'
+        return os.path.join(self.directory, name)
+
+    def _load_postings(self, lexicon=None):
+        """Map the postings file lexicon.json names; save() passes the lexicon it just wrote"""
+        self._lexicon = {}
+        self._mmap = None
+        self._generation = 0
+        self._merged_through = 0
+        self._tombstones = set()  # deleted doc_ids whose postings are still in the file
+        if lexicon is None:
+            if not os.path.exists(self._lexicon_path):
+                return
+            with open(self._lexicon_path, encoding='utf-8') as f:
+                lexicon = json.load(f)
+        legacy = not isinstance(lexicon.get('generation'), int)
+        if legacy:
+            self._lexicon = lexicon
+            (self._merged_through,) = self._db.execute(
+                'SELECT COALESCE(MAX(doc_id), 0) FROM documents WHERE indexed != 0'
+            ).fetchone()
+        else:
+            self._generation = lexicon['generation']
+            self._merged_through = lexicon['merged_through']
+            self._lexicon = lexicon['terms']
+        path = self._postings_path(self._generation)
+        if os.path.getsize(path) > 0:
+            with open(path, 'rb') as f:
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            view = memoryview(self._mmap)
+            if legacy:
+                # Older files do not list their documents; collect them from the postings once
+                stored = set()
+                for offset, count in self._lexicon.values():
+                    stored.update(view[offset:offset + 4 * count].cast('I'))
+            else:
+                offset, count = lexicon['docs']
+                stored = view[offset:offset + 4 * count].cast('I')
+            self._tombstones = {doc_id for doc_id in stored if doc_id not in self._lengths}
+            view.release()
+        self._remove_stale_postings()
+
+    def _remove_stale_postings(self):
+        """Delete postings files of other generations, e.g. one written by a save that never committed"""
+        current = os.path.basename(self._postings_path(self._generation))
+        for name in os.listdir(self.directory):
+            if name.startswith('postings.') and name.endswith('.bin') and name != current:
+                os.remove(os.path.join(self.directory, name))
+
+    def _base_postings(self, term):
+        """(doc_ids, tfs) views straight over the memory-mapped postings file"""
+        entry = self._lexicon.get(term)
+        if entry is None or self._mmap is None:
+            return (), ()
+        offset, count = entry[:2]
+        view = memoryview(self._mmap)[offset:offset + 8 * count].cast('I')
+        return view[:count], view[count:]
+
+    def _live_base_postings(self, term):
+        """(doc_id, tf) pairs of the postings file, skipping documents deleted since it was written"""
+        base_ids, base_tfs = self._base_postings(term)
+        if self._tombstones:
+            return [(doc_id, tf) for doc_id, tf in zip(base_ids, base_tfs) if doc_id not in self._tombstones]
+        return zip(base_ids, base_tfs)
+
+    def _add_to_delta(self, doc_id, terms):
+        for term, tf in terms.items():
+            self._delta[term][doc_id] = tf
+
+    def __len__(self):
+        return len(self._lengths)
+
+    def add(self, candidate_id: str, text: str, name: str = None) -> int:
+        """Index a resume; re-adding an existing candidate_id replaces it"""
+        with self._lock:
+            self.delete(candidate_id)
+            terms = index_terms(text)
+            length = sum(terms.values())
+            cursor = self._db.execute(
+                'INSERT INTO documents (candidate_id, name, length, text) VALUES (?, ?, ?, ?)',
+                (candidate_id, name, length, zlib.compress(text.encode('utf-8')))
+            )
+            doc_id = cursor.lastrowid
+            self._lengths[doc_id] = length
+            self._ids[doc_id] = candidate_id
+            self._names[doc_id] = name
+            self._total_length += length
+            self._norms = None
+            self._add_to_delta(doc_id, terms)
+            self._pending += 1
+            if self.autosave_every and self._pending >= self.autosave_every:
+                self.save()
+            return doc_id
+
+    def delete(self, candidate_id: str) -> bool:
+        with self._lock:
+            row = self._db.execute('SELECT doc_id FROM documents WHERE candidate_id = ?', (candidate_id,)).fetchone()
+            if row is None:
+                return False
+            doc_id = row[0]
+            self._db.execute('DELETE FROM documents WHERE doc_id = ?', (doc_id,))
+            self._total_length -= self._lengths.pop(doc_id, 0)
+            self._ids.pop(doc_id, None)
+            self._names.pop(doc_id, None)
+            self._norms = None
+            self._pending += 1
+            if doc_id <= self._merged_through:
+                self._tombstones.add(doc_id)
+            else:
+                for postings in self._delta.values():
+                    postings.pop(doc_id, None)
+            return True
+
+    def get_text(self, candidate_id: str):
+        row = self._db.execute('SELECT text FROM documents WHERE candidate_id = ?', (candidate_id,)).fetchone()
+        return zlib.decompress(row[0]).decode('utf-8') if row else None
+
+    def _length_norms(self):
+        """K1 * (1 - B + B * length / avg_length) for every live doc_id, indexed by doc_id"""
+        if self._norms is None:
+            avg_length = self._total_length / len(self._lengths) or 1.0
+            norms = [0.0] * (max(self._lengths) + 1)
+            for doc_id, length in self._lengths.items():
+                norms[doc_id] = K1 * (1 - B + B * length / avg_length)
+            self._norms = norms
+            self._min_norm = min(norms[doc_id] for doc_id in self._lengths)
+        return self._norms
+
+    def _query_postings(self, job_description, n_docs, min_norm):
+        """(score bound, weight, base doc_ids, base tfs, delta) per query term, highest bound first"""
+        terms = []
+        for term, query_weight in query_terms(job_description).items():
+            base_ids, base_tfs = self._base_postings(term)
+            delta = self._delta.get(term, {})
+            dead = sum(1 for doc_id in self._tombstones if contains(base_ids, doc_id))
+            df = len(base_ids) - dead + len(delta)
+            if not df:
+                continue
+            weight = query_weight * math.log(1 + (n_docs - df + 0.5) / (df + 0.5)) * (K1 + 1)
+            entry = self._lexicon.get(term, ())
+            max_tf = max(entry[2] if len(entry) > 2 else max(base_tfs, default=0), max(delta.values(), default=0))
+            terms.append((weight * max_tf / (max_tf + min_norm), weight, base_ids, base_tfs, delta))
+        terms.sort(key=lambda item: item[0], reverse=True)
+        return terms
+
+    def _rest_of_score(self, doc_id, terms, norms) -> float:
+        score = 0.0
+        for _, weight, base_ids, base_tfs, delta in terms:
+            tf = delta.get(doc_id) if doc_id > self._merged_through else lookup(base_ids, base_tfs, doc_id)
+            if tf:
+                score += weight * tf / (tf + norms[doc_id])
+        return score
+
+    def search(self, job_description: str, top_k: int = 50) -> List[Dict]:
+        """BM25-rank indexed resumes against a job description"""
+        with self._lock:
+            n_docs = len(self._lengths)
+            if not n_docs:
+                return []
+            norms = self._length_norms()
+            terms = self._query_postings(job_description, n_docs, self._min_norm)
+            # Term at a time, strongest terms first. threshold is a floor under the final top_k-th score
+            # (the top_k-th total of a few fully scored leaders); once the terms left cannot lift a document
+            # with no score yet above it, only documents that can still reach it are scored further.
+            remaining = sum(bound for bound, *_ in terms)
+            threshold = 0.0
+            partial = [0.0] * len(norms)
+            scores = None  # doc_id -> partial score of the documents still in the running, once pruned
+            for position, (bound, weight, base_ids, base_tfs, delta) in enumerate(terms):
+                remaining -= bound
+                if scores is None:
+                    postings = zip(base_ids, base_tfs)
+                    if self._tombstones:
+                        postings = ((doc_id, tf) for doc_id, tf in postings if doc_id not in self._tombstones)
+                    for block in (postings, delta.items()):
+                        for doc_id, tf in block:
+                            partial[doc_id] += weight * tf / (tf + norms[doc_id])
+                    if remaining <= 0:
+                        continue
+                    leaders = heapq.nlargest(2 * top_k, range(len(partial)), key=partial.__getitem__)
+                    totals = [partial[doc_id] + self._rest_of_score(doc_id, terms[position + 1:], norms)
+                              for doc_id in leaders if partial[doc_id]]
+                    if len(totals) >= top_k:
+                        threshold = max(threshold, heapq.nlargest(top_k, totals)[-1])
+                    if remaining < threshold:
+                        scores = {doc_id: score for doc_id, score in enumerate(partial)
+                                  if score and score + remaining >= threshold}
+                    continue
+                if len(scores) * 16 < len(base_ids):
+                    for doc_id, score in scores.items():
+                        tf = delta.get(doc_id) if doc_id > self._merged_through else lookup(base_ids, base_tfs, doc_id)
+                        if tf:
+                            scores[doc_id] = score + weight * tf / (tf + norms[doc_id])
+                else:
+                    for block in (zip(base_ids, base_tfs), delta.items()):
+                        for doc_id, tf in block:
+                            if doc_id in scores:
+                                scores[doc_id] += weight * tf / (tf + norms[doc_id])
+                if len(scores) > top_k and remaining > 0:
+                    threshold = max(threshold, heapq.nlargest(top_k, scores.values())[-1])
+                    scores = {doc_id: score for doc_id, score in scores.items() if score + remaining >= threshold}
+            if scores is None:
+                scores = {doc_id: score for doc_id, score in enumerate(partial) if score}
+
+            best = heapq.nlargest(top_k, scores.items(), key=lambda item: item[1])
+            return [
+                {'candidate_id': self._ids[doc_id], 'name': self._names[doc_id], 'score': round(score, 4)}
+                for doc_id, score in best
+            ]
+
+    def save(self):
+        """Merge the delta segment and tombstones into a new memory-mapped postings file"""
+        with self._lock:
+            generation = self._generation + 1
+            merged_through = max(self._merged_through, max(self._lengths, default=0))
+            lexicon = {}
+            with open(self._postings_path(generation), 'wb') as f:
+                offset = 0
+                run = None  # [start, end) of the old file still to be copied as it is
+
+                def copy_run():
+                    if run:
+                        with memoryview(self._mmap) as view:
+                            f.write(view[run[0]:run[1]])
+
+                # Old terms keep their order, so a stretch of terms the save does not touch is one copy
+                for term in [*self._lexicon, *(term for term in self._delta if term not in self._lexicon)]:
+                    entry = self._lexicon.get(term)
+                    delta = self._delta.get(term, {})
+                    if entry is not None and not delta and not self._tombstones:
+                        base_offset, base_count = entry[:2]
+                        if run and run[1] == base_offset:
+                            run[1] += 8 * base_count
+                        else:
+                            copy_run()
+                            run = [base_offset, base_offset + 8 * base_count]
+                        base_max = entry[2] if len(entry) > 2 else max(self._base_postings(term)[1])
+                        lexicon[term] = [offset, base_count, base_max]
+                        offset += 8 * base_count
+                        continue
+                    copy_run()
+                    run = None
+                    # Delta doc_ids are all newer than the postings file's, so merged blocks stay sorted
+                    delta_ids = array('I', sorted(delta))
+                    delta_tfs = array('I', (delta[doc_id] for doc_id in delta_ids))
+                    if entry is None:
+                        base_ids = base_tfs = b''
+                        base_count = base_max = 0
+                    elif self._tombstones:
+                        base = self._live_base_postings(term)
+                        base_ids = array('I', (doc_id for doc_id, _ in base))
+                        base_tfs = array('I', (tf for _, tf in base))
+                        base_count, base_max = len(base_ids), max(base_tfs, default=0)
+                    else:
+                        base_offset, base_count = entry[:2]
+                        middle = base_offset + 4 * base_count
+                        base_ids = self._mmap[base_offset:middle]
+                        base_tfs = self._mmap[middle:middle + 4 * base_count]
+                        base_max = entry[2] if len(entry) > 2 else max(array('I', base_tfs))
+                    count = base_count + len(delta_ids)
+                    if not count:
+                        continue
+                    for block in (base_ids, delta_ids, base_tfs, delta_tfs):
+                        f.write(block)
+                    lexicon[term] = [offset, count, max(base_max, max(delta_tfs, default=0))]
+                    offset += 8 * count
+                copy_run()
+                array('I', sorted(self._lengths)).tofile(f)
+                docs = [offset, len(self._lengths)]
+
+            lexicon = {'generation': generation, 'merged_through': merged_through, 'docs': docs, 'terms': lexicon}
+            tmp_lexicon = self._lexicon_path + '.tmp'
+            with open(tmp_lexicon, 'w', encoding='utf-8') as f:
+                # dumps, unlike dump, runs in the C encoder
+                f.write(json.dumps(lexicon, separators=(',', ':')))
+            os.replace(tmp_lexicon, self._lexicon_path)
+            self._db.execute(
+                'UPDATE documents SET indexed = ? WHERE indexed = 0 AND doc_id <= ?', (generation, merged_through)
+            )
+            if self._mmap is not None:
+                self._mmap.close()
+            self._delta.clear()
+            self._pending = 0
+            self._load_postings(lexicon)
+
+    def close(self):
+        with self._lock:
+            if self._mmap is not None:
+                self._mmap.close()
+                self._mmap = None
+            self._db.close()
+            self._writer_lock.close()
+
+
+def synthetic_resumes(count: int, seed: int = 0):
+    """Plain-text resumes from synthetic_corpus, for benchmarks"""
+    import random
+    from synthetic_corpus import FIRST_NAMES, LAST_NAMES, resume_lines
+
+    rng = random.Random(seed)
+    for _ in range(count):
+        name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+        main, sidebar = resume_lines(rng, name, roles=rng.randint(2, 8), bullets=rng.randint(3, 6))
+        yield name, "\n".join(main + sidebar)
+
+
+def benchmark(docs: int, queries: int = 5, seed: int = 0, autosave_every: int = 1000) -> Dict[str, float]:
+    """Seconds to add docs synthetic resumes (with autosaves), save them, and search them"""
+    import random
+    from synthetic_corpus import job_description
+
+    rng = random.Random(seed)
+    job_descriptions = [job_description(rng) for _ in range(queries)]
+    with tempfile.TemporaryDirectory() as directory:
+        index = CandidateIndex(directory, autosave_every=autosave_every)
+        try:
+            started = time.perf_counter()
+            for i, (name, text) in enumerate(synthetic_resumes(docs, seed)):
+                index.add(str(i), text, name)
+            added = time.perf_counter()
+            index.save()
+            saved = time.perf_counter()
+            for job in job_descriptions:
+                index.search(job)
+            searched = time.perf_counter()
+        finally:
+            index.close()
+    return {
+        'docs': docs,
+        'add_s': round(added - started, 3),
+        'save_s': round(saved - added, 3),
+        'search_s': round((searched - saved) / queries, 4),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Maintain and query the candidate index")
+    parser.add_argument('--index', default=os.getenv('CANDIDATE_INDEX_DIR', 'data/candidate_index'))
+    commands = parser.add_subparsers(dest='command', required=True)
+    add_parser = commands.add_parser('add', help="Index every PDF in a directory or zip archive")
+    add_parser.add_argument('input')
+    delete_parser = commands.add_parser('delete', help="Remove a candidate")
+    delete_parser.add_argument('candidate_id')
+    search_parser = commands.add_parser('search', help="Rank candidates against a job description")
+    search_parser.add_argument('--jd', required=True, help="Text file with the job description")
+    search_parser.add_argument('--top', type=int, default=50)
+    bench_parser = commands.add_parser('bench', help="Time add, save and search over synthetic resumes")
+    bench_parser.add_argument('--docs', type=int, default=100000)
+    bench_parser.add_argument('--queries', type=int, default=5)
+    bench_parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    if args.command == 'bench':
+        print(json.dumps(benchmark(args.docs, args.queries, args.seed)))
+        return
+    from batch_screen import iter_pdf_sources
+    from recruiter_core import parse_pdf_document
+    from cache import content_hash
+
+
+    index = CandidateIndex(args.index)
+    try:
+        if args.command == 'add':
+            for name, data in iter_pdf_sources(args.input):
+                if isinstance(data, Exception):
+                    print(json.dumps({'file': name, 'error': str(data)}))
+                    continue
+                document = parse_pdf_document(data)
+                if document['text'] and not document['text'].startswith("Error reading PDF"):
+                    candidate_id = content_hash(data)[:16]
+                    index.add(candidate_id, document['text'], document['candidate_name'])
+                    print(json.dumps({'file': name, 'candidate_id': candidate_id}))
+            index.save()
+        elif args.command == 'delete':
+            print(json.dumps({'deleted': index.delete(args.candidate_id)}))
+            index.save()
+        else:
+            with open(args.jd, encoding='utf-8') as f:
+                job_description = f.read()
+            for result in index.search(job_description, args.top):
+                print(json.dumps(result))
+    finally:
+        index.close()
+
+
+if __name__ == '__main__':
+    main()
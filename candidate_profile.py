@@ -0,0 +1,178 @@
+"""Compact structured profile of a candidate, extracted from resume text at upload.
+
+The profile (name, contact, roles with employers and dates, skills, degrees) is
+stored next to the resume text and rendered as a few dense lines, so prompts
+can carry the facts an interviewer needs without the full document.
+"""
+import re
+from typing import Dict, List
+
+from resume_sections import DATE_RANGE_RE, heading_kind, segment_resume
+
+EMAIL_RE = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+")
+PHONE_RE = re.compile(r"(?<![\w/])\+?\d[\d\s().-]{7,}\d(?![\w/])")
+URL_RE = re.compile(r"\b(?:https?://|www\.)?(?:linkedin\.com|github\.com|gitlab\.com)/[\w./-]+|https?://[\w./-]+", re.IGNORECASE)
+NAME_RE = re.compile(r"^[A-Z][a-zA-Z'’.-]+(?:\s+[A-Z][a-zA-Z'’.-]*){1,3}$")
+TITLE_RE = re.compile(
+    r"\b(engineer|developer|programmer|manager|analyst|scientist|designer|lead|director|consultant|intern|"
+    r"architect|specialist|administrator|officer|head|associate|coordinator|researcher|founder|owner|"
+    r"recruiter|accountant|teacher|nurse|technician|assistant|executive|president|vp)\b",
+    re.IGNORECASE
+)
+# "Engineer at Acme", "Engineer, Acme", "Acme | Engineer", "Acme — Engineer"
+ROLE_SPLIT_RE = re.compile(r"\s+at\s+|\s*[,|@]\s*|\s+[–—-]\s+")
+DEGREE_RE = re.compile(
+    r"\b(bachelor|master|doctor|ph\.?\s?d|mba|b\.?\s?sc|m\.?\s?sc|b\.?\s?s|m\.?\s?s|b\.?\s?a|m\.?\s?a|"
+    r"b\.?\s?e|m\.?\s?e|b\.?\s?tech|m\.?\s?tech|b\.?\s?eng|m\.?\s?eng|associate'?s?|diploma|a-levels?|hnd)\b",
+    re.IGNORECASE
+)
+SKILL_SPLIT_RE = re.compile(r"[,;|•·▪●\n]|\s/\s")
+# "Technical Skills: Python, Java, AWS" inside another section
+LABELLED_LIST_RE = re.compile(r"^([^:]{2,40}):\s*(\S.*)$")
+
+# Bump whenever extraction changes so cached documents get their profile re-extracted
+PROFILE_VERSION = 3
+MAX_SKILLS = 40
+# Longest headline kept; a header with more free text than this stays in prompts as it is
+MAX_HEADLINE_CHARS = 300
+CONTACT_SEPARATORS = " |,;•·-–—/()"
+MAX_ROLES = 10
+
+
+def guess_name(lines: List[str]) -> str:
+    """First line near the top that reads like a personal name"""
+    for line in lines[:8]:
+        line = line.strip()
+        if EMAIL_RE.search(line) or any(c.isdigit() for c in line):
+            continue
+        if NAME_RE.match(line) and not TITLE_RE.search(line):
+            return line
+    return ""
+
+
+def parse_role(lines: List[str]) -> Dict:
+    """Title, employer and dates from the first lines of an experience entry"""
+    dates = ""
+    header = []
+    for line in lines[:3]:
+        match = DATE_RANGE_RE.search(line)
+        if match:
+            dates = match.group(0).strip()
+            rest = (line[:match.start()] + line[match.end():]).strip(" ,|()–—-")
+            if rest:
+                header.append(rest)
+            break
+        header.append(line)
+    parts = [part.strip() for part in ROLE_SPLIT_RE.split(" | ".join(header)) if part.strip()]
+    title = next((part for part in parts if TITLE_RE.search(part)), "")
+    employer = next((part for part in parts if part != title), "")
+    return {'title': title[:80], 'employer': employer[:80], 'dates': dates}
+
+
+def parse_skills(text: str) -> List[str]:
+    skills = []
+    seen = set()
+    for line in text.splitlines():
+        # "Languages: Python, Go" -> the label is not a skill
+        if ':' in line:
+            line = line.split(':', 1)[1]
+        for skill in SKILL_SPLIT_RE.split(line):
+            skill = skill.strip(" .-*")
+            if 1 < len(skill) <= 40 and skill.lower() not in seen:
+                seen.add(skill.lower())
+                skills.append(skill)
+    return skills
+
+
+def parse_inline_skills(text: str) -> List[str]:
+    """Skills from labelled lines such as "Technical Skills: Python, Java" outside a skills section"""
+    skills = []
+    for line in text.splitlines():
+        match = LABELLED_LIST_RE.match(line.strip())
+        if match and heading_kind(match.group(1)) == 'skills':
+            skills.extend(parse_skills(match.group(2)))
+    return skills
+
+
+def header_headline(header_text: str, name: str):
+    """(headline, complete): the header's free text once name, contact and inline skills lines are set aside
+
+    complete is False when the free text was too long to keep whole.
+    """
+    rest = []
+    for line in header_text.splitlines():
+        line = line.strip()
+        if not line or line == name:
+            continue
+        match = LABELLED_LIST_RE.match(line)
+        if match and heading_kind(match.group(1)) == 'skills':
+            continue
+        if not URL_RE.sub("", PHONE_RE.sub("", EMAIL_RE.sub("", line))).strip(CONTACT_SEPARATORS):
+            continue
+        rest.append(line)
+    headline = " | ".join(rest)
+    if len(headline) > MAX_HEADLINE_CHARS:
+        return headline[:MAX_HEADLINE_CHARS].rsplit(" ", 1)[0] + " …", False
+    return headline, True
+
+
+def extract_profile(resume_text: str) -> Dict:
+    """Structured candidate profile from resume text; regexes and heuristics only, no LLM call"""
+    sections = segment_resume(resume_text)
+    lines = [line.strip() for line in resume_text.splitlines() if line.strip()]
+    top = "\n".join(lines[:15])
+
+    profile = {
+        'name': guess_name(lines),
+        'email': next(iter(EMAIL_RE.findall(top)), ""),
+        'phone': next((match.strip() for match in PHONE_RE.findall(top) if not DATE_RANGE_RE.search(match)), ""),
+        'links': list(dict.fromkeys(URL_RE.findall(top)))[:3],
+        'headline': "",
+        'roles': [],
+        'skills': [],
+        'degrees': [],
+        # Resume sections everything of which is in the profile, so prompts may leave them out
+        'covered_sections': [],
+    }
+    for section in sections:
+        if section.kind == 'header':
+            profile['headline'], complete = header_headline(section.text, profile['name'])
+            if complete:
+                profile['covered_sections'].append('header')
+        if section.kind == 'experience' and len(profile['roles']) < MAX_ROLES:
+            role = parse_role(section.text.splitlines())
+            if role['title'] or role['employer']:
+                profile['roles'].append(role)
+        elif section.kind == 'skills':
+            profile['skills'].extend(skill for skill in parse_skills(section.text) if skill not in profile['skills'])
+        elif section.kind == 'education':
+            profile['degrees'].extend(line[:120] for line in section.text.splitlines() if DEGREE_RE.search(line))
+        if section.kind != 'skills':
+            profile['skills'].extend(skill for skill in parse_inline_skills(section.text) if skill not in profile['skills'])
+    if profile['skills'] and len(profile['skills']) <= MAX_SKILLS and 'skills' in {section.kind for section in sections}:
+        profile['covered_sections'].append('skills')
+    profile['skills'] = profile['skills'][:MAX_SKILLS]
+    return profile
+
+
+def format_profile(profile: Dict) -> str:
+    """Render a profile as a few dense lines for prompts"""
+    if not profile:
+        return ""
+    lines = []
+    contact = [profile.get('name'), profile.get('email'), profile.get('phone')] + profile.get('links', [])
+    if any(contact):
+        lines.append(" | ".join(part for part in contact if part))
+    if profile.get('headline'):
+        lines.append("Headline: " + profile['headline'])
+    roles = [
+        " @ ".join(part for part in (role['title'], role['employer']) if part) + (f" ({role['dates']})" if role['dates'] else "")
+        for role in profile.get('roles', [])
+    ]
+    if roles:
+        lines.append("Roles: " + "; ".join(roles))
+    if profile.get('skills'):
+        lines.append("Skills: " + ", ".join(profile['skills']))
+    if profile.get('degrees'):
+        lines.append("Education: " + "; ".join(profile['degrees']))
+    return "\n".join(lines)
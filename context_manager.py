@@ -0,0 +1,143 @@
+"""Token-budgeted conversation context with a rolling summary.
+
+The last few turns are always sent verbatim. Older turns are folded into a
+running summary that is refreshed in a background thread, so the prompt stays
+roughly the same size however long the interview runs. Until a refresh lands,
+older turns are sent verbatim, oldest dropped first, within the budget.
+
+Summaries live in SQLite by default (CONTEXT_SUMMARY_* variables), so every
+worker process sees them, and a refresh is claimed in the same table so only
+one worker summarizes a conversation at a time.
+"""
+import json
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from cache import content_hash, create_cache
+from llm_scheduler import BACKGROUND
+from metrics import FALLBACKS
+from resilience import guarded_call
+from tokens import estimate_message_tokens, estimate_tokens
+
+SUMMARY_PROMPT = """You maintain a running summary of a job interview conversation.
+Merge the previous summary and the new turns into one concise summary (at most 200 words).
+Keep every concrete fact: questions already asked, the candidate's answers, examples, numbers,
+names, commitments and open threads. Do not add commentary."""
+
+logger = logging.getLogger(__name__)
+
+
+# Seconds a worker may hold a summary refresh before another one can take it over
+REFRESH_CLAIM_TTL = 120
+
+
+def claim_key(conversation_id) -> str:
+    return f"{conversation_id}:refreshing"
+
+
+def history_fingerprint(messages) -> str:
+    return content_hash(*(f"{m['role']}:{m['content']}" for m in messages))
+
+
+class ContextManager:
+    def __init__(self, client, budget: int = None, keep_turns: int = None, summary_max_tokens: int = 400):
+        self.client = client
+        self.budget = budget or int(os.getenv("CONTEXT_TOKEN_BUDGET", 12000))
+        self.keep_turns = keep_turns or int(os.getenv("CONTEXT_KEEP_TURNS", 6))
+        self.summary_max_tokens = summary_max_tokens
+        # Older turns are folded in batches of this many turns rather than one LLM call per turn
+        self.summary_every = int(os.getenv("CONTEXT_SUMMARY_EVERY_TURNS", 2)) * 2
+        # conversation id -> {'text', 'upto', 'fingerprint'} of the summarized history prefix
+        self.summaries = create_cache(
+            'CONTEXT_SUMMARY', max_entries=10000, ttl=24 * 3600, path='data/context_summaries.db', backend='sqlite'
+        )
+        self._executor = ThreadPoolExecutor(max_workers=int(os.getenv("SUMMARY_WORKERS", 4)))
+        self._in_flight = set()
+        self._lock = threading.Lock()
+
+    def current_summary(self, conversation_id, history):
+        """The stored summary, if it still describes a prefix of this history"""
+        data = self.summaries.get(conversation_id) if conversation_id else None
+        summary = json.loads(data) if data is not None else None
+        if summary is None or summary['upto'] > len(history):
+            return None
+        if summary['fingerprint'] != history_fingerprint(history[:summary['upto']]):
+            return None  # chat was cleared or replaced
+        return summary
+
+    def build_messages(self, system_prompt: str, history, message: str, conversation_id=None):
+        """System prompt + summary + as many turns as the budget allows + the new user message"""
+        history = [{"role": m["role"], "content": m["content"]} for m in history]
+        keep = self.keep_turns * 2
+        recent = history[-keep:] if keep else []
+        older = history[:-keep] if keep else history
+
+        summary = self.current_summary(conversation_id, history)
+        upto = summary['upto'] if summary else 0
+        unsummarized = older[upto:]
+        if conversation_id and len(unsummarized) >= self.summary_every:
+            self.refresh_summary(conversation_id, history, len(older), summary)
+
+        head = [{"role": "system", "content": system_prompt}]
+        if summary:
+            head.append({"role": "system", "content": f"## Summary of the earlier conversation:\n{summary['text']}"})
+        tail = [{"role": "user", "content": message}]
+
+        remaining = self.budget - estimate_message_tokens(head + tail)
+        kept = []
+        # Walk backwards so the newest turns win; recent turns are kept even over budget
+        for index, turn in enumerate(reversed(unsummarized + recent)):
+            cost = 4 + estimate_tokens(turn["content"])
+            if cost > remaining and index >= len(recent):
+                break
+            remaining -= cost
+            kept.append(turn)
+        kept.reverse()
+        # Never start the window on an orphaned assistant reply
+        if kept and kept[0]["role"] == "assistant" and len(kept) < len(unsummarized) + len(recent):
+            kept = kept[1:]
+        return head + kept + tail
+
+    def refresh_summary(self, conversation_id, history, upto, summary):
+        """Fold history[:upto] into the summary in the background (one refresh per conversation at a time)"""
+        with self._lock:
+            if conversation_id in self._in_flight:
+                return
+            self._in_flight.add(conversation_id)
+        # Claim the refresh in the shared table; it expires in case this worker dies mid-refresh
+        if not self.summaries.add(claim_key(conversation_id), b'1', ttl=REFRESH_CLAIM_TTL):
+            with self._lock:
+                self._in_flight.discard(conversation_id)
+            return
+        self._executor.submit(self._summarize, conversation_id, history[:upto], summary)
+
+    def _summarize(self, conversation_id, history, summary):
+        try:
+            previous = summary['text'] if summary else "(none)"
+            start = summary['upto'] if summary else 0
+            transcript = "\n".join(f"{m['role'].upper()}: {m['content']}" for m in history[start:])
+            response = guarded_call(
+                'summary',
+                self.client.chat.completions.create,
+                priority=BACKGROUND,
+                model=os.getenv("AZURE_OPENAI_DEPLOYMENT_NAME"),
+                messages=[
+                    {"role": "system", "content": SUMMARY_PROMPT},
+                    {"role": "user", "content": f"## Previous summary:\n{previous}\n\n## New turns:\n{transcript}"}
+                ],
+                max_tokens=self.summary_max_tokens
+            )
+            self.summaries.set(conversation_id, json.dumps({
+                'text': response.choices[0].message.content,
+                'upto': len(history),
+                'fingerprint': history_fingerprint(history)
+            }))
+        except Exception as e:
+            FALLBACKS.inc(step='summary_refresh')
+            logger.warning("Summary refresh failed for %s: %s", conversation_id, e)
+        finally:
+            self.summaries.delete(claim_key(conversation_id))
+            with self._lock:
+                self._in_flight.discard(conversation_id)
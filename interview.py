@@ -0,0 +1,51 @@
+import json
+
+from metrics import timed
+from recruiter_core import set_interviewer_prompt, set_candidate_prompt, candidate_context, get_context_manager
+
+
+@timed('prompt_build', route='chat')
+def build_chat_messages(state, message, conversation_id=None):
+    """Build the completion messages for the session's mode; returns (messages, error)
+
+    Older turns are folded into a rolling summary keyed by conversation_id (the session id),
+    and resumes over RESUME_CONTEXT_TOKENS only contribute their most relevant sections.
+    """
+    resume_text = state.get('resume_text', '')
+    job_description = state.get('job_description', '')
+    cover_letter_text = state.get('cover_letter_text', '')
+    candidate_name = state.get('candidate_name', 'Candidate')
+    mode = state.get('current_mode', 'job_seeker')
+    chat_history = state.get('chat_history', [])
+    
+    if not resume_text:
+        return None, 'Please upload a resume first'
+    
+    if not job_description:
+        return None, 'Please provide a job description first'
+    
+    # Long resumes are cut down to the sections relevant to this message and the job
+    resume_text, cover_letter_text, profile = candidate_context(
+        resume_text, cover_letter_text, job_description, message, state.get('candidate_profile')
+    )
+    
+    # Set system prompt based on mode
+    if mode == 'job_seeker':
+        system_prompt = set_interviewer_prompt(candidate_name, resume_text, job_description, cover_letter_text, profile)
+    else:
+        system_prompt = set_candidate_prompt(candidate_name, resume_text, job_description, cover_letter_text, profile)
+    
+    # Prepare messages within the token budget
+    messages = get_context_manager().build_messages(system_prompt, chat_history, message, conversation_id)
+    return messages, None
+
+
+def append_chat_turn(state, message, ai_response):
+    state['chat_history'] = state.get('chat_history', []) + [
+        {"role": "user", "content": message},
+        {"role": "assistant", "content": ai_response}
+    ]
+
+
+def sse_event(payload):
+    return f"data: {json.dumps(payload)}\n\n"
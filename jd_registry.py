@@ -0,0 +1,78 @@
+from typing import Callable, Dict, List, Optional, Tuple
+
+from pydantic import BaseModel
+
+from ats_engine import extract_keywords
+from cache import MemoryCache, content_hash
+from tokens import estimate_tokens
+
+
+class JobPosting(BaseModel):
+    job_id: str
+    text: str
+    normalized_text: str
+    keywords: List[Tuple[str, float]]
+    prompt_prefixes: Dict[str, str]
+    token_count: int
+    prefix_token_counts: Dict[str, int]
+    prompt_version: str = ""
+
+
+def normalize_job_description(text: str) -> str:
+    """Collapse whitespace so re-pasted copies of a posting map to the same id"""
+    return " ".join(text.split())
+
+
+def job_id_for(text: str) -> str:
+    return content_hash(normalize_job_description(text))[:16]
+
+
+class JobRegistry:
+    """Job descriptions with stable ids and their derived artifacts, computed once per posting
+
+    prompt_builders maps a prefix name (e.g. 'interviewer') to a function building that
+    prompt prefix from the job description text.
+    """
+
+    def __init__(self, backend, prompt_builders: Dict[str, Callable[[str], str]], prompt_version: str = ""):
+        self.backend = backend
+        self.prompt_builders = prompt_builders
+        self.prompt_version = prompt_version
+        # Decoded postings for hot job ids, so lookups skip JSON parsing
+        self._loaded = MemoryCache(max_entries=256)
+
+    def register(self, text: str) -> JobPosting:
+        """Return the posting for this text, building its artifacts on first sight"""
+        job_id = job_id_for(text)
+        job = self.get(job_id)
+        # Postings built with older prompt templates are rebuilt under the same id
+        if job is not None and job.prompt_version == self.prompt_version:
+            return job
+
+        prefixes = {name: build(text) for name, build in self.prompt_builders.items()}
+        job = JobPosting(
+            job_id=job_id,
+            text=text,
+            normalized_text=normalize_job_description(text),
+            keywords=extract_keywords(text),
+            prompt_prefixes=prefixes,
+            token_count=estimate_tokens(text),
+            prefix_token_counts={name: estimate_tokens(prefix) for name, prefix in prefixes.items()},
+            prompt_version=self.prompt_version
+        )
+        self.backend.set(job_id, job.model_dump_json())
+        self._loaded.set(job_id, job)
+        return job
+
+    def get(self, job_id: str) -> Optional[JobPosting]:
+        job = self._loaded.get(job_id)
+        if job is None:
+            data = self.backend.get(job_id)
+            if data is None:
+                return None
+            job = JobPosting.model_validate_json(data)
+            self._loaded.set(job_id, job)
+        return job
+
+    def stats(self):
+        return self.backend.stats()
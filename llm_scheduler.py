@@ -0,0 +1,255 @@
+"""Rate-limit-aware scheduling of LLM calls.
+
+Every chat, summary and ATS call goes through one scheduler per process. It
+keeps token buckets for the deployment's tokens-per-minute and requests-per-
+minute quotas (LLM_TPM_LIMIT, LLM_RPM_LIMIT; set them to the Azure quota divided
+by the number of worker processes), admits waiting calls in priority order so
+interactive chat turns go ahead of background summaries and batch ATS work, and
+retries 429s and transient errors with Retry-After, exponential backoff and
+jitter.
+"""
+import asyncio
+import heapq
+import itertools
+import os
+import random
+import threading
+import time
+
+from tokens import estimate_message_tokens
+
+INTERACTIVE = 0
+BACKGROUND = 1
+BATCH = 2
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+RETRYABLE_ERRORS = {'APIConnectionError', 'APITimeoutError'}
+
+
+class DeadlineExceeded(TimeoutError):
+    pass
+
+
+class QuotaTimeout(DeadlineExceeded):
+    """The deadline passed while waiting for local quota; no request was sent"""
+
+
+class TokenBucket:
+    """Refills continuously at capacity per minute; may go negative when usage is reconciled"""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.level = float(per_minute)
+        self.updated = time.monotonic()
+
+    def refill(self, now):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.capacity / 60.0)
+        self.updated = now
+
+    def wait_time(self, amount):
+        """Seconds until amount is available (0 if it is now)"""
+        amount = min(amount, self.capacity)
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) * 60.0 / self.capacity
+
+
+def retry_after(error):
+    """Server-requested delay in seconds from a rate-limit error, if any"""
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None) or {}
+    try:
+        if headers.get('retry-after-ms'):
+            return float(headers['retry-after-ms']) / 1000.0
+        if headers.get('retry-after'):
+            return float(headers['retry-after'])
+    except ValueError:
+        pass
+    return None
+
+
+def is_retryable(error):
+    return getattr(error, 'status_code', None) in RETRYABLE_STATUS or type(error).__name__ in RETRYABLE_ERRORS
+
+
+def estimate_request_tokens(kwargs, completion_estimate):
+    """Prompt estimate plus the completion cap (or a default) for a chat completion call"""
+    prompt = estimate_message_tokens(kwargs.get('messages') or [])
+    return prompt + (kwargs.get('max_tokens') or kwargs.get('max_completion_tokens') or completion_estimate)
+
+
+class LLMScheduler:
+    def __init__(self, tpm: int = None, rpm: int = None, max_retries: int = None,
+                 base_delay: float = None, max_delay: float = None, completion_estimate: int = None):
+        self.tokens = TokenBucket(tpm or int(os.getenv("LLM_TPM_LIMIT", 120000)))
+        self.requests = TokenBucket(rpm or int(os.getenv("LLM_RPM_LIMIT", 720)))
+        self.max_retries = int(os.getenv("LLM_MAX_RETRIES", 5)) if max_retries is None else max_retries
+        self.base_delay = base_delay or float(os.getenv("LLM_RETRY_BASE_DELAY", 0.5))
+        self.max_delay = max_delay or float(os.getenv("LLM_RETRY_MAX_DELAY", 30))
+        self.completion_estimate = completion_estimate or int(os.getenv("LLM_COMPLETION_ESTIMATE", 500))
+        self._cond = threading.Condition()
+        self._waiting = []              # heap of (priority, seq)
+        self._seq = itertools.count()
+        self._blocked_until = 0.0       # set from Retry-After; nobody is admitted before it
+        self.counts = {'calls': 0, 'retries': 0, 'rate_limited': 0, 'waited_seconds': 0.0}
+
+    # Admission
+
+    def _try_admit(self, ticket, amount):
+        """Admit ticket if it is first in line and the quotas allow; else seconds to wait. Caller holds the lock."""
+        now = time.monotonic()
+        if self._waiting[0] != ticket:
+            return None
+        if now < self._blocked_until:
+            return self._blocked_until - now
+        self.tokens.refill(now)
+        self.requests.refill(now)
+        wait = max(self.tokens.wait_time(amount), self.requests.wait_time(1))
+        if wait > 0:
+            return wait
+        self.tokens.level -= amount
+        self.requests.level -= 1
+        heapq.heappop(self._waiting)
+        self._cond.notify_all()
+        return 0.0
+
+    def _enqueue(self, priority):
+        ticket = (priority, next(self._seq))
+        heapq.heappush(self._waiting, ticket)
+        return ticket
+
+    def _withdraw(self, ticket):
+        if ticket in self._waiting:
+            self._waiting.remove(ticket)
+            heapq.heapify(self._waiting)
+            self._cond.notify_all()
+
+    def acquire(self, amount, priority=INTERACTIVE, deadline=None):
+        started = time.monotonic()
+        with self._cond:
+            ticket = self._enqueue(priority)
+            try:
+                while True:
+                    wait = self._try_admit(ticket, amount)
+                    if wait == 0.0:
+                        break
+                    wait = wait if wait is not None else 1.0
+                    if deadline is not None:
+                        if time.monotonic() >= deadline:
+                            raise QuotaTimeout("Timed out waiting for LLM quota")
+                        wait = min(wait, deadline - time.monotonic())
+                    # Not first in line: sleep until someone is admitted or withdraws
+                    self._cond.wait(timeout=max(wait, 0.001))
+            except BaseException:
+                self._withdraw(ticket)
+                raise
+            self.counts['waited_seconds'] += time.monotonic() - started
+
+    async def aacquire(self, amount, priority=INTERACTIVE, deadline=None):
+        started = time.monotonic()
+        with self._cond:
+            ticket = self._enqueue(priority)
+        try:
+            while True:
+                with self._cond:
+                    wait = self._try_admit(ticket, amount)
+                if wait == 0.0:
+                    break
+                if deadline is not None and time.monotonic() >= deadline:
+                    raise QuotaTimeout("Timed out waiting for LLM quota")
+                await asyncio.sleep(min(wait if wait is not None else 0.05, 0.25))
+        except BaseException:
+            with self._cond:
+                self._withdraw(ticket)
+            raise
+        with self._cond:
+            self.counts['waited_seconds'] += time.monotonic() - started
+
+    # Accounting
+
+    def reconcile(self, estimated, response):
+        """Correct the token bucket with the usage the API reported"""
+        usage = getattr(response, 'usage', None)
+        if usage is None or not getattr(usage, 'total_tokens', None):
+            return
+        with self._cond:
+            self.tokens.level += estimated - usage.total_tokens
+
+    def backoff(self, attempt, error):
+        delay = min(self.max_delay, self.base_delay * 2 ** attempt) * random.uniform(0.5, 1.0)
+        server_delay = retry_after(error)
+        with self._cond:
+            self.counts['retries'] += 1
+            if getattr(error, 'status_code', None) == 429:
+                self.counts['rate_limited'] += 1
+                if server_delay:
+                    # Everyone in this process waits out the quota window, not just this caller
+                    self._blocked_until = max(self._blocked_until, time.monotonic() + server_delay)
+                    self._cond.notify_all()
+        return max(delay, server_delay or 0.0)
+
+    # Calls
+
+    def call(self, fn, priority=INTERACTIVE, deadline=None, **kwargs):
+        """fn(**kwargs) once the quota allows, retrying rate limits and transient failures
+
+        With a deadline (time.monotonic() value), queueing, every attempt (as its request
+        timeout) and the retries all have to fit before it.
+        """
+        estimated = estimate_request_tokens(kwargs, self.completion_estimate)
+        for attempt in range(self.max_retries + 1):
+            self.acquire(estimated, priority, deadline)
+            with self._cond:
+                self.counts['calls'] += 1
+            if deadline is not None:
+                kwargs['timeout'] = max(deadline - time.monotonic(), 0.1)
+            try:
+                response = fn(**kwargs)
+            except Exception as e:
+                if attempt >= self.max_retries or not is_retryable(e):
+                    raise
+                delay = self.backoff(attempt, e)
+                if deadline is not None and time.monotonic() + delay >= deadline:
+                    raise
+                time.sleep(delay)
+                continue
+            self.reconcile(estimated, response)
+            return response
+
+    async def acall(self, fn, priority=INTERACTIVE, deadline=None, **kwargs):
+        """Async variant of call for coroutine functions such as AsyncAzureOpenAI methods"""
+        estimated = estimate_request_tokens(kwargs, self.completion_estimate)
+        for attempt in range(self.max_retries + 1):
+            await self.aacquire(estimated, priority, deadline)
+            with self._cond:
+                self.counts['calls'] += 1
+            if deadline is not None:
+                kwargs['timeout'] = max(deadline - time.monotonic(), 0.1)
+            try:
+                response = await fn(**kwargs)
+            except Exception as e:
+                if attempt >= self.max_retries or not is_retryable(e):
+                    raise
+                delay = self.backoff(attempt, e)
+                if deadline is not None and time.monotonic() + delay >= deadline:
+                    raise
+                await asyncio.sleep(delay)
+                continue
+            self.reconcile(estimated, response)
+            return response
+
+    def stats(self):
+        with self._cond:
+            now = time.monotonic()
+            self.tokens.refill(now)
+            self.requests.refill(now)
+            return {
+                **self.counts,
+                'waited_seconds': round(self.counts['waited_seconds'], 3),
+                'waiting': len(self._waiting),
+                'tokens_available': int(self.tokens.level),
+                'requests_available': int(self.requests.level),
+            }
+
+
+scheduler = LLMScheduler()
@@ -0,0 +1,224 @@
+"""HTTP load test for app.py / asgi_app.py.
+
+Each virtual user runs recruiter sessions against a running server: upload a
+resume, set a job description, request the ATS analysis, then a few chat
+turns. At the end the throughput and p50/p95/p99 latency of every route are
+printed, and written as JSON with --output so runs can be compared.
+
+Run it against the mock LLM server to keep Azure quota out of it:
+
+    python mock_llm_server.py &
+    AZURE_OPENAI_ENDPOINT=http://127.0.0.1:8099 ... python app.py &
+    python load_test.py --base-url http://127.0.0.1:5000 --users 20 --duration 60
+"""
+import argparse
+import http.cookiejar
+import json
+import math
+import os
+import random
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from synthetic_corpus import resume_pdf
+
+JOB_DESCRIPTIONS = [
+    "Senior Backend Engineer. We need 5+ years of Python, Flask or Django, PostgreSQL and AWS. "
+    "Experience with Docker, Kubernetes and CI/CD pipelines is required; Redis and Terraform are a plus. "
+    "You will design REST APIs, mentor engineers and own services end to end.",
+    "Data Engineer. Build batch and streaming pipelines with Spark, Python and SQL on AWS. "
+    "Strong Pandas, data modelling and orchestration skills; Terraform and Kubernetes are nice to have.",
+    "Full Stack Developer. React and TypeScript on the front end, Python or Go services on the back end, "
+    "PostgreSQL, Docker and a habit of writing tests. Agile team, hybrid in Lahore.",
+]
+CHAT_MESSAGES = [
+    "Can you walk me through your most recent role?",
+    "Which project are you most proud of and why?",
+    "How have you used Kubernetes in production?",
+    "Tell me about a time you had to debug a performance problem.",
+    "Why are you interested in this position?",
+    "What would your first 90 days look like?",
+]
+ROUTES = ('/api/upload-resume', '/api/job-description', '/api/ats-analysis', '/api/chat')
+
+
+def percentile(samples, q):
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(q * len(ordered)) - 1))]
+
+
+class Results:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.sessions = 0
+        self._lock = threading.Lock()
+
+    def record(self, route, seconds, ok):
+        with self._lock:
+            self.latencies[route].append(seconds)
+            if not ok:
+                self.errors[route] += 1
+
+    def session_done(self):
+        with self._lock:
+            self.sessions += 1
+
+    def report(self, elapsed):
+        routes = {}
+        for route in sorted(self.latencies, key=lambda r: ROUTES.index(r) if r in ROUTES else len(ROUTES)):
+            samples = self.latencies[route]
+            routes[route] = {
+                'requests': len(samples),
+                'errors': self.errors[route],
+                'throughput_rps': round(len(samples) / elapsed, 2),
+                'p50_ms': round(percentile(samples, 0.50) * 1000, 1),
+                'p95_ms': round(percentile(samples, 0.95) * 1000, 1),
+                'p99_ms': round(percentile(samples, 0.99) * 1000, 1),
+                'max_ms': round(max(samples) * 1000, 1),
+            }
+        return {
+            'elapsed_seconds': round(elapsed, 2),
+            'sessions': self.sessions,
+            'sessions_per_second': round(self.sessions / elapsed, 3),
+            'routes': routes,
+        }
+
+
+class Client:
+    """One browser-like user: keeps the session cookie between requests"""
+
+    def __init__(self, base_url, results, timeout):
+        self.base_url = base_url.rstrip('/')
+        self.results = results
+        self.timeout = timeout
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+
+    def request(self, route, data=None, headers=None, method='GET'):
+        req = urllib.request.Request(self.base_url + route, data=data, headers=headers or {}, method=method)
+        started = time.perf_counter()
+        try:
+            with self.opener.open(req, timeout=self.timeout) as response:
+                body = response.read()
+                ok = True
+        except urllib.error.HTTPError as e:
+            body = e.read()
+            ok = False
+        except (urllib.error.URLError, OSError) as e:
+            body = str(e).encode('utf-8')
+            ok = False
+        self.results.record(route, time.perf_counter() - started, ok)
+        return ok, body
+
+    def post_json(self, route, payload):
+        return self.request(route, json.dumps(payload).encode('utf-8'), {'Content-Type': 'application/json'}, 'POST')
+
+    def upload(self, route, field, filename, data):
+        boundary = uuid.uuid4().hex
+        body = (
+            f"--{boundary}\r\nContent-Disposition: form-data; name=\"{field}\"; filename=\"{filename}\"\r\n"
+            f"Content-Type: application/pdf\r\n\r\n"
+        ).encode('utf-8') + data + f"\r\n--{boundary}--\r\n".encode('utf-8')
+        return self.request(route, body, {'Content-Type': f'multipart/form-data; boundary={boundary}'}, 'POST')
+
+
+def run_session(client: Client, rng: random.Random, resumes, chat_turns, think_time):
+    """One recruiter session: upload, job description, ATS analysis, then chat turns"""
+    def pause():
+        if think_time:
+            time.sleep(rng.uniform(0, 2 * think_time))
+
+    ok, _ = client.upload('/api/upload-resume', 'resume', 'resume.pdf', rng.choice(resumes))
+    if not ok:
+        return
+    pause()
+    client.post_json('/api/job-description', {'job_description': rng.choice(JOB_DESCRIPTIONS)})
+    pause()
+    client.request('/api/ats-analysis')
+    for message in rng.sample(CHAT_MESSAGES, min(chat_turns, len(CHAT_MESSAGES))):
+        pause()
+        client.post_json('/api/chat', {'message': message})
+    client.results.session_done()
+
+
+def load_resumes(directory, rng, count=20):
+    if not directory:
+        return [resume_pdf(rng)[0] for _ in range(count)]
+    resumes = []
+    for name in sorted(os.listdir(directory)):
+        if name.lower().endswith('.pdf'):
+            with open(os.path.join(directory, name), 'rb') as f:
+                resumes.append(f.read())
+    if not resumes:
+        raise SystemExit(f"No PDF files in {directory}")
+    return resumes
+
+
+def run_load_test(base_url, users=10, duration=60.0, chat_turns=3, think_time=0.0, resumes=None, timeout=180.0, seed=None):
+    results = Results()
+    rng = random.Random(seed)
+    resumes = resumes or load_resumes(None, rng)
+    stop_at = time.monotonic() + duration
+
+    def user(user_seed):
+        user_rng = random.Random(user_seed)
+        while time.monotonic() < stop_at:
+            # A new cookie jar per session, like a fresh recruiter
+            run_session(Client(base_url, results, timeout), user_rng, resumes, chat_turns, think_time)
+
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=users) as pool:
+        for future in [pool.submit(user, rng.random()) for _ in range(users)]:
+            future.result()
+    return results.report(time.monotonic() - started)
+
+
+def format_report(report) -> str:
+    lines = [
+        f"{report['sessions']} sessions in {report['elapsed_seconds']}s ({report['sessions_per_second']} sessions/s)",
+        f"{'route':<24}{'requests':>9}{'errors':>8}{'req/s':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}",
+    ]
+    for route, row in report['routes'].items():
+        lines.append(
+            f"{route:<24}{row['requests']:>9}{row['errors']:>8}{row['throughput_rps']:>8}"
+            f"{row['p50_ms']:>10}{row['p95_ms']:>10}{row['p99_ms']:>10}{row['max_ms']:>10}"
+        )
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test the recruiter API with scripted sessions")
+    parser.add_argument('--base-url', default='http://127.0.0.1:5000')
+    parser.add_argument('--users', type=int, default=10, help="Concurrent virtual users")
+    parser.add_argument('--duration', type=float, default=60.0, help="Seconds to keep starting new sessions")
+    parser.add_argument('--chat-turns', type=int, default=3, help="Chat messages per session")
+    parser.add_argument('--think-time', type=float, default=0.0, help="Mean seconds a user pauses between requests")
+    parser.add_argument('--resumes', help="Directory of PDF resumes, e.g. data/corpus/resumes (default: generated on the fly)")
+    parser.add_argument('--timeout', type=float, default=180.0, help="Per-request timeout in seconds")
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--output', help="Write the report as JSON to this file")
+    args = parser.parse_args(argv)
+
+    resumes = load_resumes(args.resumes, random.Random(args.seed))
+    report = run_load_test(
+        args.base_url, users=args.users, duration=args.duration, chat_turns=args.chat_turns,
+        think_time=args.think_time, resumes=resumes, timeout=args.timeout, seed=args.seed
+    )
+    print(format_report(report))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    if not report['routes']:
+        sys.exit("No requests completed; is the server running?")
+
+
+if __name__ == '__main__':
+    main()
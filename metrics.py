@@ -0,0 +1,225 @@
+"""Timing spans, counters and Prometheus-style text exposition.
+
+Steps worth watching (PDF parsing, session load/save, prompt assembly, every
+LLM call) are wrapped in spans. Each span is observed into the
+recruiter_span_seconds histogram, and inside a request it is also kept in that
+request's span list. The web apps turn that list into a Server-Timing header,
+so one slow request shows where its time went. LLM token usage is counted per
+route. app.py and asgi_app.py serve everything at /metrics. The Gradio app
+serves it on METRICS_PORT when that is set.
+"""
+import functools
+import inspect
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def escape_label(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_labels(labels) -> str:
+    pairs = [f'{name}="{escape_label(value)}"' for name, value in labels if value not in (None, '')]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    def __init__(self, name, documentation):
+        self.name = name
+        self.documentation = documentation
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = sorted(self._values.items())
+        lines.extend(f"{self.name}{format_labels(key)} {value}" for key, value in values)
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, documentation, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}   # labels -> [per-bucket counts, sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = sorted((key, (list(counts), total, count)) for key, (counts, total, count) in self._series.items())
+        for key, (counts, total, count) in series:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f"{self.name}_bucket{format_labels(key + (('le', repr(bound)),))} {cumulative}")
+            lines.append(f"{self.name}_bucket{format_labels(key + (('le', '+Inf'),))} {count}")
+            lines.append(f"{self.name}_sum{format_labels(key)} {round(total, 6)}")
+            lines.append(f"{self.name}_count{format_labels(key)} {count}")
+        return lines
+
+
+REQUEST_SECONDS = Histogram('recruiter_http_request_seconds', "HTTP request latency by endpoint, method and status")
+EVENT_SECONDS = Histogram('recruiter_gradio_event_seconds', "Gradio event handler latency by handler")
+SPAN_SECONDS = Histogram('recruiter_span_seconds', "Time spent in an instrumented step")
+LLM_CALLS = Counter('recruiter_llm_calls_total', "LLM calls by route and outcome")
+LLM_TOKENS = Counter('recruiter_llm_tokens_total', "Tokens reported in LLM response usage, by route and kind")
+FALLBACKS = Counter('recruiter_fallbacks_total', "Failed steps that fell back to a degraded path, by step")
+REGISTRY = [REQUEST_SECONDS, EVENT_SECONDS, SPAN_SECONDS, LLM_CALLS, LLM_TOKENS, FALLBACKS]
+
+# Spans recorded during the current request or Gradio event, as (name, seconds)
+_request_spans = ContextVar('request_spans', default=None)
+
+
+def record_span(name, seconds, **labels):
+    SPAN_SECONDS.observe(seconds, span=name, **labels)
+    spans = _request_spans.get()
+    if spans is not None:
+        spans.append((name, seconds))
+
+
+@contextmanager
+def span(name, **labels):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_span(name, time.perf_counter() - started, **labels)
+
+
+def timed(name, **labels):
+    """Decorator recording a span around every call of the function"""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name, **labels):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def begin_request():
+    """Start collecting spans for the request handled in this context; returns the start time"""
+    _request_spans.set([])
+    return time.perf_counter()
+
+
+def request_spans():
+    """The list the current request's spans go to (None outside a request)
+
+    A streamed response body keeps appending to it after the headers are sent,
+    so pass it to end_request once the body is done.
+    """
+    return _request_spans.get()
+
+
+def end_request(started, endpoint, method, status, spans=None):
+    """Observe the request latency; returns the spans it recorded"""
+    REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint=endpoint, method=method, status=status)
+    if spans is None:
+        spans = _request_spans.get() or []
+    _request_spans.set(None)
+    return spans
+
+
+def server_timing(spans) -> str:
+    """Server-Timing header value with the total milliseconds per span name"""
+    totals = {}
+    for name, seconds in spans:
+        totals[name] = totals.get(name, 0.0) + seconds
+    return ", ".join(f"{name};dur={seconds * 1000:.1f}" for name, seconds in totals.items())
+
+
+def instrument_event(handler):
+    """Decorator for Gradio event handlers (plain or generator): latency plus the event's spans"""
+    def decorator(fn):
+        if inspect.isgeneratorfunction(fn):
+            @functools.wraps(fn)
+            def generator_wrapper(*args, **kwargs):
+                started = begin_request()
+                try:
+                    yield from fn(*args, **kwargs)
+                finally:
+                    EVENT_SECONDS.observe(time.perf_counter() - started, handler=handler)
+                    _request_spans.set(None)
+            return generator_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            started = begin_request()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                EVENT_SECONDS.observe(time.perf_counter() - started, handler=handler)
+                _request_spans.set(None)
+        return wrapper
+    return decorator
+
+
+def observe_tokens(route, usage):
+    """Count the prompt, cached and completion tokens of a response usage block (object or dict)"""
+    if usage is None:
+        return
+    get = usage.get if isinstance(usage, dict) else lambda field, default=None: getattr(usage, field, default)
+    details = get('prompt_tokens_details')
+    cached = (details.get('cached_tokens') if isinstance(details, dict) else getattr(details, 'cached_tokens', None)) if details else None
+    LLM_TOKENS.inc(get('prompt_tokens') or 0, route=route, kind='prompt')
+    LLM_TOKENS.inc(cached if cached is not None else get('cached_tokens') or 0, route=route, kind='cached')
+    LLM_TOKENS.inc(get('completion_tokens') or 0, route=route, kind='completion')
+
+
+def render() -> str:
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.split('?')[0].rstrip('/') != '/metrics':
+            self.send_error(404)
+            return
+        data = render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def start_http_server(port, host='0.0.0.0'):
+    """Serve /metrics from a daemon thread, for processes without a web framework of their own"""
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='metrics-server', daemon=True).start()
+    return server
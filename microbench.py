@@ -0,0 +1,202 @@
+"""Micro-benchmarks for the non-LLM hot paths, with stored baselines.
+
+Runs over a synthetic corpus (see synthetic_corpus.py) and times, per document:
+read_pdf, extract_name_from_resume, extract_profile, the interviewer and
+candidate system prompts (the memoized head rebuilt on every call), and
+session encode/decode.
+
+    python microbench.py --save-baseline          # record microbench_baseline.json
+    python microbench.py --compare                # report against it; exit 1 on regressions
+
+Timings are the median of --repeat runs; a benchmark regresses when it is more
+than --threshold times slower than its baseline. Baselines are only comparable
+on the same machine and Python version, which are stored alongside them.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+
+from synthetic_corpus import generate_corpus
+
+DEFAULT_BASELINE = 'microbench_baseline.json'
+
+
+def measure(fn, items, repeat=7, min_time=0.05):
+    """Median and best seconds per item of fn(item) over items"""
+    loops = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(loops):
+            for item in items:
+                fn(item)
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_time:
+            break
+        loops *= 2
+    runs = [elapsed]
+    for _ in range(repeat - 1):
+        started = time.perf_counter()
+        for _ in range(loops):
+            for item in items:
+                fn(item)
+        runs.append(time.perf_counter() - started)
+    per_item = [run / (loops * len(items)) for run in runs]
+    return statistics.median(per_item), min(per_item)
+
+
+def load_corpus(directory):
+    with open(os.path.join(directory, 'manifest.json'), encoding='utf-8') as f:
+        manifest = json.load(f)
+
+    def read(entry, mode='rb'):
+        with open(os.path.join(directory, entry['file']), mode, **({} if 'b' in mode else {'encoding': 'utf-8'})) as f:
+            return f.read()
+
+    return {
+        'resumes': [read(entry) for entry in manifest['resumes']],
+        'cover_letters': [read(entry) for entry in manifest['cover_letters']],
+        'jds': [read(entry, 'r') for entry in manifest['jds']],
+    }
+
+
+def session_state(resume, cover_letter, job_description, turns=20):
+    from session_store import new_session_state
+
+    state = new_session_state()
+    state.update({
+        'candidate_name': resume['name'],
+        'candidate_profile': resume['profile'],
+        'resume_text': resume['text'],
+        'cover_letter_text': cover_letter,
+        'job_description': job_description,
+        'chat_history': [
+            {'role': role, 'content': f"Turn {i}: " + resume['text'][i * 40:i * 40 + 400]}
+            for i in range(turns) for role in ('user', 'assistant')
+        ],
+    })
+    return state
+
+
+def run_benchmarks(corpus, repeat=7, only=None):
+    """{name: {'median_us', 'best_us', 'items'}} for every benchmark (or those named in only)"""
+    from candidate_profile import extract_profile, format_profile
+    from recruiter_core import (
+        candidate_prompt_head, extract_name_from_resume, interviewer_prompt_head, read_pdf, set_candidate_prompt,
+        set_interviewer_prompt
+    )
+    from session_store import SessionStore
+
+    resume_texts = [read_pdf(data) for data in corpus['resumes']]
+    cover_texts = [read_pdf(data) for data in corpus['cover_letters']] or [""]
+    jds = corpus['jds']
+    resumes = [
+        {'text': text, 'name': extract_name_from_resume(text), 'profile': extract_profile(text)}
+        for text in resume_texts
+    ]
+    # Every resume paired with a job description and (round robin) a cover letter
+    prompt_args = [
+        (resume['name'], resume['text'], jds[i % len(jds)], cover_texts[i % len(cover_texts)], format_profile(resume['profile']))
+        for i, resume in enumerate(resumes)
+    ]
+    states = [session_state(resume, cover_texts[i % len(cover_texts)], jds[i % len(jds)]) for i, resume in enumerate(resumes)]
+    encoded = [SessionStore.encode(state) for state in states]
+
+    benchmarks = {
+        'read_pdf/resume': (read_pdf, corpus['resumes']),
+        'read_pdf/cover_letter': (read_pdf, corpus['cover_letters']),
+        'extract_name_from_resume': (extract_name_from_resume, resume_texts),
+        'extract_profile': (extract_profile, resume_texts),
+        # Clearing the head cache makes every call build the whole prompt
+        'set_interviewer_prompt': (lambda args: (interviewer_prompt_head.cache_clear(), set_interviewer_prompt(*args)), prompt_args),
+        'set_candidate_prompt': (lambda args: (candidate_prompt_head.cache_clear(), set_candidate_prompt(*args)), prompt_args),
+        'session_encode': (SessionStore.encode, states),
+        'session_decode': (SessionStore.decode, encoded),
+    }
+    results = {}
+    for name, (fn, items) in benchmarks.items():
+        if not items or (only and not any(name.startswith(prefix) for prefix in only)):
+            continue
+        median, best = measure(fn, items, repeat)
+        results[name] = {'median_us': round(median * 1e6, 2), 'best_us': round(best * 1e6, 2), 'items': len(items)}
+    return results
+
+
+def environment():
+    return {'python': platform.python_version(), 'machine': platform.machine(), 'platform': platform.platform()}
+
+
+def compare(results, baseline, threshold):
+    """Report rows of (name, baseline_us, current_us, ratio, status)"""
+    rows = []
+    for name, current in results.items():
+        previous = baseline['results'].get(name)
+        if previous is None:
+            rows.append((name, None, current['median_us'], None, 'new'))
+            continue
+        ratio = current['median_us'] / previous['median_us'] if previous['median_us'] else 1.0
+        status = 'REGRESSED' if ratio > threshold else 'improved' if ratio < 1 / threshold else 'ok'
+        rows.append((name, previous['median_us'], current['median_us'], ratio, status))
+    return rows
+
+
+def format_rows(rows) -> str:
+    lines = [f"{'benchmark':<28}{'baseline us':>13}{'current us':>13}{'ratio':>8}  status"]
+    for name, previous, current, ratio, status in rows:
+        lines.append(
+            f"{name:<28}{'-' if previous is None else previous:>13}{current:>13}"
+            f"{'-' if ratio is None else f'{ratio:.2f}':>8}  {status}"
+        )
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Micro-benchmarks for PDF ingestion, prompt building and sessions")
+    parser.add_argument('--corpus', help="Corpus directory from synthetic_corpus.py (default: a temporary one)")
+    parser.add_argument('--resumes', type=int, default=30, help="Resumes in the temporary corpus")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=7)
+    parser.add_argument('--only', nargs='*', help="Run only benchmarks whose names start with these prefixes")
+    parser.add_argument('--save-baseline', nargs='?', const=DEFAULT_BASELINE, metavar='PATH')
+    parser.add_argument('--compare', nargs='?', const=DEFAULT_BASELINE, metavar='PATH')
+    parser.add_argument('--threshold', type=float, default=1.25, help="Slowdown ratio that counts as a regression")
+    args = parser.parse_args(argv)
+
+    if args.corpus:
+        corpus = load_corpus(args.corpus)
+    else:
+        with tempfile.TemporaryDirectory() as directory:
+            generate_corpus(directory, resumes=args.resumes, job_descriptions=5, seed=args.seed)
+            corpus = load_corpus(directory)
+
+    results = run_benchmarks(corpus, args.repeat, args.only)
+    regressed = False
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        if baseline.get('environment') != environment():
+            print(f"Note: baseline was recorded on {baseline.get('environment')}", file=sys.stderr)
+        rows = compare(results, baseline, args.threshold)
+        print(format_rows(rows))
+        regressed = any(row[4] == 'REGRESSED' for row in rows)
+    else:
+        print(format_rows([(name, None, row['median_us'], None, '') for name, row in results.items()]))
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w', encoding='utf-8') as f:
+            json.dump({
+                'environment': environment(),
+                'corpus': args.corpus or {'resumes': args.resumes, 'seed': args.seed},
+                'results': results
+            }, f, indent=2)
+        print(f"Baseline saved to {args.save_baseline}")
+    if regressed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,292 @@
+"""Offline stand-in for the Azure OpenAI chat completions API, for load tests.
+
+Serves any POST path ending in /chat/completions (so the Azure deployment URLs
+the SDK builds work unchanged), with non-streaming and SSE streaming replies,
+structured output for json_schema response formats, prompt-cache accounting
+in usage, and injected 429s and 5xx errors. Point the app at it with
+
+    python mock_llm_server.py --port 8099
+    AZURE_OPENAI_ENDPOINT=http://127.0.0.1:8099 AZURE_OPENAI_API_KEY=mock \
+    AZURE_OPENAI_API_VERSION=2024-08-01-preview AZURE_OPENAI_DEPLOYMENT_NAME=mock python app.py
+
+Latency is lognormal around --latency-median (time to first token) plus
+--tokens-per-second for the completion. GET /stats returns request counts.
+"""
+import argparse
+import hashlib
+import json
+import math
+import random
+import threading
+import time
+import uuid
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from tokens import estimate_message_tokens, estimate_tokens
+
+WORDS = (
+    "the candidate has strong experience with python services and cloud deployments and led a team "
+    "that shipped data pipelines on schedule while mentoring junior engineers improving test coverage "
+    "reducing latency and working closely with product managers on hiring interviews and roadmaps"
+).split()
+# Azure caches prompt prefixes from 1024 tokens, in 128-token steps
+CACHE_MIN_TOKENS = 1024
+CACHE_STEP = 128
+
+
+def filler_text(n_words: int, rng: random.Random) -> str:
+    words = [rng.choice(WORDS) for _ in range(max(1, n_words))]
+    return (" ".join(words)).capitalize() + "."
+
+
+def sample_from_schema(schema, rng, defs=None):
+    """A value that validates against a (pydantic-generated) JSON schema"""
+    defs = defs if defs is not None else schema.get('$defs', {})
+    if '$ref' in schema:
+        return sample_from_schema(defs[schema['$ref'].split('/')[-1]], rng, defs)
+    for key in ('anyOf', 'oneOf', 'allOf'):
+        if key in schema:
+            return sample_from_schema(schema[key][0], rng, defs)
+    kind = schema.get('type')
+    if kind == 'object':
+        return {name: sample_from_schema(prop, rng, defs) for name, prop in schema.get('properties', {}).items()}
+    if kind == 'array':
+        return [sample_from_schema(schema.get('items', {}), rng, defs) for _ in range(3)]
+    if kind == 'integer':
+        return rng.randint(0, 100)
+    if kind == 'number':
+        return round(rng.uniform(0, 100), 1)
+    if kind == 'boolean':
+        return True
+    if kind == 'null':
+        return None
+    return filler_text(12, rng)
+
+
+class MockLLM:
+    def __init__(self, latency_median=0.8, latency_sigma=0.5, tokens_per_second=60.0, completion_tokens=150,
+                 rate_limit_fraction=0.0, error_fraction=0.0, rpm=0, retry_after=1.0, seed=None):
+        self.latency_median = latency_median
+        self.latency_sigma = latency_sigma
+        self.tokens_per_second = tokens_per_second
+        self.completion_tokens = completion_tokens
+        self.rate_limit_fraction = rate_limit_fraction
+        self.error_fraction = error_fraction
+        self.rpm = rpm
+        self.retry_after = retry_after
+        self.rng = random.Random(seed)
+        self._recent = deque()      # request times in the last minute, for --rpm
+        self._prefixes = set()      # hashes of prompt prefixes seen, for cached_tokens
+        self._lock = threading.Lock()
+        self.counts = {'requests': 0, 'streamed': 0, 'rate_limited': 0, 'errors': 0}
+
+    def _count(self, key):
+        with self._lock:
+            self.counts[key] += 1
+
+    def first_token_delay(self):
+        with self._lock:
+            return self.latency_median * math.exp(self.rng.gauss(0, self.latency_sigma))
+
+    def rejection(self):
+        """(status, retry_after) for an injected failure, or None"""
+        now = time.monotonic()
+        with self._lock:
+            while self._recent and now - self._recent[0] > 60:
+                self._recent.popleft()
+            if self.rpm and len(self._recent) >= self.rpm:
+                return 429, max(0.1, 60 - (now - self._recent[0]))
+            self._recent.append(now)
+            roll = self.rng.random()
+        if roll < self.rate_limit_fraction:
+            return 429, self.retry_after
+        if roll < self.rate_limit_fraction + self.error_fraction:
+            return 500, None
+        return None
+
+    def usage(self, messages, completion_tokens):
+        prompt_tokens = estimate_message_tokens(messages)
+        prefix = (messages[0].get('content') or "") if messages else ""
+        prefix_tokens = estimate_tokens(prefix)
+        cached = 0
+        if prefix_tokens >= CACHE_MIN_TOKENS:
+            digest = hashlib.sha256(prefix.encode('utf-8')).hexdigest()
+            with self._lock:
+                if digest in self._prefixes:
+                    cached = prefix_tokens // CACHE_STEP * CACHE_STEP
+                self._prefixes.add(digest)
+        return {
+            'prompt_tokens': prompt_tokens,
+            'completion_tokens': completion_tokens,
+            'total_tokens': prompt_tokens + completion_tokens,
+            'prompt_tokens_details': {'cached_tokens': cached},
+        }
+
+    def content(self, body):
+        """Reply text: JSON for structured output requests, filler prose otherwise"""
+        with self._lock:
+            rng = random.Random(self.rng.random())
+        response_format = body.get('response_format') or {}
+        if response_format.get('type') == 'json_schema':
+            return json.dumps(sample_from_schema(response_format['json_schema']['schema'], rng))
+        if response_format.get('type') == 'json_object':
+            return json.dumps({'reply': filler_text(20, rng)})
+        limit = body.get('max_tokens') or body.get('max_completion_tokens') or self.completion_tokens
+        return filler_text(min(limit, self.completion_tokens), rng)
+
+
+def completion_chunk(completion_id, model, created, delta=None, finish_reason=None, usage=None):
+    choices = [] if delta is None and finish_reason is None else [
+        {'index': 0, 'delta': delta or {}, 'finish_reason': finish_reason}
+    ]
+    chunk = {'id': completion_id, 'object': 'chat.completion.chunk', 'created': created, 'model': model, 'choices': choices}
+    if usage is not None:
+        chunk['usage'] = usage
+    return chunk
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    llm: MockLLM = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, status, payload, headers=None):
+        data = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def send_chunk(self, data: bytes):
+        self.wfile.write(f"{len(data):X}\r\n".encode('ascii') + data + b"\r\n")
+        self.wfile.flush()
+
+    def do_GET(self):
+        if self.path.rstrip('/') == '/stats':
+            with self.llm._lock:
+                counts = dict(self.llm.counts)
+            self.send_json(200, counts)
+        else:
+            self.send_json(404, {'error': {'code': '404', 'message': 'Not found'}})
+
+    def do_POST(self):
+        raw = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        if not self.path.split('?')[0].endswith('/chat/completions'):
+            self.send_json(404, {'error': {'code': '404', 'message': 'Not found'}})
+            return
+        try:
+            body = json.loads(raw or b"{}")
+        except ValueError:
+            self.send_json(400, {'error': {'code': '400', 'message': 'Request body is not valid JSON'}})
+            return
+        llm = self.llm
+        llm._count('requests')
+
+        rejection = llm.rejection()
+        if rejection:
+            status, retry_after = rejection
+            if status == 429:
+                llm._count('rate_limited')
+                self.send_json(429, {'error': {'code': '429', 'message': 'Rate limit is exceeded. Try again later.'}}, {
+                    'retry-after': str(math.ceil(retry_after)),
+                    'retry-after-ms': str(int(retry_after * 1000)),
+                })
+            else:
+                llm._count('errors')
+                self.send_json(status, {'error': {'code': str(status), 'message': 'Injected server error'}})
+            return
+
+        messages = body.get('messages') or []
+        model = body.get('model') or 'mock'
+        content = llm.content(body)
+        completion_tokens = estimate_tokens(content)
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        created = int(time.time())
+        time.sleep(llm.first_token_delay())
+
+        if body.get('stream'):
+            llm._count('streamed')
+            self.stream(body, messages, model, content, completion_tokens, completion_id, created)
+            return
+        time.sleep(completion_tokens / llm.tokens_per_second)
+        self.send_json(200, {
+            'id': completion_id,
+            'object': 'chat.completion',
+            'created': created,
+            'model': model,
+            'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': content}, 'finish_reason': 'stop'}],
+            'usage': llm.usage(messages, completion_tokens),
+        })
+
+    def stream(self, body, messages, model, content, completion_tokens, completion_id, created):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+
+        def event(payload):
+            self.send_chunk(f"data: {json.dumps(payload)}\n\n".encode('utf-8'))
+
+        try:
+            event(completion_chunk(completion_id, model, created, {'role': 'assistant', 'content': ''}))
+            words = content.split(' ')
+            delay = completion_tokens / self.llm.tokens_per_second / max(1, len(words))
+            for i, word in enumerate(words):
+                time.sleep(delay)
+                event(completion_chunk(completion_id, model, created, {'content': word if i == 0 else ' ' + word}))
+            event(completion_chunk(completion_id, model, created, finish_reason='stop'))
+            if (body.get('stream_options') or {}).get('include_usage'):
+                event(completion_chunk(completion_id, model, created, usage=self.llm.usage(messages, completion_tokens)))
+            self.send_chunk(b"data: [DONE]\n\n")
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            # The client hung up (e.g. a hedged request lost the race)
+            self.close_connection = True
+
+
+def serve(llm: MockLLM, host='127.0.0.1', port=8099) -> ThreadingHTTPServer:
+    handler = type('BoundMockHandler', (MockHandler,), {'llm': llm})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="OpenAI-compatible mock LLM server for offline load tests")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8099)
+    parser.add_argument('--latency-median', type=float, default=0.8, help="Median seconds to the first token")
+    parser.add_argument('--latency-sigma', type=float, default=0.5, help="Lognormal spread of the first-token delay")
+    parser.add_argument('--tokens-per-second', type=float, default=60.0)
+    parser.add_argument('--completion-tokens', type=int, default=150, help="Length of free-text replies")
+    parser.add_argument('--rate-limit-fraction', type=float, default=0.0, help="Share of requests answered with 429")
+    parser.add_argument('--error-fraction', type=float, default=0.0, help="Share of requests answered with 500")
+    parser.add_argument('--rpm', type=int, default=0, help="Answer 429 above this many requests per minute (0: no quota)")
+    parser.add_argument('--retry-after', type=float, default=1.0, help="Retry-After seconds on injected 429s")
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args(argv)
+
+    llm = MockLLM(
+        latency_median=args.latency_median, latency_sigma=args.latency_sigma,
+        tokens_per_second=args.tokens_per_second, completion_tokens=args.completion_tokens,
+        rate_limit_fraction=args.rate_limit_fraction, error_fraction=args.error_fraction,
+        rpm=args.rpm, retry_after=args.retry_after, seed=args.seed
+    )
+    server = serve(llm, args.host, args.port)
+    print(f"Mock LLM listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+"""Opt-in sampling profiler for slow or randomly sampled requests.
+
+Off unless one of these is set:
+
+    PROFILE_SAMPLE_RATE   fraction of requests to profile (e.g. 0.01)
+    PROFILE_SLOW_SECONDS  also keep any request slower than this
+    PROFILE_INTERVAL_MS   sampling interval (default 5)
+    PROFILE_DIR           where profiles are written (default data/profiles)
+
+While a profiled request runs, a background thread reads the request
+thread's stack every interval. Every kept request writes a collapsed-stack
+file (<name>.folded, one "frame;frame;frame count" line per stack, ready for
+flamegraph.pl, speedscope or inferno) and a <name>.json file with the
+duration, status and span breakdown. When disabled, start_profile returns
+None straight away.
+
+With PROFILE_SLOW_SECONDS set every request is sampled, because a request is
+only known to be slow once it finishes; requests under the threshold are
+discarded. Under asyncio (asgi_app.py) requests share the event loop
+thread, so a profile also contains samples from requests that ran at the
+same time.
+"""
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+
+SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", 0))
+SLOW_SECONDS = float(os.getenv("PROFILE_SLOW_SECONDS", 0))
+INTERVAL = float(os.getenv("PROFILE_INTERVAL_MS", 5)) / 1000.0
+PROFILE_DIR = os.getenv("PROFILE_DIR", "data/profiles")
+MAX_DEPTH = 128
+
+
+class Profile:
+    def __init__(self, thread_id: int, sampled: bool):
+        self.thread_id = thread_id
+        self.sampled = sampled
+        self.stacks = Counter()
+
+
+def frame_label(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def collapse(frame) -> str:
+    """Root-first, semicolon-separated stack of a frame"""
+    labels = []
+    while frame is not None and len(labels) < MAX_DEPTH:
+        labels.append(frame_label(frame.f_code))
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+
+class Sampler:
+    """One daemon thread sampling the stacks of every thread with an active profile"""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._active = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def add(self, profile: Profile):
+        with self._lock:
+            self._active[id(profile)] = profile
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='request-profiler', daemon=True)
+                self._thread.start()
+            self._wake.set()
+
+    def remove(self, profile: Profile):
+        """Stop sampling; no sample is added to the profile after this returns"""
+        with self._lock:
+            self._active.pop(id(profile), None)
+
+    def _run(self):
+        while True:
+            self._wake.wait()
+            with self._lock:
+                if not self._active:
+                    self._wake.clear()
+                    continue
+                frames = sys._current_frames()
+                for profile in self._active.values():
+                    frame = frames.get(profile.thread_id)
+                    if frame is not None:
+                        profile.stacks[collapse(frame)] += 1
+                del frames
+            time.sleep(self.interval)
+
+
+sampler = Sampler(INTERVAL)
+
+
+def enabled() -> bool:
+    return SAMPLE_RATE > 0 or SLOW_SECONDS > 0
+
+
+def start_profile():
+    """A Profile of the calling thread if this request is sampled or may turn out slow, else None"""
+    if not enabled():
+        return None
+    sampled = random.random() < SAMPLE_RATE
+    if not sampled and not SLOW_SECONDS:
+        return None
+    profile = Profile(threading.get_ident(), sampled)
+    sampler.add(profile)
+    return profile
+
+
+def discard_profile(profile):
+    if profile is not None:
+        sampler.remove(profile)
+
+
+def finish_profile(profile, name: str, duration: float, spans=(), **info):
+    """Stop sampling and write the profile if the request was sampled or slow; returns the .folded path or None"""
+    if profile is None:
+        return None
+    sampler.remove(profile)
+    slow = bool(SLOW_SECONDS) and duration >= SLOW_SECONDS
+    if not (profile.sampled or slow):
+        return None
+    return write_profile(profile, name, duration, spans, 'slow' if slow else 'sampled', info)
+
+
+def write_profile(profile: Profile, name, duration, spans, reason, info):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    slug = re.sub(r"[^A-Za-z0-9]+", "_", name).strip("_") or "request"
+    base = os.path.join(
+        PROFILE_DIR, f"{time.strftime('%Y%m%dT%H%M%S')}_{slug}_{int(duration * 1000)}ms_{uuid.uuid4().hex[:6]}"
+    )
+    with open(base + '.folded', 'w', encoding='utf-8') as f:
+        for stack, count in profile.stacks.most_common():
+            f.write(f"{stack} {count}\n")
+    with open(base + '.json', 'w', encoding='utf-8') as f:
+        json.dump({
+            'name': name,
+            'reason': reason,
+            'duration_ms': round(duration * 1000, 1),
+            'samples': sum(profile.stacks.values()),
+            'interval_ms': INTERVAL * 1000,
+            'spans': [{'span': span_name, 'ms': round(seconds * 1000, 1)} for span_name, seconds in spans],
+            **info
+        }, f, indent=2)
+    return base + '.folded'
@@ -0,0 +1,686 @@
+"""Import-light core shared by the Flask, ASGI and Gradio front ends.
+
+PDF reading, candidate profiles, prompts, ATS scoring and chat streaming live
+here without pulling in Gradio or autogen. The Azure OpenAI clients and the
+SQLite-backed caches and job registry are built lazily, once per process, on
+first use, so web workers start fast and each pre-forked worker opens its own
+connection pool and database connections.
+"""
+from dotenv import load_dotenv
+import asyncio
+import os
+import io
+import json
+import logging
+import threading
+import time
+from functools import lru_cache
+from typing import List, Dict, Optional
+
+from pydantic import BaseModel
+
+import ats_engine
+from cache import create_cache, content_hash, MemoryCache, SQLiteCache, TieredCache
+from jd_registry import JobRegistry
+from context_manager import ContextManager
+from resume_sections import relevant_context
+from candidate_profile import PROFILE_VERSION, extract_profile, format_profile
+from llm_scheduler import INTERACTIVE, DeadlineExceeded
+from resilience import CircuitOpenError, as_timeout, guarded_call, aguarded_call, guarded_stream, aguarded_stream, route_policy
+from metrics import FALLBACKS, observe_tokens, record_span, timed
+
+load_dotenv()  # Load environment variables from .env file
+
+logger = logging.getLogger(__name__)
+
+_singletons = {}
+_singletons_lock = threading.Lock()
+
+def singleton(name, factory):
+    """Build a process-wide object on first use"""
+    instance = _singletons.get(name)
+    if instance is None:
+        with _singletons_lock:
+            instance = _singletons.get(name)
+            if instance is None:
+                instance = _singletons[name] = factory()
+    return instance
+
+def drop_singleton(name, instance):
+    """Forget a broken process-wide object so the next singleton() call builds a new one"""
+    with _singletons_lock:
+        if _singletons.get(name) is instance:
+            del _singletons[name]
+
+# Objects a forked child inherited; kept referenced because closing an inherited
+# SQLite connection in the child is as unsafe as using it
+_inherited = []
+
+def _reset_after_fork():
+    _inherited.extend(_singletons.values())
+    _singletons.clear()
+
+# A forked worker must not share the parent's HTTP connection pools or SQLite connections
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+# The LLM scheduler is the only retry layer: SDK retries would bypass its quota buckets and
+# multiply every attempt past the route deadline
+def create_client():
+    import openai
+    return openai.AzureOpenAI(
+        api_version=os.getenv("AZURE_OPENAI_API_VERSION"),
+        api_key=os.getenv("AZURE_OPENAI_API_KEY"),
+        azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT"),
+        max_retries=0
+    )
+
+def create_async_client():
+    """Shared async client for the ASGI app; its connection pool is reused by every request"""
+    import httpx
+    import openai
+    return openai.AsyncAzureOpenAI(
+        api_version=os.getenv("AZURE_OPENAI_API_VERSION"),
+        api_key=os.getenv("AZURE_OPENAI_API_KEY"),
+        azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT"),
+        max_retries=0,
+        http_client=openai.DefaultAsyncHttpxClient(
+            limits=httpx.Limits(
+                max_connections=int(os.getenv("LLM_MAX_CONNECTIONS", 500)),
+                max_keepalive_connections=int(os.getenv("LLM_MAX_KEEPALIVE_CONNECTIONS", 100)),
+                keepalive_expiry=30
+            ),
+            timeout=httpx.Timeout(float(os.getenv("LLM_TIMEOUT", 120)), connect=10.0)
+        )
+    )
+
+def create_az_model_client():
+    from autogen_ext.models.openai import AzureOpenAIChatCompletionClient
+    return AzureOpenAIChatCompletionClient(
+        azure_deployment=os.getenv("AZURE_OPENAI_DEPLOYMENT_NAME"),
+        model=os.getenv("AZURE_OPENAI_MODEL"),
+        api_version=os.getenv("AZURE_OPENAI_API_VERSION"),
+        azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT"),
+        api_key=os.getenv("AZURE_OPENAI_API_KEY"),
+    )
+
+def get_client():
+    return singleton('client', create_client)
+
+def get_async_client():
+    return singleton('async_client', create_async_client)
+
+def get_az_model_client():
+    return singleton('az_model_client', create_az_model_client)
+
+def get_context_manager():
+    """Keeps per-turn prompts within CONTEXT_TOKEN_BUDGET by summarizing older turns"""
+    return singleton('context_manager', lambda: ContextManager(get_client()))
+
+def set_env():
+    """(az_model_client, client); prefer the get_* accessors, which skip autogen. The async client is get_async_client()"""
+    return get_az_model_client(), get_client()
+
+@timed('read_pdf')
+def read_pdf(source):
+    """Extract text from a PDF given a file path, raw bytes or a binary file object"""
+    try:
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            source = io.BytesIO(source)
+        from PyPDF2 import PdfReader
+        reader = PdfReader(source)
+        # Join once instead of growing the string page by page
+        return "".join(f"{page.extract_text() or ''}\n" for page in reader.pages)
+    except Exception as e:
+        return f"Error reading PDF: {str(e)}"
+
+def extract_name_from_resume(resume_text):
+    """Extract name from resume text using simple heuristics"""
+    try:
+        lines = resume_text.strip().split('\n')
+        # Usually the name is in the first few lines
+        for line in lines[:5]:
+            line = line.strip()
+            if len(line) > 2 and len(line) < 50:
+                # Check if it looks like a name (not email, phone, address)
+                if not any(char in line for char in ['@', '.com', '+', 'www', 'http']):
+                    if not line.isupper() and not line.islower():  # Mixed case suggests name
+                        return line
+        return "Candidate"  # Default if can't extract
+    except:
+        return "Candidate"
+
+# Parsed PDFs keyed by the SHA-256 of the uploaded bytes; set DOCUMENT_CACHE_PATH to add an on-disk tier
+def create_document_cache():
+    return TieredCache(
+        MemoryCache(max_entries=int(os.getenv("DOCUMENT_CACHE_MAX_ENTRIES", 256))),
+        SQLiteCache(os.getenv("DOCUMENT_CACHE_PATH")) if os.getenv("DOCUMENT_CACHE_PATH") else None
+    )
+
+def get_document_cache():
+    return singleton('document_cache', create_document_cache)
+
+def parse_pdf_document(data: bytes) -> dict:
+    """Extract text, detected name and candidate profile from PDF bytes, reusing earlier parses of the same file"""
+    key = content_hash(data)
+    cached = get_document_cache().get(key)
+    if cached is not None:
+        document = json.loads(cached)
+        if document.get('profile_version') != PROFILE_VERSION:
+            document['profile'] = extract_profile(document['text'])
+            document['profile_version'] = PROFILE_VERSION
+        return document
+    
+    text = read_pdf(data)
+    profile = extract_profile(text)
+    document = {
+        'text': text,
+        'candidate_name': profile['name'] or extract_name_from_resume(text),
+        'profile': profile,
+        'profile_version': PROFILE_VERSION
+    }
+    if text and not text.startswith("Error reading PDF"):
+        get_document_cache().set(key, json.dumps(document))
+    return document
+
+class ATSAnalysis(BaseModel):
+    ats_score: int  # 0-100
+    keyword_matches: List[str]
+    missing_keywords: List[str]
+    recommendations: List[str]
+    strengths: List[str]
+    weaknesses: List[str]
+
+class ATSNarrative(BaseModel):
+    """The part of an ATS analysis the LLM contributes; score and keywords stay local"""
+    assessment: str
+    recommendations: List[str]
+    strengths: List[str]
+    weaknesses: List[str]
+
+class InterviewEvaluation(BaseModel):
+    is_acceptable: bool
+    feedback: str
+    professionalism_score: int  # 1-10
+    relevance_score: int  # 1-10
+
+# Bump whenever the prompt templates change so stored prompt prefixes are rebuilt
+PROMPT_VERSION = "3"
+
+# Bump whenever build_ats_prompt or the ats_engine scoring change so cached results are not reused
+ATS_PROMPT_VERSION = "9"
+
+# Results of calculate_ats_score keyed by resume/JD content (ATS_CACHE_* env vars select the backend)
+def get_ats_cache():
+    return singleton('ats_cache', lambda: create_cache('ATS_CACHE', max_entries=1024, ttl=7 * 24 * 3600, path='data/ats_cache.db'))
+
+def ats_llm_enrichment_enabled() -> bool:
+    return os.getenv("ATS_LLM_ENRICHMENT", "true").lower() in ("1", "true", "yes")
+
+def ats_structured_output_enabled() -> bool:
+    """Request the narrative as ATSNarrative JSON rather than free text (ATS_STRUCTURED_OUTPUT)"""
+    return os.getenv("ATS_STRUCTURED_OUTPUT", "true").lower() in ("1", "true", "yes")
+
+def ats_max_tokens() -> int:
+    return int(os.getenv("ATS_MAX_TOKENS", 400))
+
+def normalize_document(text: str) -> str:
+    """Collapse whitespace so re-extracted or re-pasted copies of a document hash the same"""
+    return " ".join(text.split())
+
+def ats_cache_key(resume_text: str, job_description: str, enrich: bool) -> str:
+    return content_hash(
+        normalize_document(resume_text),
+        normalize_document(job_description),
+        os.getenv("AZURE_OPENAI_DEPLOYMENT_NAME", "") if enrich else "local",
+        "json" if enrich and ats_structured_output_enabled() else "text",
+        ATS_PROMPT_VERSION
+    )
+
+# Process-wide token usage, to check how often the provider serves prompts from its prefix cache
+_usage_lock = threading.Lock()
+_usage_totals = {'requests': 0, 'prompt_tokens': 0, 'cached_tokens': 0, 'completion_tokens': 0}
+
+def record_usage(usage) -> Optional[Dict]:
+    """Add a response's usage block to the running totals and return it as a dict"""
+    if usage is None:
+        return None
+    details = getattr(usage, 'prompt_tokens_details', None)
+    result = {
+        'prompt_tokens': usage.prompt_tokens or 0,
+        'cached_tokens': (getattr(details, 'cached_tokens', None) or 0) if details else 0,
+        'completion_tokens': usage.completion_tokens or 0
+    }
+    with _usage_lock:
+        _usage_totals['requests'] += 1
+        for field, value in result.items():
+            _usage_totals[field] += value
+    return result
+
+def prompt_cache_stats() -> Dict:
+    with _usage_lock:
+        stats = dict(_usage_totals)
+    stats['cache_hit_rate'] = round(stats['cached_tokens'] / stats['prompt_tokens'], 4) if stats['prompt_tokens'] else 0.0
+    return stats
+
+def get_cached_ats_analysis(key: str) -> Optional[ATSAnalysis]:
+    cached = get_ats_cache().get(key)
+    return ATSAnalysis.model_validate_json(cached) if cached is not None else None
+
+def local_ats_analysis(resume_text: str, job_description: str) -> ATSAnalysis:
+    """Score the resume with the local keyword engine; no network call"""
+    keywords = get_job_registry().register(job_description).keywords
+    return ATSAnalysis(**ats_engine.analyze(resume_text, job_description, keywords=keywords))
+
+# Static instructions come first and carry no per-candidate or per-job text, so every
+# request shares the same leading tokens and provider-side prompt caching can kick in.
+ATS_INSTRUCTIONS = """You are an ATS (Applicant Tracking System) analyzer. Analyze the resume against the job description and give a brief, specific evaluation.
+
+A keyword scan has already scored the resume; do not recompute it. Please provide:
+1. An overall assessment of the candidate's fit that explains the keyword scan
+2. Specific recommendations to improve ATS score
+3. Key strengths of the resume for this position
+4. Areas of weakness or improvement
+
+Consider factors like:
+- Skills alignment
+- Experience relevance
+- Education requirements
+- Technical skills match
+- Industry-specific terms"""
+
+def ats_prompt_prefix(job_description: str) -> str:
+    """Instructions plus the job description, shared by every resume scored against it"""
+    return f"{ATS_INSTRUCTIONS}\n\n## Job Description:\n{job_description.strip()}\n"
+
+# Resume sections summarized by the candidate profile
+PROFILE_KINDS = ('header', 'skills')
+
+def profile_covered_kinds(profile: Dict) -> tuple:
+    """The PROFILE_KINDS whose whole content this profile holds (none for profiles stored before covered_sections)"""
+    covered = profile.get('covered_sections') or ()
+    return tuple(kind for kind in PROFILE_KINDS if kind in covered)
+
+@timed('prompt_build', route='ats')
+def build_ats_prompt(resume_text: str, job_description: str, analysis: ATSAnalysis, profile: Dict = None) -> str:
+    """Build the ATS narrative prompt for a resume/job description pair and its local keyword analysis
+
+    Long resumes are sent as the dense profile plus the sections most relevant to the job
+    (ATS_RESUME_TOKENS) instead of in full.
+    """
+    job = get_job_registry().register(job_description)
+    profile = profile or extract_profile(resume_text)
+    resume_slice, _ = relevant_context(
+        resume_text, "", "", job.keywords,
+        budget=int(os.getenv("ATS_RESUME_TOKENS", 1200)), covered_kinds=profile_covered_kinds(profile)
+    )
+    if resume_slice == resume_text:
+        resume_section = f"\n## Resume:\n{resume_text.strip()}\n\n"
+    else:
+        profile_text = format_profile(profile)
+        resume_section = f"\n## Candidate Profile:\n{profile_text}\n\n## Resume (sections most relevant to the job):\n{resume_slice.strip()}\n\n"
+    return job.prompt_prefixes['ats'] + resume_section + (
+        f"## Keyword Scan:\n"
+        f"- ATS Score: {analysis.ats_score}/100\n"
+        f"- Matching keywords: {', '.join(analysis.keyword_matches) or 'none'}\n"
+        f"- Missing keywords: {', '.join(analysis.missing_keywords) or 'none'}\n"
+    )
+
+def enrich_ats_analysis(analysis: ATSAnalysis, content: str) -> ATSAnalysis:
+    """Put the LLM narrative in front of the locally generated recommendations"""
+    narrative = content[:500] + "..." if len(content) > 500 else content
+    return analysis.model_copy(update={'recommendations': [narrative] + analysis.recommendations})
+
+# Sent after the (cacheable) analysis prompt to bound the length of the reply
+ATS_STRUCTURED_REQUEST = "Reply with the JSON object only: a one or two sentence assessment and at most three short items per list."
+ATS_TEXT_REQUEST = "Keep the whole answer under 120 words."
+
+def apply_ats_narrative(analysis: ATSAnalysis, narrative: ATSNarrative) -> ATSAnalysis:
+    """Merge a structured LLM narrative in front of the locally generated lists"""
+    return analysis.model_copy(update={
+        'recommendations': [narrative.assessment] + narrative.recommendations + analysis.recommendations,
+        'strengths': narrative.strengths + analysis.strengths,
+        'weaknesses': narrative.weaknesses + analysis.weaknesses
+    })
+
+def parsed_ats_narrative(response) -> Optional[ATSNarrative]:
+    """Validate a structured-output response; None if the model refused or the JSON does not fit"""
+    message = response.choices[0].message
+    if getattr(message, 'parsed', None) is not None:
+        return ATSNarrative.model_validate(message.parsed)
+    if message.content:
+        return ATSNarrative.model_validate_json(message.content)
+    return None
+
+def ats_narrative_request(prompt: str, structured: bool) -> Dict:
+    """Keyword arguments of the structured-output or free-text narrative request"""
+    request = {
+        'model': os.getenv("AZURE_OPENAI_DEPLOYMENT_NAME"),
+        'messages': [
+            {"role": "system", "content": prompt},
+            {"role": "user", "content": ATS_STRUCTURED_REQUEST if structured else ATS_TEXT_REQUEST}
+        ],
+        'max_tokens': ats_max_tokens()
+    }
+    if structured:
+        request['response_format'] = ATSNarrative
+    return request
+
+def structured_ats_result(analysis: ATSAnalysis, response) -> Optional[ATSAnalysis]:
+    record_usage(response.usage)
+    narrative = parsed_ats_narrative(response)
+    return None if narrative is None else apply_ats_narrative(analysis, narrative)
+
+def text_ats_result(analysis: ATSAnalysis, response) -> ATSAnalysis:
+    record_usage(response.usage)
+    return enrich_ats_analysis(analysis, response.choices[0].message.content)
+
+def structured_ats_failed(error: Exception):
+    FALLBACKS.inc(step='ats_structured_output')
+    logger.warning("Structured ATS output failed, falling back to free text: %s", error)
+
+def request_ats_narrative(client, prompt: str, analysis: ATSAnalysis, priority: int = INTERACTIVE) -> ATSAnalysis:
+    """Add the LLM narrative to a local analysis, as structured output when possible, else free text"""
+    if ats_structured_output_enabled():
+        try:
+            response = guarded_call(
+                'ats', client.beta.chat.completions.parse, priority=priority, **ats_narrative_request(prompt, True)
+            )
+            result = structured_ats_result(analysis, response)
+            if result is not None:
+                return result
+        except (TimeoutError, CircuitOpenError):
+            raise  # the free-text request would hit the same slow or degraded deployment
+        except Exception as e:
+            structured_ats_failed(e)
+    
+    response = guarded_call('ats', client.chat.completions.create, priority=priority, **ats_narrative_request(prompt, False))
+    return text_ats_result(analysis, response)
+
+async def arequest_ats_narrative(async_client, prompt: str, analysis: ATSAnalysis, priority: int = INTERACTIVE) -> ATSAnalysis:
+    """Async variant of request_ats_narrative"""
+    if ats_structured_output_enabled():
+        try:
+            response = await aguarded_call(
+                'ats', async_client.beta.chat.completions.parse, priority=priority, **ats_narrative_request(prompt, True)
+            )
+            result = structured_ats_result(analysis, response)
+            if result is not None:
+                return result
+        except (TimeoutError, CircuitOpenError):
+            raise
+        except Exception as e:
+            structured_ats_failed(e)
+    
+    response = await aguarded_call(
+        'ats', async_client.chat.completions.create, priority=priority, **ats_narrative_request(prompt, False)
+    )
+    return text_ats_result(analysis, response)
+
+def ats_error_result(error: Exception) -> ATSAnalysis:
+    return ATSAnalysis(
+        ats_score=0,
+        keyword_matches=[],
+        missing_keywords=[],
+        recommendations=[f"Error in analysis: {str(error)}"],
+        strengths=[],
+        weaknesses=["Could not perform analysis"]
+    )
+
+def start_ats_analysis(resume_text: str, job_description: str, enrich: bool, use_cache: bool):
+    """(cache key, analysis) before any LLM call; the key is None when the analysis is already final
+
+    That is a cache hit, or the error result when the local analysis failed.
+    """
+    key = ats_cache_key(resume_text, job_description, enrich)
+    if use_cache:
+        cached = get_cached_ats_analysis(key)
+        if cached is not None:
+            return None, cached
+    try:
+        return key, local_ats_analysis(resume_text, job_description)
+    except Exception as e:
+        return None, ats_error_result(e)
+
+def narrative_unavailable(analysis: ATSAnalysis, error: Exception) -> ATSAnalysis:
+    # Keep the local result, but don't cache it so the narrative is retried next time
+    return analysis.model_copy(update={'weaknesses': analysis.weaknesses + [f"Detailed analysis unavailable: {str(error)}"]})
+
+def calculate_ats_score(resume_text: str, job_description: str, client, use_cache: bool = True, enrich: bool = None, profile: Dict = None,
+                        priority: int = INTERACTIVE) -> ATSAnalysis:
+    """Calculate ATS score by comparing resume with job description
+
+    Score and keyword fields come from the local ats_engine. With enrich (ATS_LLM_ENRICHMENT,
+    on by default) an LLM assessment, recommendations, strengths and weaknesses are requested
+    as structured output (capped at ATS_MAX_TOKENS) and merged in front of the local ones. Pass the profile
+    stored at upload to skip re-extracting it; batch callers pass priority=BATCH so LLM calls
+    queue behind interactive ones.
+    """
+    enrich = ats_llm_enrichment_enabled() if enrich is None else enrich
+    key, analysis = start_ats_analysis(resume_text, job_description, enrich, use_cache)
+    if key is None:
+        return analysis
+    
+    if enrich:
+        try:
+            prompt = build_ats_prompt(resume_text, job_description, analysis, profile)
+            analysis = request_ats_narrative(client, prompt, analysis, priority)
+        except Exception as e:
+            return narrative_unavailable(analysis, e)
+    
+    get_ats_cache().set(key, analysis.model_dump_json())
+    return analysis
+
+async def acalculate_ats_score(resume_text: str, job_description: str, async_client, use_cache: bool = True, enrich: bool = None, profile: Dict = None,
+                               priority: int = INTERACTIVE) -> ATSAnalysis:
+    """Async variant of calculate_ats_score for the ASGI app; the local analysis runs in a worker thread"""
+    enrich = ats_llm_enrichment_enabled() if enrich is None else enrich
+    key, analysis = await asyncio.to_thread(start_ats_analysis, resume_text, job_description, enrich, use_cache)
+    if key is None:
+        return analysis
+    
+    if enrich:
+        try:
+            prompt = await asyncio.to_thread(build_ats_prompt, resume_text, job_description, analysis, profile)
+            analysis = await arequest_ats_narrative(async_client, prompt, analysis, priority)
+        except Exception as e:
+            return narrative_unavailable(analysis, e)
+    
+    await asyncio.to_thread(get_ats_cache().set, key, analysis.model_dump_json())
+    return analysis
+
+INTERVIEWER_INSTRUCTIONS = """You are a professional HR interviewer conducting an interview with the candidate described below. You are interviewing them for the position described in the job description below.
+
+Your role as the interviewer:
+- Ask relevant, thoughtful questions based on the job requirements
+- Evaluate the candidate's experience against the role requirements
+- Ask behavioral questions (STAR method)
+- Probe into specific experiences mentioned in their resume
+- Ask technical questions relevant to the role
+- Be professional, friendly, and thorough
+- Follow up on answers with deeper questions
+- Ask about motivation, career goals, and cultural fit
+
+Interview Guidelines:
+- Start with a warm introduction and overview of the role
+- Ask one question at a time
+- Build questions based on their resume and the job requirements
+- Include a mix of: experience questions, technical questions, behavioral questions, and situational questions
+- Be encouraging but thorough in your evaluation
+- End with asking if they have questions for you
+- Make your questions specific to the candidate's background and the job requirements"""
+
+CANDIDATE_INSTRUCTIONS = """You are the job candidate described below, being interviewed for a position. The person talking to you is an HR recruiter or hiring manager interviewing you for the role.
+
+Your approach as the candidate:
+- Be professional, confident, and enthusiastic about the opportunity
+- Answer questions based on the experiences in your resume
+- Provide specific examples and stories from your background
+- Show genuine interest in the role and company
+- Ask thoughtful questions when appropriate
+- Be honest about your strengths and acknowledge areas for growth
+- Use the STAR method (Situation, Task, Action, Result) for behavioral questions
+- Respond authentically as the candidate would, using specific examples from your resume"""
+
+def interviewer_prompt_prefix(job_description: str) -> str:
+    """Instructions plus the job description, shared by every candidate for the role"""
+    return f"{INTERVIEWER_INSTRUCTIONS}\n\n## Job Description (Role you're hiring for):\n{job_description.strip()}\n"
+
+@lru_cache(maxsize=1024)
+def interviewer_prompt_head(job_id: str, candidate_name: str, profile: str = "") -> str:
+    """Job prefix, name and profile: the part of the interviewer prompt that is the same on every turn"""
+    system_prompt = get_job_registry().get(job_id).prompt_prefixes['interviewer']
+    system_prompt += f"\n## Candidate's Name:\n{candidate_name}\n"
+    if profile:
+        system_prompt += f"\n## Candidate Profile:\n{profile}\n"
+    return system_prompt
+
+def set_interviewer_prompt(candidate_name: str, resume_text: str, job_description: str, cover_letter: str = "", profile: str = ""):
+    """Set system prompt for job seeker mode - AI acts as interviewer
+
+    The head is memoized per job and candidate; this turn's resume and cover letter
+    slices are appended after it.
+    """
+    system_prompt = interviewer_prompt_head(get_job_registry().register(job_description).job_id, candidate_name, profile)
+    system_prompt += f"\n## Candidate's Resume:\n{resume_text.strip()}\n"
+    if cover_letter:
+        system_prompt += f"\n## Candidate's Cover Letter:\n{cover_letter.strip()}\n"
+    return system_prompt
+
+def candidate_prompt_prefix(job_description: str) -> str:
+    """Instructions plus the job description, shared by every candidate for the role"""
+    return f"{CANDIDATE_INSTRUCTIONS}\n\n## Job Description (Position you're applying for):\n{job_description.strip()}\n"
+
+@lru_cache(maxsize=1024)
+def candidate_prompt_head(job_id: str, candidate_name: str, profile: str = "") -> str:
+    """Job prefix, name and profile: the part of the candidate prompt that is the same on every turn"""
+    system_prompt = get_job_registry().get(job_id).prompt_prefixes['candidate']
+    system_prompt += f"\n## Your Name:\n{candidate_name}\n"
+    if profile:
+        system_prompt += f"\n## Your Profile:\n{profile}\n"
+    return system_prompt
+
+def set_candidate_prompt(candidate_name: str, resume_text: str, job_description: str, cover_letter: str = "", profile: str = ""):
+    """Set system prompt for HR/recruiter mode - AI acts as the candidate
+
+    The head is memoized per job and candidate; this turn's resume and cover letter
+    slices are appended after it.
+    """
+    system_prompt = candidate_prompt_head(get_job_registry().register(job_description).job_id, candidate_name, profile)
+    system_prompt += f"\n## Your Background (Resume):\n{resume_text.strip()}\n"
+    if cover_letter:
+        system_prompt += f"\n## Your Cover Letter:\n{cover_letter.strip()}\n"
+    return system_prompt
+
+# Job descriptions with stable ids; keywords and prompt prefixes are built once per posting. Job ids
+# are handed to clients, so postings default to SQLite, shared by every worker on the host
+def create_job_registry():
+    return JobRegistry(
+        create_cache('JOB_REGISTRY', max_entries=10000, ttl=90 * 24 * 3600, path='data/job_registry.db', backend='sqlite'),
+        prompt_version=f"{PROMPT_VERSION}.{ats_engine.KEYWORDS_VERSION}",
+        prompt_builders={
+            'interviewer': interviewer_prompt_prefix,
+            'candidate': candidate_prompt_prefix,
+            'ats': ats_prompt_prefix
+        }
+    )
+
+def get_job_registry():
+    return singleton('job_registry', create_job_registry)
+
+def candidate_context(resume_text: str, cover_letter: str, job_description: str, message: str, profile: Dict = None):
+    """(resume, cover_letter, profile) text worth sending with this turn's prompt
+
+    When the documents have to be cut down, the dense profile stands in for the resume
+    header and skills sections; otherwise the full documents are sent and no profile.
+    """
+    keywords = get_job_registry().register(job_description).keywords
+    profile = profile or extract_profile(resume_text)
+    resume_slice, cover_slice = relevant_context(
+        resume_text, cover_letter, message, keywords, covered_kinds=profile_covered_kinds(profile)
+    )
+    if resume_slice == resume_text:
+        return resume_slice, cover_slice, ""
+    return resume_slice, cover_slice, format_profile(profile)
+
+def stream_usage_enabled() -> bool:
+    """Whether to ask for a final usage chunk on streamed responses (LLM_STREAM_USAGE)"""
+    return os.getenv("LLM_STREAM_USAGE", "true").lower() in ("1", "true", "yes")
+
+def chat_stream_request(messages) -> Dict:
+    """Keyword arguments of a streamed chat completion"""
+    extra = {"stream_options": {"include_usage": True}} if stream_usage_enabled() else {}
+    return {'model': os.getenv("AZURE_OPENAI_DEPLOYMENT_NAME"), 'messages': messages, 'stream': True, **extra}
+
+def chunk_delta(chunk, usage: Dict = None) -> Optional[str]:
+    """The text delta of a streamed chunk, after recording the usage the final chunk carries"""
+    if getattr(chunk, 'usage', None):
+        observe_tokens('chat_stream', chunk.usage)
+        recorded = record_usage(chunk.usage)
+        if usage is not None:
+            usage.update(recorded)
+    # Azure sends a leading chunk with content filter results and no choices
+    if not chunk.choices:
+        return None
+    return chunk.choices[0].delta.content
+
+def stream_chat_completion(client, messages, usage: Dict = None, priority: int = INTERACTIVE):
+    """Stream a chat completion, yielding text deltas as they arrive
+
+    Pass a dict as usage to have it filled with the token counts from the final chunk.
+    The scheduler sets the request timeout to the time left before the route deadline,
+    so a stream that stalls mid-reply raises DeadlineExceeded instead of hanging.
+    """
+    deadline = time.monotonic() + route_policy('chat_stream').deadline
+    stream, finish = guarded_stream(
+        'chat_stream', client.chat.completions.create, priority=priority, **chat_stream_request(messages)
+    )
+    started = time.monotonic()
+    error = None
+    try:
+        for chunk in stream:
+            if time.monotonic() > deadline:
+                stream.close()
+                raise DeadlineExceeded("Streaming reply exceeded its deadline")
+            delta = chunk_delta(chunk, usage)
+            if delta:
+                yield delta
+    except BaseException as e:
+        error = as_timeout(e)
+        if error is e:
+            raise
+        raise error from e
+    finally:
+        # The breaker and call metrics see how the stream ended, not just that it opened
+        finish(error)
+        record_span('llm_stream', time.monotonic() - started, route='chat_stream')
+
+async def astream_chat_completion(async_client, messages, usage: Dict = None, priority: int = INTERACTIVE):
+    """Async variant of stream_chat_completion; each chunk is awaited for at most the time left"""
+    deadline = time.monotonic() + route_policy('chat_stream').deadline
+    stream, finish = await aguarded_stream(
+        'chat_stream', async_client.chat.completions.create, priority=priority, **chat_stream_request(messages)
+    )
+    started = time.monotonic()
+    chunks = stream.__aiter__()
+    error = None
+    try:
+        while True:
+            try:
+                chunk = await asyncio.wait_for(chunks.__anext__(), max(deadline - time.monotonic(), 0.0))
+            except StopAsyncIteration:
+                break
+            except Exception as e:
+                if not isinstance(as_timeout(e), TimeoutError):
+                    raise
+                await stream.close()
+                raise DeadlineExceeded("Streaming reply exceeded its deadline") from e
+            delta = chunk_delta(chunk, usage)
+            if delta:
+                yield delta
+    except BaseException as e:
+        error = e
+        raise
+    finally:
+        finish(error)
+        record_span('llm_stream', time.monotonic() - started, route='chat_stream')
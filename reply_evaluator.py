@@ -0,0 +1,128 @@
+"""Tiered quality control for persona chat replies.
+
+Cheap local checks (length, persona and name consistency, refusal/off-topic
+phrases, word overlap with the source material) settle most replies. Only the
+uncertain ones, plus a random sample of locally accepted ones, go to the LLM
+judge, and every verdict is cached by (message, reply) hash.
+"""
+import json
+import os
+import random
+import re
+import threading
+from typing import Callable, NamedTuple
+
+from ats_engine import STOPWORDS, tokenize
+from cache import content_hash, create_cache
+
+AI_DISCLOSURE_RE = re.compile(
+    r"\b(as an ai|an ai (language )?model|a language model|i am an ai|i'm an ai|i am chatgpt|i'm chatgpt|"
+    r"openai|my training data|i don't have personal experiences?)\b",
+    re.IGNORECASE
+)
+REFUSAL_RE = re.compile(
+    r"\b(i can(?:no|')t (?:help|assist|answer)|i(?: am|'m) (?:not able|unable) to|i(?: am|'m) sorry, but|"
+    r"i won't be able to|that's outside)\b",
+    re.IGNORECASE
+)
+SELF_NAME_RE = re.compile(r"\b[Mm]y name is\s+([A-Z][a-z]+)")
+
+MIN_REPLY_CHARS = 15
+MAX_REPLY_WORDS = 600
+# Share of a reply's content words that must also appear in the source material, message or history
+MIN_GROUNDING = 0.35
+
+
+class Verdict(NamedTuple):
+    is_acceptable: bool
+    feedback: str
+    tier: str  # 'local', 'cache' or 'judge'
+
+
+def content_words(text: str) -> set:
+    return {token for token in tokenize(text) if token not in STOPWORDS and len(token) > 2 and token.isalpha()}
+
+
+class TieredEvaluator:
+    def __init__(self, name: str, source_text: str, judge: Callable, sample_rate: float = None):
+        """judge(reply, message, history) returns an object with is_acceptable and feedback"""
+        self.name = name
+        self.first_name = name.split()[0] if name.split() else name
+        self.source_words = content_words(f"{name}\n{source_text}")
+        self.judge = judge
+        self.sample_rate = float(os.getenv("EVAL_SAMPLE_RATE", 0.1)) if sample_rate is None else sample_rate
+        self.cache = create_cache('EVAL_CACHE', max_entries=10000, ttl=7 * 24 * 3600)
+        self.counts = {'local': 0, 'cache': 0, 'judge': 0}
+        self._lock = threading.Lock()
+
+    def early_rejection(self, reply: str, complete: bool = False):
+        """Feedback if the reply is unacceptable however it goes on, else None
+
+        Safe on a reply that is still streaming; a name at the very end is only judged once
+        the reply is complete, since it may be cut off mid-word.
+        """
+        text = reply.strip()
+        if len(text.split()) > MAX_REPLY_WORDS:
+            return f"The reply is too long; answer in under {MAX_REPLY_WORDS} words."
+        if AI_DISCLOSURE_RE.search(text):
+            return f"The reply breaks character; always answer as {self.name}."
+        for match in SELF_NAME_RE.finditer(text):
+            claimed = match.group(1)
+            if (complete or match.end() < len(text)) and claimed.lower() != self.first_name.lower():
+                return f"The reply introduces itself as {claimed}; it must speak as {self.name}."
+        return None
+
+    def local_check(self, reply: str, message: str, history):
+        """(is_acceptable, feedback) when the local rules are confident, else None"""
+        text = reply.strip()
+        if len(text) < MIN_REPLY_CHARS:
+            return False, "The reply is too short to be a useful answer."
+        rejection = self.early_rejection(text, complete=True)
+        if rejection:
+            return False, rejection
+        if REFUSAL_RE.search(text):
+            return None  # refusals can be right (unknown facts) or wrong (off-topic dodge); let the judge decide
+
+        words = content_words(text)
+        if not words:
+            return None
+        context = self.source_words | content_words(message) | content_words(
+            " ".join(turn.get("content") or "" for turn in history)
+        )
+        grounding = len(words & context) / len(words)
+        if grounding < MIN_GROUNDING:
+            return None  # little overlap with what we know about the persona: possible hallucination
+        return True, "Passed local checks."
+
+    def evaluate(self, reply: str, message: str, history) -> Verdict:
+        key = content_hash(self.name, message, reply)
+        cached = self.cache.get(key)
+        if cached is not None:
+            self._count('cache')
+            data = json.loads(cached)
+            return Verdict(data['is_acceptable'], data['feedback'], 'cache')
+
+        decision = self.local_check(reply, message, history)
+        # Locally accepted replies are still audited by the judge at the sampling rate
+        if decision is not None and not (decision[0] and random.random() < self.sample_rate):
+            verdict = Verdict(decision[0], decision[1], 'local')
+        else:
+            result = self.judge(reply, message, history)
+            if result is None:
+                # No verdict (e.g. a refusal to grade): keep the reply, and ask again next time
+                self._count('judge')
+                return Verdict(True, "The judge returned no verdict.", 'judge')
+            verdict = Verdict(bool(result.is_acceptable), result.feedback, 'judge')
+        self._count(verdict.tier)
+        self.cache.set(key, json.dumps({'is_acceptable': verdict.is_acceptable, 'feedback': verdict.feedback}))
+        return verdict
+
+    def _count(self, tier):
+        with self._lock:
+            self.counts[tier] += 1
+
+    def stats(self):
+        with self._lock:
+            counts = dict(self.counts)
+        total = sum(counts.values())
+        return {**counts, 'judge_rate': round(counts['judge'] / total, 4) if total else 0.0}
@@ -0,0 +1,334 @@
+"""Deadlines, hedged requests and a circuit breaker for LLM calls.
+
+Each call site names its route ('chat', 'chat_stream', 'ats', 'summary'); the
+route's policy comes from the environment:
+
+    LLM_DEADLINE_<ROUTE>     seconds for queueing, retries and the response (defaults below)
+    LLM_HEDGE_<ROUTE>        "true" to fire a duplicate request when the first is slow
+    LLM_HEDGE_AFTER_<ROUTE>  seconds before hedging (default: the route's observed p95)
+
+An SDK request timeout is raised as DeadlineExceeded (a TimeoutError), like a
+missed deadline. One breaker guards the deployment: after LLM_BREAKER_FAILURES
+consecutive timeouts or server errors it fails fast for LLM_BREAKER_COOLDOWN
+seconds, then lets a single trial call through.
+"""
+import asyncio
+import math
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import NamedTuple
+
+from llm_scheduler import INTERACTIVE, DeadlineExceeded, QuotaTimeout, is_retryable, scheduler
+from metrics import LLM_CALLS, observe_tokens, record_span
+
+DEFAULT_DEADLINES = {'chat': 60.0, 'chat_stream': 120.0, 'ats': 45.0, 'summary': 60.0}
+# The p95 is not trusted until a route has this many samples
+MIN_HEDGE_SAMPLES = 20
+
+
+class CircuitOpenError(RuntimeError):
+    pass
+
+
+class RoutePolicy(NamedTuple):
+    deadline: float
+    hedge: bool
+    hedge_after: float  # 0 means "use the observed p95"
+
+
+def route_policy(route: str) -> RoutePolicy:
+    name = route.upper()
+    return RoutePolicy(
+        deadline=float(os.getenv(f"LLM_DEADLINE_{name}", DEFAULT_DEADLINES.get(route, 60.0))),
+        hedge=os.getenv(f"LLM_HEDGE_{name}", "false").lower() in ("1", "true", "yes"),
+        hedge_after=float(os.getenv(f"LLM_HEDGE_AFTER_{name}", 0))
+    )
+
+
+class LatencyTracker:
+    """Recent successful call latencies per route"""
+
+    def __init__(self, window: int = 200):
+        self._samples = defaultdict(lambda: deque(maxlen=window))
+        self._lock = threading.Lock()
+
+    def record(self, route, seconds):
+        with self._lock:
+            self._samples[route].append(seconds)
+
+    def percentile(self, route, q):
+        with self._lock:
+            samples = sorted(self._samples[route])
+        if len(samples) < MIN_HEDGE_SAMPLES:
+            return None
+        return samples[min(len(samples) - 1, math.ceil(q * len(samples)) - 1)]
+
+    def snapshot(self, q):
+        with self._lock:
+            routes = list(self._samples)
+        return {route: self.percentile(route, q) for route in routes}
+
+
+class CircuitBreaker:
+    def __init__(self, failures: int = None, cooldown: float = None):
+        self.threshold = failures or int(os.getenv("LLM_BREAKER_FAILURES", 5))
+        self.cooldown = cooldown or float(os.getenv("LLM_BREAKER_COOLDOWN", 30))
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        return 'half_open' if time.monotonic() - self.opened_at >= self.cooldown else 'open'
+
+    def before_call(self) -> bool:
+        """Raise CircuitOpenError unless a call may go through; True if it is the half-open trial"""
+        with self._lock:
+            state = self.state
+            if state == 'closed':
+                return False
+            if state == 'half_open' and not self.trial_in_flight:
+                self.trial_in_flight = True
+                return True
+            retry_in = math.ceil(self.cooldown - (time.monotonic() - self.opened_at))
+        if state == 'half_open':
+            raise CircuitOpenError(
+                "The language model service is degraded; a trial request is checking whether it has recovered. "
+                "Please try again in a few seconds."
+            )
+        raise CircuitOpenError(
+            f"The language model service is degraded; not sending requests for about {max(retry_in, 1)}s. Please try again shortly."
+        )
+
+    def release_trial(self):
+        """Free the half-open slot however the trial ended (errors that say nothing about the endpoint, cancellation)"""
+        with self._lock:
+            self.trial_in_flight = False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self.trial_in_flight = False
+            if self.opened_at is not None or self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+
+
+def counts_as_failure(error):
+    """Timeouts and server-side errors of a sent request mean the endpoint is degraded
+
+    Bad requests, rate limits and timeouts waiting for our own quota (QuotaTimeout) do not.
+    """
+    if isinstance(error, QuotaTimeout):
+        return False
+    return isinstance(error, TimeoutError) or (is_retryable(error) and getattr(error, 'status_code', None) != 429)
+
+
+# The SDK's request timeout, and httpx's when it fires while a stream is being read
+SDK_TIMEOUT_ERRORS = {'APITimeoutError', 'TimeoutException'}
+
+
+def as_timeout(error):
+    """SDK timeouts are not TimeoutErrors; report them as DeadlineExceeded, pass anything else through"""
+    if any(cls.__name__ in SDK_TIMEOUT_ERRORS for cls in type(error).__mro__):
+        return DeadlineExceeded(f"LLM call timed out: {error}")
+    return error
+
+
+breaker = CircuitBreaker()
+latencies = LatencyTracker()
+_hedge_pool = ThreadPoolExecutor(max_workers=int(os.getenv("LLM_HEDGE_WORKERS", 32)))
+
+
+def discard(future):
+    """Close the losing stream of a hedged pair once it arrives"""
+    if not future.cancelled() and future.exception() is None and hasattr(future.result(), 'close'):
+        future.result().close()
+
+
+def hedge_delay(route, policy):
+    if not policy.hedge:
+        return None
+    return policy.hedge_after or latencies.percentile(route, 0.95)
+
+
+def hedged_call(fn, priority, deadline, delay, kwargs):
+    primary = _hedge_pool.submit(scheduler.call, fn, priority, deadline, **kwargs)
+    done, _ = wait([primary], timeout=max(0.0, min(delay, deadline - time.monotonic())))
+    if done:
+        return primary.result()
+    pending = {primary, _hedge_pool.submit(scheduler.call, fn, priority, deadline, **dict(kwargs))}
+    error = None
+    while pending:
+        done, pending = wait(pending, timeout=max(0.0, deadline - time.monotonic()), return_when=FIRST_COMPLETED)
+        if not done:
+            break
+        for future in done:
+            if future.exception() is None:
+                for loser in pending:
+                    loser.add_done_callback(discard)
+                return future.result()
+            error = future.exception()
+    if error is not None and not pending:
+        raise error
+    for loser in pending:
+        loser.add_done_callback(discard)
+    raise DeadlineExceeded("LLM call exceeded its deadline")
+
+
+def record_outcome(route, started, response=None, error=None, latency=None):
+    """Breaker, latency and metrics bookkeeping for one guarded call"""
+    elapsed = time.monotonic() - started
+    record_span('llm_call', elapsed, route=route)
+    if error is not None:
+        if counts_as_failure(error):
+            breaker.record_failure()
+        if isinstance(error, QuotaTimeout):
+            outcome = 'quota_timeout'
+        elif isinstance(error, TimeoutError):
+            outcome = 'timeout'
+        else:
+            outcome = 'error' if isinstance(error, Exception) else 'cancelled'
+        LLM_CALLS.inc(route=route, outcome=outcome)
+        return
+    breaker.record_success()
+    latencies.record(route, elapsed if latency is None else latency)
+    LLM_CALLS.inc(route=route, outcome='ok')
+    observe_tokens(route, getattr(response, 'usage', None))
+
+
+def open_circuit(route):
+    try:
+        return breaker.before_call()
+    except CircuitOpenError:
+        LLM_CALLS.inc(route=route, outcome='circuit_open')
+        raise
+
+
+def outcome_recorder(route, started, trial):
+    """finish(error=None, response=None): record how a call that has been sent ended
+
+    The latency tracked for hedging is the time until the response object arrived.
+    """
+    opened = time.monotonic() - started
+
+    def finish(error=None, response=None):
+        try:
+            record_outcome(route, started, response, error=None if error is None else as_timeout(error), latency=opened)
+        finally:
+            if trial:
+                breaker.release_trial()
+    return finish
+
+
+def failed_to_open(route, started, trial, error):
+    """Record a call that raised before returning; the error to raise (SDK timeouts become DeadlineExceeded)"""
+    if trial:
+        breaker.release_trial()
+    converted = as_timeout(error)
+    record_outcome(route, started, error=converted)
+    return converted
+
+
+def guarded_stream(route, fn, priority=INTERACTIVE, **kwargs):
+    """Like guarded_call, but returns (response, finish) and leaves the outcome open
+
+    For streamed responses: call finish(error) once the stream has ended, with the
+    exception that ended it or None. A stream that stalls into DeadlineExceeded then
+    counts against the breaker like any other timeout.
+    """
+    policy = route_policy(route)
+    trial = open_circuit(route)
+    started = time.monotonic()
+    deadline = started + policy.deadline
+    delay = hedge_delay(route, policy)
+    try:
+        if delay:
+            response = hedged_call(fn, priority, deadline, delay, kwargs)
+        else:
+            response = scheduler.call(fn, priority, deadline, **kwargs)
+    except BaseException as e:
+        error = failed_to_open(route, started, trial, e)
+        if error is e:
+            raise
+        raise error from e
+    return response, outcome_recorder(route, started, trial)
+
+
+def guarded_call(route, fn, priority=INTERACTIVE, **kwargs):
+    """fn(**kwargs) through the scheduler under the route's deadline, hedging and the circuit breaker"""
+    response, finish = guarded_stream(route, fn, priority, **kwargs)
+    finish(response=response)
+    return response
+
+
+async def ahedged_call(fn, priority, deadline, delay, kwargs):
+    primary = asyncio.ensure_future(scheduler.acall(fn, priority, deadline, **kwargs))
+    done, _ = await asyncio.wait({primary}, timeout=max(0.0, min(delay, deadline - time.monotonic())))
+    if done:
+        return primary.result()
+    pending = {primary, asyncio.ensure_future(scheduler.acall(fn, priority, deadline, **dict(kwargs)))}
+    error = None
+    while pending:
+        done, pending = await asyncio.wait(
+            pending, timeout=max(0.0, deadline - time.monotonic()), return_when=asyncio.FIRST_COMPLETED
+        )
+        if not done:
+            break
+        for task in done:
+            if task.exception() is None:
+                for loser in pending:
+                    loser.cancel()
+                return task.result()
+            error = task.exception()
+    for loser in pending:
+        loser.cancel()
+    if error is not None and not pending:
+        raise error
+    raise DeadlineExceeded("LLM call exceeded its deadline")
+
+
+async def aguarded_stream(route, fn, priority=INTERACTIVE, **kwargs):
+    """Async variant of guarded_stream"""
+    policy = route_policy(route)
+    trial = open_circuit(route)
+    started = time.monotonic()
+    deadline = started + policy.deadline
+    delay = hedge_delay(route, policy)
+    try:
+        if delay:
+            response = await ahedged_call(fn, priority, deadline, delay, kwargs)
+        else:
+            response = await scheduler.acall(fn, priority, deadline, **kwargs)
+    except BaseException as e:
+        error = failed_to_open(route, started, trial, e)
+        if error is e:
+            raise
+        raise error from e
+    return response, outcome_recorder(route, started, trial)
+
+
+async def aguarded_call(route, fn, priority=INTERACTIVE, **kwargs):
+    """Async variant of guarded_call; the losing hedge is cancelled"""
+    response, finish = await aguarded_stream(route, fn, priority, **kwargs)
+    finish(response=response)
+    return response
+
+
+def stats():
+    return {
+        'breaker': breaker.state,
+        'consecutive_failures': breaker.failures,
+        'p95_seconds': latencies.snapshot(0.95),
+    }
@@ -0,0 +1,210 @@
+"""Section-aware retrieval over resumes and cover letters.
+
+read_pdf output is split into sections (summary, experience, projects, skills,
+education, ...) and experience/project sections further into one entry per
+role. Each chat turn then ranks those pieces with BM25 against the latest
+message and the job description's keywords and keeps the best ones that fit in
+RESUME_CONTEXT_TOKENS, so long CVs no longer ride along in full on every turn.
+"""
+import math
+import os
+import re
+from collections import Counter
+from functools import lru_cache
+from typing import List, NamedTuple, Tuple
+
+from ats_engine import STOPWORDS, tokenize
+from tokens import estimate_tokens
+
+K1 = 1.2
+B = 0.75
+MESSAGE_WEIGHT = 2.0
+
+SECTION_HEADINGS = [
+    ('summary', r"summary|profile|objective|about me|overview|personal statement"),
+    ('experience', r"experience|employment|work history|career history|employment history|professional background|internships?"),
+    ('projects', r"projects?|portfolio"),
+    ('skills', r"skills|technologies|tech stack|competencies|tools|expertise"),
+    ('education', r"education|academics?|academic background|degrees?|qualifications"),
+    ('certifications', r"certifications?|licen[cs]es?|courses|training"),
+    ('achievements', r"awards?|achievements|honou?rs|publications|patents"),
+    ('other', r"languages|interests|hobbies|volunteer\w*|activities|references"),
+]
+# "Work", "Professional", ... in front of a heading word: "Professional Experience", "Key Skills"
+HEADING_QUALIFIERS = r"(?:(?:work|professional|relevant|technical|key|core|selected|personal|academic|additional|other|career|recent)\s+)*"
+# The whole line must be heading words, optionally joined: "Skills & Tools", "Summary of Qualifications".
+# Only the first heading word is a named group, so match.lastgroup is the section kind.
+HEADING_RE = re.compile(
+    HEADING_QUALIFIERS
+    + "(?:" + "|".join(f"(?P<{kind}>{terms})" for kind, terms in SECTION_HEADINGS) + ")"
+    + r"(?:(?:\s*[&/+]\s*|\s+(?:and|of)\s+|\s+)" + HEADING_QUALIFIERS
+    + "(?:" + "|".join(terms for _, terms in SECTION_HEADINGS) + "))*",
+    re.IGNORECASE
+)
+# "Jan 2020 - Present", "2018 – 2021", "03/2019 to 06/2022"
+DATE_RANGE_RE = re.compile(
+    r"(\b[A-Za-z]{3,9}\.?\s+)?\b(19|20)\d{2}\b\s*(-|–|—|to)\s*"
+    r"((\b[A-Za-z]{3,9}\.?\s+)?\b(19|20)\d{2}\b|present|current|now)",
+    re.IGNORECASE
+)
+# Sections split into one entry per role or project
+ENTRY_KINDS = ('experience', 'projects')
+
+
+class Section(NamedTuple):
+    kind: str
+    heading: str
+    text: str
+
+
+def heading_kind(line: str):
+    """The section kind if the whole line is a section heading, else None
+
+    "Professional Experience" and "SKILLS:" are headings; job titles that merely contain a
+    heading word ("Project Manager", "Customer Experience Lead") and labelled lists
+    ("Languages: Python, Go") are not.
+    """
+    words = line.rstrip(':').split()
+    if not words or len(words) > 6:
+        return None
+    match = HEADING_RE.fullmatch(" ".join(words))
+    return match.lastgroup if match else None
+
+
+def split_entries(lines: List[str]) -> List[List[str]]:
+    """Start a new entry at each date range, taking the title line just above it along"""
+    entries = [[]]
+    for line in lines:
+        current = entries[-1]
+        if DATE_RANGE_RE.search(line) and len(current) > 1:
+            # A short line right above the dates is usually the job title or company
+            carried = [current.pop()] if len(current[-1].split()) <= 8 and not current[-1].endswith('.') else []
+            entries.append(carried)
+        entries[-1].append(line)
+    return [entry for entry in entries if entry]
+
+
+@lru_cache(maxsize=256)
+def segment_resume(resume_text: str) -> Tuple[Section, ...]:
+    """Split resume text into headed sections; everything above the first heading is the header"""
+    blocks = [('header', 'Header', [])]
+    for line in resume_text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        kind = heading_kind(line)
+        if kind:
+            blocks.append((kind, line.rstrip(':'), []))
+        else:
+            blocks[-1][2].append(line)
+
+    sections = []
+    for kind, heading, lines in blocks:
+        if not lines:
+            continue
+        if kind in ENTRY_KINDS:
+            sections.extend(Section(kind, heading, "\n".join(entry)) for entry in split_entries(lines))
+        else:
+            sections.append(Section(kind, heading, "\n".join(lines)))
+    return tuple(sections)
+
+
+@lru_cache(maxsize=256)
+def segment_cover_letter(cover_letter: str) -> Tuple[Section, ...]:
+    """Split a cover letter into chunks of a few lines each"""
+    lines = [line.strip() for line in cover_letter.splitlines() if line.strip()]
+    return tuple(
+        Section('cover_letter', 'Cover Letter', "\n".join(lines[i:i + 6]))
+        for i in range(0, len(lines), 6)
+    )
+
+
+def section_terms(section: Section) -> Counter:
+    return Counter(token for token in tokenize(section.text) if token not in STOPWORDS and len(token) > 1)
+
+
+def query_weights(message: str, job_keywords) -> dict:
+    """Message words count double; JD keywords keep their extracted weight"""
+    weights = {}
+    for phrase, weight in job_keywords or []:
+        for token in phrase.split():
+            weights[token] = max(weights.get(token, 0.0), weight)
+    top = max(weights.values(), default=1.0)
+    for token in tokenize(message or ""):
+        if token not in STOPWORDS and len(token) > 1:
+            weights[token] = weights.get(token, 0.0) + MESSAGE_WEIGHT * top
+    return weights
+
+
+def rank_sections(sections, message: str, job_keywords) -> List[float]:
+    """BM25 score of every section against the message and job keywords"""
+    terms = [section_terms(section) for section in sections]
+    lengths = [sum(counts.values()) for counts in terms]
+    avg_length = (sum(lengths) / len(lengths) if lengths else 0) or 1.0
+    n_docs = len(sections)
+    scores = [0.0] * n_docs
+    for token, weight in query_weights(message, job_keywords).items():
+        df = sum(1 for counts in terms if token in counts)
+        if not df:
+            continue
+        idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+        for i, counts in enumerate(terms):
+            tf = counts.get(token)
+            if tf:
+                scores[i] += weight * idf * tf * (K1 + 1) / (tf + K1 * (1 - B + B * lengths[i] / avg_length))
+    return scores
+
+
+def format_sections(sections) -> str:
+    parts = []
+    heading = None
+    for section in sections:
+        if section.heading != heading and section.kind != 'header':
+            parts.append(f"{section.heading}:")
+        heading = section.heading
+        parts.append(section.text)
+    return "\n".join(parts)
+
+
+def relevant_context(resume_text: str, cover_letter: str, message: str, job_keywords, budget: int = None,
+                     covered_kinds: Tuple[str, ...] = ()):
+    """(resume, cover_letter) cut down to the sections most relevant to this turn
+
+    Documents that already fit in the budget are returned unchanged, which keeps the
+    system prompt identical from turn to turn. The header (name, contact, headline) is
+    always kept; omitted section headings are listed so the model knows they exist.
+    Sections of covered_kinds (already summarized elsewhere in the prompt) are dropped.
+    """
+    budget = budget or int(os.getenv("RESUME_CONTEXT_TOKENS", 1500))
+    cover_letter = cover_letter or ""
+    if estimate_tokens(resume_text) + estimate_tokens(cover_letter) <= budget:
+        return resume_text, cover_letter
+
+    sections = tuple(
+        section for section in segment_resume(resume_text) + segment_cover_letter(cover_letter)
+        if section.kind not in covered_kinds
+    )
+    scores = rank_sections(sections, message, job_keywords)
+    costs = [estimate_tokens(section.text) + 4 for section in sections]
+
+    selected = set()
+    remaining = budget
+    for i, section in enumerate(sections):
+        if section.kind == 'header' and costs[i] <= remaining:
+            selected.add(i)
+            remaining -= costs[i]
+    for i in sorted(range(len(sections)), key=lambda i: -scores[i]):
+        if i not in selected and costs[i] <= remaining:
+            selected.add(i)
+            remaining -= costs[i]
+
+    kept = [section for i, section in enumerate(sections) if i in selected]
+    resume_slice = format_sections([section for section in kept if section.kind != 'cover_letter'])
+    omitted = []
+    for i, section in enumerate(sections):
+        if i not in selected and section.kind != 'cover_letter' and section.heading not in omitted:
+            omitted.append(section.heading)
+    if omitted:
+        resume_slice += f"\n(Not shown this turn: {', '.join(omitted)})"
+    cover_slice = "\n".join(section.text for section in kept if section.kind == 'cover_letter')
+    return resume_slice, cover_slice
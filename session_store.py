@@ -0,0 +1,71 @@
+import json
+import os
+import zlib
+
+from cache import MemoryCache, create_cache
+from metrics import span
+
+
+def new_session_state():
+    """Default state for a fresh interview session"""
+    return {
+        'current_mode': "job_seeker",
+        'candidate_name': "Candidate",
+        'candidate_profile': None,
+        'resume_text': "",
+        'cover_letter_text': "",
+        'job_description': "",
+        'job_id': None,
+        'chat_history': [],
+    }
+
+
+class SessionStore:
+    """Server-side session storage; the browser cookie only carries the session id.
+
+    State is serialized to JSON and zlib-compressed before it reaches the backend,
+    so resumes, cover letters and long chat histories stay small in memory or on disk.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    @staticmethod
+    def encode(state: dict) -> bytes:
+        return zlib.compress(json.dumps(state, separators=(',', ':')).encode('utf-8'), 6)
+
+    @staticmethod
+    def decode(data: bytes) -> dict:
+        return json.loads(zlib.decompress(data).decode('utf-8'))
+
+    def load(self, sid: str) -> dict:
+        with span('session_load'):
+            state = new_session_state()
+            data = self.backend.get(sid)
+            if data is not None:
+                state.update(self.decode(data))
+            return state
+
+    def save(self, sid: str, state: dict):
+        with span('session_save'):
+            self.backend.set(sid, self.encode(state))
+
+    def delete(self, sid: str):
+        self.backend.delete(sid)
+
+
+def create_session_store():
+    """Build the session store configured through environment variables
+
+    SESSION_BACKEND      sqlite (default) or memory
+    SESSION_PATH         SQLite file used by the sqlite backend
+    SESSION_TTL          seconds since last update before a session is evicted (default 24h)
+    SESSION_MAX_ENTRIES  maximum number of sessions kept
+
+    The SQLite file is shared by every worker process on the host. The memory backend is
+    private to one process, so it is refused when WEB_CONCURRENCY asks for several workers.
+    """
+    backend = create_cache('SESSION', max_entries=10000, ttl=24 * 3600, path='data/sessions.db', backend='sqlite')
+    if isinstance(backend, MemoryCache) and int(os.getenv('WEB_CONCURRENCY', 1)) > 1:
+        raise RuntimeError("SESSION_BACKEND=memory keeps sessions in one process; use sqlite with more than one worker")
+    return SessionStore(backend)
@@ -221,20 +221,20 @@ function sendMessage() {
     // Show loading
     showLoading();
 
-    // Send to backend
-    fetch('/api/chat', {
+    // Send to backend and render the reply as it streams in
+    fetch('/api/chat/stream', {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
         body: JSON.stringify({ message: message })
     })
-    .then(response => response.json())
-    .then(data => {
-        hideLoading();
-        if (data.response) {
-            addMessage(data.response);
-        } else {
-            addMessage(`❌ ${data.error || 'Unknown error occurred'}`);
+    .then(response => {
+        if (!response.ok || !response.body) {
+            return response.json().then(data => {
+                hideLoading();
+                addMessage(`❌ ${data.error || 'Unknown error occurred'}`);
+            });
         }
+        return readChatStream(response.body.getReader());
     })
     .catch(error => {
         hideLoading();
@@ -248,6 +248,55 @@ function sendMessage() {
     });
 }
 
+function createStreamingMessage() {
+    const messageDiv = document.createElement('div');
+    messageDiv.className = 'message message-ai';
+    messageDiv.innerHTML = '<strong>AI:</strong> ';
+    const textSpan = document.createElement('span');
+    messageDiv.appendChild(textSpan);
+    elements.chatMessages.appendChild(messageDiv);
+    return textSpan;
+}
+
+function readChatStream(reader) {
+    const decoder = new TextDecoder();
+    let buffer = '';
+    let textSpan = null;
+
+    function handleEvent(data) {
+        if (data.delta) {
+            if (!textSpan) {
+                hideLoading();
+                textSpan = createStreamingMessage();
+            }
+            textSpan.textContent += data.delta;
+            elements.chatMessages.scrollTop = elements.chatMessages.scrollHeight;
+        } else if (data.error) {
+            hideLoading();
+            addMessage(`❌ ${data.error}`);
+        }
+    }
+
+    function pump() {
+        return reader.read().then(({ done, value }) => {
+            if (done) {
+                hideLoading();
+                return;
+            }
+            buffer += decoder.decode(value, { stream: true });
+            const events = buffer.split('\n\n');
+            buffer = events.pop();
+            events.forEach(event => {
+                const line = event.split('\n').find(l => l.startsWith('data: '));
+                if (line) handleEvent(JSON.parse(line.slice(6)));
+            });
+            return pump();
+        });
+    }
+
+    return pump();
+}
+
 function performATSAnalysis() {
     elements.atsAnalysisBtn.disabled = true;
     elements.atsAnalysisBtn.innerHTML = '<i class="fas fa-spinner fa-spin"></i> Analyzing...';
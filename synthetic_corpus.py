@@ -0,0 +1,239 @@
+"""Synthetic resumes, cover letters and job descriptions for benchmarks and load tests.
+
+PDFs are written by a minimal PDF writer (Helvetica text only, no dependencies)
+in three layouts: a single column, a two-column layout with a sidebar, and a
+dense small-font layout. Page counts, section lengths and whether content
+streams are compressed vary per document, so the corpus covers a range of
+file sizes. Everything is derived from a seed, so a corpus can be rebuilt
+exactly:
+
+    python synthetic_corpus.py --output data/corpus --resumes 60 --seed 7
+"""
+import argparse
+import json
+import os
+import random
+import textwrap
+import zlib
+
+FIRST_NAMES = ['Ayesha', 'Daniel', 'Maria', 'Kenji', 'Fatima', 'Lucas', 'Priya', 'Omar', 'Chloe', 'Tomasz',
+               'Hira', 'Samuel', 'Elena', 'Bilal', 'Grace', 'Arjun']
+LAST_NAMES = ['Khan', 'Smith', 'Garcia', 'Tanaka', 'Ali', 'Silva', 'Sharma', 'Haddad', 'Martin', 'Nowak',
+              'Qureshi', 'Okafor', 'Rossi', 'Chen']
+SKILLS = ['Python', 'Flask', 'Django', 'FastAPI', 'PostgreSQL', 'MySQL', 'AWS', 'Azure', 'GCP', 'Docker',
+          'Kubernetes', 'React', 'TypeScript', 'Machine Learning', 'PyTorch', 'Pandas', 'Spark', 'Airflow',
+          'Terraform', 'CI/CD', 'REST APIs', 'GraphQL', 'Redis', 'Kafka', 'Go', 'Java', 'Linux', 'Git']
+TITLES = ['Software Engineer', 'Senior Software Engineer', 'Backend Developer', 'Data Engineer',
+          'Platform Engineer', 'ML Engineer', 'Full Stack Developer', 'Engineering Manager']
+EMPLOYERS = ['Acme Corp', 'Globex', 'Initech', 'Umbrella Labs', 'Stark Industries', 'Wayne Analytics',
+             'Contoso', 'Northwind Traders', 'Hooli', 'Vandelay Imports']
+VERBS = ['Built', 'Designed', 'Led', 'Migrated', 'Optimized', 'Automated', 'Scaled', 'Shipped', 'Refactored']
+OBJECTS = ['a billing service', 'the data platform', 'an internal search API', 'the CI pipeline',
+           'a recommendation engine', 'the onboarding flow', 'event-driven microservices', 'reporting dashboards']
+OUTCOMES = ['cutting latency by {n}%', 'serving {n}k daily users', 'saving {n} engineer-hours a month',
+            'reducing cloud spend by {n}%', 'raising test coverage to {n}%']
+DEGREES = ['BSc Computer Science', 'BS Software Engineering', 'MSc Data Science', 'BE Electrical Engineering']
+SCHOOLS = ['FAST NUCES', 'LUMS', 'NUST', 'University of Toronto', 'TU Munich', 'IIT Delhi']
+LAYOUTS = ('single', 'two_column', 'dense')
+
+PAGE_WIDTH = 612
+PAGE_HEIGHT = 842
+MARGIN = 50
+
+
+def pdf_escape(text: str) -> str:
+    text = text.encode('latin-1', 'replace').decode('latin-1')
+    return text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+
+def page_stream(placements, font_size) -> bytes:
+    """Content stream drawing (x, y, text) placements in Helvetica"""
+    ops = ["BT", f"/F1 {font_size} Tf"]
+    ops.extend(f"1 0 0 1 {x} {y} Tm ({pdf_escape(text)}) Tj" for x, y, text in placements)
+    ops.append("ET")
+    return "\n".join(ops).encode('latin-1')
+
+
+def build_pdf(pages, font_size=10, compress=False) -> bytes:
+    """A PDF with one page per list of (x, y, text) placements"""
+    fonts_id = 3
+    objects = {
+        1: b"<< /Type /Catalog /Pages 2 0 R >>",
+        fonts_id: b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+    }
+    kids = []
+    for i, placements in enumerate(pages):
+        page_id, content_id = 4 + 2 * i, 5 + 2 * i
+        stream = page_stream(placements, font_size)
+        if compress:
+            stream = zlib.compress(stream)
+            header = b"<< /Length %d /Filter /FlateDecode >>" % len(stream)
+        else:
+            header = b"<< /Length %d >>" % len(stream)
+        objects[content_id] = header + b"\nstream\n" + stream + b"\nendstream"
+        objects[page_id] = (
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] /Contents %d 0 R "
+            b"/Resources << /Font << /F1 %d 0 R >> >> >>" % (PAGE_WIDTH, PAGE_HEIGHT, content_id, fonts_id)
+        )
+        kids.append(b"%d 0 R" % page_id)
+    objects[2] = b"<< /Type /Pages /Kids [" + b" ".join(kids) + b"] /Count %d >>" % len(kids)
+
+    out = bytearray(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+    offsets = {}
+    for number in sorted(objects):
+        offsets[number] = len(out)
+        out += b"%d 0 obj\n" % number + objects[number] + b"\nendobj\n"
+    size = max(objects) + 1
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % size
+    out += b"".join(b"%010d 00000 n \n" % offsets[number] for number in range(1, size))
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (size, xref)
+    return bytes(out)
+
+
+def flow(lines, x, width_chars, font_size, top=PAGE_HEIGHT - MARGIN):
+    """Wrap lines into a column starting at x; returns a list of pages of placements"""
+    leading = font_size + 4
+    pages = [[]]
+    y = top
+    for line in lines:
+        for piece in textwrap.wrap(line, width_chars) or [""]:
+            if y < MARGIN:
+                pages.append([])
+                y = top
+            if piece:
+                pages[-1].append((x, y, piece))
+            y -= leading
+    return pages
+
+
+def layout_pages(main, sidebar, layout):
+    """Placements per page for the main text and (two_column only) a first-page sidebar"""
+    if layout == 'dense':
+        return flow(main + sidebar, MARGIN, 120, 7), 7
+    if layout == 'two_column':
+        pages = flow(main, 215, 70, 9)
+        pages[0] = flow(sidebar, MARGIN, 28, 9)[0] + pages[0]
+        return pages, 9
+    return flow(main + sidebar, MARGIN, 95, 10), 10
+
+
+def bullet(rng: random.Random) -> str:
+    return f"- {rng.choice(VERBS)} {rng.choice(OBJECTS)} with {rng.choice(SKILLS)}, " + \
+        rng.choice(OUTCOMES).format(n=rng.randint(10, 90)) + "."
+
+
+def resume_lines(rng: random.Random, name: str, roles: int, bullets: int):
+    """(main column, sidebar) lines of a resume"""
+    first = name.split()[0].lower()
+    skills = rng.sample(SKILLS, rng.randint(6, 14))
+    sidebar = [
+        f"{first}.{name.split()[-1].lower()}@example.com",
+        f"+92 3{rng.randint(0, 4)}{rng.randint(0, 9)} {rng.randint(1000000, 9999999)}",
+        f"linkedin.com/in/{first}{rng.randint(10, 99)}",
+        "", "Skills", ", ".join(skills),
+        "", "Education", f"{rng.choice(DEGREES)}, {rng.choice(SCHOOLS)}", f"{rng.randint(2008, 2020)}",
+    ]
+    main = [name, rng.choice(TITLES), "", "Summary",
+            f"{rng.choice(TITLES)} with {rng.randint(2, 15)} years of experience in {', '.join(skills[:3])}. "
+            + " ".join(bullet(rng)[2:] for _ in range(rng.randint(1, 3))),
+            "", "Experience"]
+    year = 2025
+    for _ in range(roles):
+        start = year - rng.randint(1, 4)
+        main += [f"{rng.choice(TITLES)} at {rng.choice(EMPLOYERS)}", f"Mar {start} - {'Present' if year == 2025 else f'Feb {year}'}"]
+        main += [bullet(rng) for _ in range(bullets)]
+        main.append("")
+        year = start
+    main += ["Projects"]
+    for _ in range(rng.randint(1, max(1, roles // 2))):
+        main += [f"{rng.choice(OBJECTS).split()[-1].title()} ({rng.choice(SKILLS)})", bullet(rng)]
+    return main, sidebar
+
+
+def resume_pdf(rng: random.Random, pages: int = None, layout: str = None, compress: bool = None):
+    """(pdf bytes, candidate name, layout) for a synthetic resume of roughly the given page count"""
+    pages = pages or rng.choice([1, 1, 2, 2, 3, 5])
+    layout = layout or rng.choice(LAYOUTS)
+    compress = rng.random() < 0.5 if compress is None else compress
+    name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+    main, sidebar = resume_lines(rng, name, roles=2 + 2 * pages, bullets=3 + pages)
+    placements, font_size = layout_pages(main, sidebar, layout)
+    return build_pdf(placements, font_size, compress), name, layout
+
+
+def cover_letter_pdf(rng: random.Random, name: str, compress: bool = None) -> bytes:
+    compress = rng.random() < 0.5 if compress is None else compress
+    paragraphs = ["Dear Hiring Manager,", ""]
+    for _ in range(rng.randint(3, 6)):
+        paragraphs += [" ".join(bullet(rng)[2:] for _ in range(rng.randint(2, 4))), ""]
+    paragraphs += ["Kind regards,", name]
+    placements, font_size = layout_pages(paragraphs, [], 'single')
+    return build_pdf(placements, font_size, compress)
+
+
+def job_description(rng: random.Random) -> str:
+    title = rng.choice(TITLES)
+    required = rng.sample(SKILLS, rng.randint(4, 8))
+    nice = [skill for skill in rng.sample(SKILLS, 6) if skill not in required][:3]
+    lines = [
+        f"{title}",
+        f"{rng.choice(EMPLOYERS)} is hiring a {title} to join a team of {rng.randint(4, 20)} engineers.",
+        "",
+        "Responsibilities:",
+    ] + [bullet(rng) for _ in range(rng.randint(3, 7))] + [
+        "",
+        "Requirements:",
+        f"- {rng.randint(2, 8)}+ years of professional experience",
+    ] + [f"- Strong experience with {skill}" for skill in required] + [
+        "",
+        "Nice to have: " + ", ".join(nice),
+    ]
+    return "\n".join(lines)
+
+
+def generate_corpus(output_dir, resumes=40, job_descriptions=5, cover_letter_rate=0.5, seed=0):
+    """Write resumes/, cover_letters/, jds/ and a manifest.json under output_dir; returns the manifest"""
+    rng = random.Random(seed)
+    for sub in ('resumes', 'cover_letters', 'jds'):
+        os.makedirs(os.path.join(output_dir, sub), exist_ok=True)
+    manifest = {'seed': seed, 'resumes': [], 'cover_letters': [], 'jds': []}
+    for i in range(resumes):
+        data, name, layout = resume_pdf(rng)
+        path = os.path.join('resumes', f"resume_{i:03d}.pdf")
+        with open(os.path.join(output_dir, path), 'wb') as f:
+            f.write(data)
+        manifest['resumes'].append({'file': path, 'name': name, 'layout': layout, 'bytes': len(data)})
+        if rng.random() < cover_letter_rate:
+            data = cover_letter_pdf(rng, name)
+            path = os.path.join('cover_letters', f"cover_letter_{i:03d}.pdf")
+            with open(os.path.join(output_dir, path), 'wb') as f:
+                f.write(data)
+            manifest['cover_letters'].append({'file': path, 'name': name, 'bytes': len(data)})
+    for i in range(job_descriptions):
+        path = os.path.join('jds', f"jd_{i:02d}.txt")
+        with open(os.path.join(output_dir, path), 'w', encoding='utf-8') as f:
+            f.write(job_description(rng))
+        manifest['jds'].append({'file': path})
+    with open(os.path.join(output_dir, 'manifest.json'), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a synthetic resume / cover letter / JD corpus")
+    parser.add_argument('--output', default='data/corpus')
+    parser.add_argument('--resumes', type=int, default=40)
+    parser.add_argument('--jds', type=int, default=5)
+    parser.add_argument('--cover-letter-rate', type=float, default=0.5)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    manifest = generate_corpus(args.output, args.resumes, args.jds, args.cover_letter_rate, args.seed)
+    total = sum(entry['bytes'] for entry in manifest['resumes'] + manifest['cover_letters'])
+    print(f"Wrote {len(manifest['resumes'])} resumes, {len(manifest['cover_letters'])} cover letters and "
+          f"{len(manifest['jds'])} job descriptions ({total // 1024} KiB of PDF) to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+import pytest
+
+from ats_engine import analyze, extract_keywords, is_heading, job_description_chunks
+
+JOB_DESCRIPTION = "\n".join([
+    "Senior Backend Engineer",
+    "About the role",
+    "You will build our payments platform.",
+    "Requirements:",
+    "- Python",
+    "- Kubernetes",
+    "- Terraform",
+    "Benefits",
+    "- Free lunch",
+    "- Gym membership",
+])
+
+
+def test_bullets_under_requirements_are_requirements():
+    chunks = dict(job_description_chunks(JOB_DESCRIPTION))
+    assert chunks['Python'] and chunks['Kubernetes'] and chunks['Terraform']
+    assert not chunks['Free lunch'] and not chunks['Gym membership']
+
+
+@pytest.mark.parametrize('line, heading', [
+    ('Requirements:', True),
+    ('What you will do', True),
+    ('Benefits', True),
+    ('Python', False),
+    ('Free lunch', False),
+    ('You will build our payments platform.', False),
+])
+def test_is_heading(line, heading):
+    assert is_heading(line) is heading
+
+
+def test_required_skills_outweigh_benefits():
+    weights = dict(extract_keywords(JOB_DESCRIPTION))
+    assert weights['python'] > weights['lunch']
+    assert weights['terraform'] > weights['gym']
+
+
+def test_resume_with_the_required_skills_scores_higher():
+    skilled = analyze("Backend engineer: Python, Kubernetes and Terraform on AWS", JOB_DESCRIPTION)
+    unskilled = analyze("Office manager who organised free lunch and gym membership", JOB_DESCRIPTION)
+    assert skilled['ats_score'] > unskilled['ats_score']
+    assert 'python' in skilled['keyword_matches']
+    assert 'python' in unskilled['missing_keywords']
@@ -0,0 +1,34 @@
+import pytest
+
+pytest.importorskip('dotenv')
+pytest.importorskip('pydantic')
+pytest.importorskip('openai')
+
+import batch_screen  # noqa: E402
+from recruiter_core import drop_singleton  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def fresh_singletons(monkeypatch):
+    monkeypatch.setattr('recruiter_core._singletons', {})
+
+
+def test_batches_share_one_parse_pool_until_it_is_dropped():
+    pool = batch_screen.get_parse_pool()
+    assert batch_screen.get_parse_pool() is pool
+    # What screen_candidates does when a worker dies and the pool is broken
+    drop_singleton('batch_parse_pool', pool)
+    replacement = batch_screen.get_parse_pool()
+    assert replacement is not pool
+    pool.shutdown()
+    replacement.shutdown()
+
+
+def test_batch_slots_cap_concurrent_batches(monkeypatch):
+    monkeypatch.setenv('MAX_CONCURRENT_BATCHES', '2')
+    slots = batch_screen.batch_slots()
+    assert slots.acquire(blocking=False)
+    assert slots.acquire(blocking=False)
+    assert not slots.acquire(blocking=False)
+    slots.release()
+    assert batch_screen.batch_slots().acquire(blocking=False)
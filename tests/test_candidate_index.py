@@ -0,0 +1,164 @@
+import math
+import random
+import sqlite3
+
+import pytest
+
+from candidate_index import B, K1, CandidateIndex, IndexLocked, benchmark, index_terms, query_terms, synthetic_resumes
+from synthetic_corpus import job_description
+
+JAVA_RESUME = "Backend engineer: Java, Spring Boot, Kubernetes, Docker, microservices on AWS"
+PYTHON_RESUME = "Data engineer: Python, Spark, Airflow, Kubernetes, Java"
+ACCOUNTANT_RESUME = "Accountant: excel bookkeeping payroll reconciliation audits"
+JOB_DESCRIPTION = "Senior Java developer with Spring Boot and Kubernetes experience"
+
+
+def ranked_ids(index):
+    return [result['candidate_id'] for result in index.search(JOB_DESCRIPTION)]
+
+
+def test_delete_then_add_does_not_inherit_deleted_postings(tmp_path):
+    index = CandidateIndex(str(tmp_path))
+    index.add('a', PYTHON_RESUME)
+    index.add('b', JAVA_RESUME)
+    index.save()
+    index.delete('b')
+    index.add('c', ACCOUNTANT_RESUME)
+
+    assert 'c' not in ranked_ids(index)
+    index.save()
+    assert 'c' not in ranked_ids(index)
+    index.close()
+
+
+def test_readding_a_candidate_replaces_its_terms(tmp_path):
+    index = CandidateIndex(str(tmp_path))
+    index.add('a', PYTHON_RESUME)
+    index.add('b', JAVA_RESUME)
+    index.save()
+    before = index.search(JOB_DESCRIPTION)
+    index.add('b', JAVA_RESUME)
+    assert index.search(JOB_DESCRIPTION) == before
+    index.close()
+
+
+def test_existing_index_is_migrated_to_autoincrement(tmp_path):
+    db = sqlite3.connect(str(tmp_path / 'documents.db'))
+    db.execute(
+        'CREATE TABLE documents (doc_id INTEGER PRIMARY KEY, candidate_id TEXT UNIQUE, name TEXT, '
+        'length INTEGER, text BLOB, indexed INTEGER DEFAULT 0)'
+    )
+    db.commit()
+    db.close()
+
+    index = CandidateIndex(str(tmp_path))
+    index.add('a', PYTHON_RESUME)
+    index.add('b', JAVA_RESUME)
+    index.save()
+    index.delete('b')
+    index.add('c', ACCOUNTANT_RESUME)
+    assert 'c' not in ranked_ids(index)
+    index.close()
+
+
+def test_second_writer_is_refused_until_close(tmp_path):
+    index = CandidateIndex(str(tmp_path))
+    with pytest.raises(IndexLocked):
+        CandidateIndex(str(tmp_path))
+    index.close()
+    CandidateIndex(str(tmp_path)).close()
+
+
+def exhaustive_bm25(documents, job_description):
+    """{candidate_id: score} straight from the BM25 formula, for checking the index"""
+    terms = {candidate_id: index_terms(text) for candidate_id, text in documents.items()}
+    lengths = {candidate_id: sum(counts.values()) for candidate_id, counts in terms.items()}
+    avg_length = sum(lengths.values()) / len(lengths)
+    scores = {}
+    for term, query_weight in query_terms(job_description).items():
+        df = sum(1 for counts in terms.values() if term in counts)
+        if not df:
+            continue
+        idf = math.log(1 + (len(terms) - df + 0.5) / (df + 0.5))
+        for candidate_id, counts in terms.items():
+            tf = counts.get(term)
+            if tf:
+                norm = K1 * (1 - B + B * lengths[candidate_id] / avg_length)
+                scores[candidate_id] = scores.get(candidate_id, 0.0) + query_weight * idf * tf * (K1 + 1) / (tf + norm)
+    return scores
+
+
+def assert_matches_exhaustive(index, documents, job_description, top_k=20):
+    expected = exhaustive_bm25(documents, job_description)
+    results = index.search(job_description, top_k)
+    assert len(results) == min(top_k, len(expected))
+    cutoff = sorted(expected.values(), reverse=True)[len(results) - 1]
+    for result in results:
+        assert result['score'] == pytest.approx(expected[result['candidate_id']], abs=1e-3)
+        assert expected[result['candidate_id']] >= cutoff - 1e-3
+
+
+def test_pruned_search_matches_exhaustive_bm25_across_saves_and_deletes(tmp_path):
+    rng = random.Random(1)
+    job_descriptions = [job_description(rng) for _ in range(3)]
+    index = CandidateIndex(str(tmp_path), autosave_every=120)
+    documents = {}
+    for i, (name, text) in enumerate(synthetic_resumes(400, seed=1)):
+        index.add(str(i), text, name)
+        documents[str(i)] = text
+        if i % 7 == 0 and i:
+            deleted = str(rng.randrange(i))
+            index.delete(deleted)
+            documents.pop(deleted, None)
+    # Tombstones and delta documents are pending here, then merged
+    for job in job_descriptions:
+        assert_matches_exhaustive(index, documents, job)
+    index.save()
+    for job in job_descriptions:
+        assert_matches_exhaustive(index, documents, job)
+    index.close()
+
+
+def test_save_interrupted_after_the_lexicon_swap_does_not_double_count(tmp_path):
+    index = CandidateIndex(str(tmp_path))
+    for candidate_id, text in (('a', PYTHON_RESUME), ('b', JAVA_RESUME), ('c', ACCOUNTANT_RESUME)):
+        index.add(candidate_id, text)
+    index.save()
+    before = index.search(JOB_DESCRIPTION)
+    index.close()
+    # The process died before the documents were stamped as merged
+    db = sqlite3.connect(str(tmp_path / 'documents.db'))
+    db.execute('UPDATE documents SET indexed = 0')
+    db.commit()
+    db.close()
+
+    index = CandidateIndex(str(tmp_path))
+    assert index.search(JOB_DESCRIPTION) == before
+    index.save()
+    assert index.search(JOB_DESCRIPTION) == before
+    index.close()
+
+
+def test_save_interrupted_before_the_lexicon_swap_is_discarded(tmp_path):
+    index = CandidateIndex(str(tmp_path))
+    index.add('a', PYTHON_RESUME)
+    index.add('b', JAVA_RESUME)
+    index.save()
+    index.add('c', ACCOUNTANT_RESUME)
+    before = index.search(JOB_DESCRIPTION)
+    index.close()
+    # A half-written postings file of the next generation
+    (tmp_path / 'postings.2.bin').write_bytes(b'\0' * 12)
+
+    index = CandidateIndex(str(tmp_path))
+    assert not (tmp_path / 'postings.2.bin').exists()
+    assert index.search(JOB_DESCRIPTION) == before
+    index.save()
+    assert index.search(JOB_DESCRIPTION) == before
+    index.close()
+
+
+def test_benchmark_runs_at_small_scale():
+    timings = benchmark(docs=300, queries=2, autosave_every=100)
+    assert timings['docs'] == 300
+    assert timings['search_s'] >= 0
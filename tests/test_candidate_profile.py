@@ -0,0 +1,49 @@
+from candidate_profile import extract_profile, format_profile
+
+
+def test_inline_skills_line_in_header():
+    resume = "\n".join([
+        "Jane Doe",
+        "jane@example.com",
+        "Technical Skills: Python, Java, AWS",
+        "Experience",
+        "Backend Engineer, Acme Corp, Jan 2020 - Present",
+        "Built the billing platform.",
+    ])
+    assert extract_profile(resume)['skills'] == ['Python', 'Java', 'AWS']
+
+
+def test_other_labelled_lines_are_not_skills():
+    resume = "\n".join([
+        "Jane Doe",
+        "Location: Berlin, Germany",
+        "Experience",
+        "Backend Engineer, Acme Corp, Jan 2020 - Present",
+    ])
+    assert extract_profile(resume)['skills'] == []
+
+
+def test_headline_is_kept_and_header_covered():
+    resume = "\n".join([
+        "Jane Doe",
+        "Senior Backend Engineer with 10 years of payments experience",
+        "jane@example.com | +1 555 123 4567 | linkedin.com/in/janedoe",
+        "Experience",
+        "Backend Engineer, Acme Corp, Jan 2020 - Present",
+    ])
+    profile = extract_profile(resume)
+    assert profile['headline'] == "Senior Backend Engineer with 10 years of payments experience"
+    assert 'header' in profile['covered_sections']
+    assert "Headline: Senior Backend Engineer" in format_profile(profile)
+
+
+def test_long_header_is_not_covered():
+    resume = "\n".join(["Jane Doe"] + ["Built and ran large payment systems for many different clients."] * 8 + ["Experience"])
+    assert 'header' not in extract_profile(resume)['covered_sections']
+
+
+def test_skills_section_is_covered_only_when_skills_were_captured():
+    with_skills = "\n".join(["Jane Doe", "Skills", "Python, Java, AWS"])
+    assert 'skills' in extract_profile(with_skills)['covered_sections']
+    unparsed = "\n".join(["Jane Doe", "Skills", ":"])
+    assert 'skills' not in extract_profile(unparsed)['covered_sections']
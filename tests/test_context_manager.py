@@ -0,0 +1,89 @@
+from types import SimpleNamespace
+
+import pytest
+
+from context_manager import ContextManager, claim_key
+
+
+class FakeClient:
+    def __init__(self, summary="Summary of the earlier turns."):
+        self.calls = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+        self.summary = summary
+
+    def create(self, **kwargs):
+        self.calls.append(kwargs)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=self.summary))])
+
+
+@pytest.fixture(autouse=True)
+def summary_db(tmp_path, monkeypatch):
+    monkeypatch.setenv('CONTEXT_SUMMARY_PATH', str(tmp_path / 'summaries.db'))
+
+
+def conversation(turns, words=5):
+    history = []
+    for i in range(turns):
+        history.append({"role": "user", "content": f"question {i} " + "word " * words})
+        history.append({"role": "assistant", "content": f"answer {i} " + "word " * words})
+    return history
+
+
+def wait_for_refresh(manager):
+    manager._executor.shutdown(wait=True)
+
+
+def test_short_conversation_is_sent_verbatim():
+    manager = ContextManager(FakeClient(), budget=1000, keep_turns=3)
+    history = conversation(2)
+    messages = manager.build_messages("system", history, "next", conversation_id="c1")
+    assert messages == [{"role": "system", "content": "system"}] + history + [{"role": "user", "content": "next"}]
+
+
+def test_older_turns_are_dropped_oldest_first_within_budget():
+    manager = ContextManager(FakeClient(), budget=150, keep_turns=1)
+    history = conversation(10, words=10)
+    messages = manager.build_messages("system", history, "next")
+    kept = messages[1:-1]
+    assert kept == history[-len(kept):]
+    assert len(kept) < len(history)
+    assert kept[-2:] == history[-2:]
+
+
+def test_window_never_starts_on_an_orphaned_assistant_reply():
+    # Room for the last exchange plus one older assistant reply, whose question does not fit
+    manager = ContextManager(FakeClient(), budget=75, keep_turns=1)
+    history = conversation(10, words=10)
+    messages = manager.build_messages("system", history, "next")
+    assert messages[1:-1] == history[-2:]
+
+
+def test_recent_turns_are_kept_even_over_budget():
+    manager = ContextManager(FakeClient(), budget=10, keep_turns=2)
+    history = conversation(4, words=20)
+    messages = manager.build_messages("system", history, "next")
+    assert messages[1:-1] == history[-4:]
+
+
+def test_older_turns_are_folded_into_a_summary():
+    client = FakeClient()
+    manager = ContextManager(client, budget=10000, keep_turns=1)
+    history = conversation(4)
+    manager.build_messages("system", history, "next", conversation_id="c1")
+    wait_for_refresh(manager)
+    assert len(client.calls) == 1
+
+    messages = manager.build_messages("system", history, "next", conversation_id="c1")
+    assert messages[1] == {"role": "system", "content": "## Summary of the earlier conversation:\nSummary of the earlier turns."}
+    assert messages[2:-1] == history[-2:]
+
+
+def test_refresh_claimed_by_another_worker_is_skipped():
+    client = FakeClient()
+    manager = ContextManager(client, budget=10000, keep_turns=1)
+    other_worker = ContextManager(FakeClient(), budget=10000, keep_turns=1)
+    assert other_worker.summaries.add(claim_key("c1"), b'1', ttl=60)
+
+    manager.build_messages("system", conversation(4), "next", conversation_id="c1")
+    wait_for_refresh(manager)
+    assert client.calls == []
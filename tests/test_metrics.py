@@ -0,0 +1,20 @@
+import metrics
+from metrics import begin_request, end_request, record_span, request_spans
+
+
+def request_count(endpoint):
+    return sum(count for key, (_, _, count) in metrics.REQUEST_SECONDS._series.items() if ('endpoint', endpoint) in key)
+
+
+def test_streamed_request_is_observed_with_the_spans_of_its_body():
+    started = begin_request()
+    record_span('load_session', 0.01)
+    spans = request_spans()
+    assert spans == [('load_session', 0.01)]
+
+    # The body runs after the headers (and their Server-Timing) are sent
+    record_span('llm_stream', 1.5)
+    assert request_count('/streamed') == 0
+    assert end_request(started, '/streamed', 'POST', 200, spans) == [('load_session', 0.01), ('llm_stream', 1.5)]
+    assert request_count('/streamed') == 1
+    assert request_spans() is None
@@ -0,0 +1,35 @@
+import pytest
+
+
+def test_streamed_chat_profile_finishes_when_the_response_closes(monkeypatch):
+    pytest.importorskip('flask')
+    import app as web
+    from cache import MemoryCache
+    from metrics import record_span
+    from session_store import SessionStore
+
+    finished = []
+    profile = object()
+
+    def stream_chat_completion(client, messages, usage):
+        yield "Hello"
+        assert not finished, "profile finished before the body was generated"
+        record_span('llm_stream', 0.5)
+        yield " there"
+
+    monkeypatch.setattr(web, 'start_profile', lambda: profile)
+    monkeypatch.setattr(web, 'finish_profile', lambda *args, **info: finished.append((args, info)))
+    monkeypatch.setattr(web, 'get_client', lambda: None)
+    monkeypatch.setattr(web, 'stream_chat_completion', stream_chat_completion)
+    monkeypatch.setattr(web, 'build_chat_messages', lambda state, message, sid: ([{'role': 'user', 'content': message}], None))
+    monkeypatch.setattr(web, 'get_session_store', lambda: SessionStore(MemoryCache()))
+
+    response = web.app.test_client().post('/api/chat/stream', json={'message': 'Hi'})
+    assert not finished
+    assert b'"done": true' in response.get_data()
+    response.close()
+
+    [(args, info)] = finished
+    assert args[:2] == (profile, 'POST /api/chat/stream')
+    assert ('llm_stream', 0.5) in args[3]
+    assert info == {'status': 200, 'streamed': True}
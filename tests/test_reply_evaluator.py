@@ -0,0 +1,72 @@
+from reply_evaluator import TieredEvaluator
+
+
+def make_evaluator():
+    return TieredEvaluator("Edward Donner", "Engineer and founder", judge=lambda *args: None, sample_rate=0)
+
+
+def test_partial_name_is_not_judged_until_the_word_is_complete():
+    evaluator = make_evaluator()
+    assert evaluator.early_rejection("Hi, my name is Edw") is None
+    assert evaluator.early_rejection("Hi, my name is Edward and") is None
+
+
+def test_wrong_name_and_ai_disclosure_are_rejected_mid_stream():
+    evaluator = make_evaluator()
+    assert "introduces itself as Bob" in evaluator.early_rejection("Hi, my name is Bob and")
+    assert "breaks character" in evaluator.early_rejection("As an AI language model, I")
+
+
+def test_complete_reply_with_wrong_name_is_rejected():
+    evaluator = make_evaluator()
+    accepted, feedback = evaluator.local_check("Hello there, my name is Bob", "Who are you?", [])
+    assert not accepted and "Bob" in feedback
+
+
+class CountingJudge:
+    def __init__(self, is_acceptable=True, feedback="Looks good."):
+        self.calls = 0
+        self.result = type('Evaluation', (), {'is_acceptable': is_acceptable, 'feedback': feedback})()
+
+    def __call__(self, reply, message, history):
+        self.calls += 1
+        return self.result
+
+
+GROUNDED_REPLY = "As an engineer and founder I build products with my team."
+
+
+def test_grounded_reply_is_settled_locally():
+    judge = CountingJudge()
+    evaluator = TieredEvaluator("Edward Donner", "Engineer and founder who builds products with a team", judge, sample_rate=0)
+    verdict = evaluator.evaluate(GROUNDED_REPLY, "What do you do?", [])
+    assert verdict.is_acceptable and verdict.tier == 'local'
+    assert judge.calls == 0
+
+
+def test_ungrounded_reply_goes_to_the_judge():
+    judge = CountingJudge(is_acceptable=False, feedback="Invented facts.")
+    evaluator = TieredEvaluator("Edward Donner", "Engineer and founder", judge, sample_rate=0)
+    verdict = evaluator.evaluate("I won three Olympic medals in synchronized swimming.", "Any hobbies?", [])
+    assert verdict.feedback == "Invented facts."
+    assert not verdict.is_acceptable and verdict.tier == 'judge'
+    assert judge.calls == 1
+
+
+def test_locally_accepted_replies_are_sampled_by_the_judge():
+    judge = CountingJudge()
+    evaluator = TieredEvaluator("Edward Donner", "Engineer and founder who builds products with a team", judge, sample_rate=1)
+    verdict = evaluator.evaluate(GROUNDED_REPLY, "What do you do?", [])
+    assert verdict.tier == 'judge'
+    assert judge.calls == 1
+
+
+def test_verdicts_are_cached_by_message_and_reply():
+    judge = CountingJudge(is_acceptable=False, feedback="Invented facts.")
+    evaluator = TieredEvaluator("Edward Donner", "Engineer and founder", judge, sample_rate=0)
+    reply = "I won three Olympic medals in synchronized swimming."
+    evaluator.evaluate(reply, "Any hobbies?", [])
+    verdict = evaluator.evaluate(reply, "Any hobbies?", [])
+    assert verdict.tier == 'cache' and not verdict.is_acceptable
+    assert judge.calls == 1
+    assert evaluator.stats()['judge_rate'] == 0.5
@@ -0,0 +1,79 @@
+import pytest
+
+import resilience
+from llm_scheduler import DeadlineExceeded, scheduler
+
+
+class APITimeoutError(Exception):
+    """Stands in for openai.APITimeoutError, which is not a TimeoutError"""
+
+
+@pytest.fixture(autouse=True)
+def fresh_breaker(monkeypatch):
+    monkeypatch.setattr(resilience, 'breaker', resilience.CircuitBreaker(failures=5, cooldown=30))
+    monkeypatch.setattr(scheduler, 'max_retries', 0)
+
+
+def test_sdk_timeout_is_raised_as_deadline_exceeded():
+    def create(**kwargs):
+        raise APITimeoutError("Request timed out.")
+
+    with pytest.raises(DeadlineExceeded) as excinfo:
+        resilience.guarded_call('chat', create, messages=[])
+    assert isinstance(excinfo.value.__cause__, APITimeoutError)
+    assert resilience.breaker.failures == 1
+
+
+def test_other_errors_pass_through():
+    def create(**kwargs):
+        raise ValueError("bad request")
+
+    with pytest.raises(ValueError):
+        resilience.guarded_call('chat', create, messages=[])
+
+
+def test_call_timeout_is_the_time_left_before_the_deadline(monkeypatch):
+    monkeypatch.setenv('LLM_DEADLINE_CHAT_STREAM', '7')
+    seen = {}
+
+    def create(**kwargs):
+        seen.update(kwargs)
+        return iter(())
+
+    resilience.guarded_call('chat_stream', create, messages=[], stream=True)
+    assert 0 < seen['timeout'] <= 7
+
+
+def test_stream_outcome_is_recorded_when_the_stream_ends():
+    resilience.breaker.failures = 2
+    stream, finish = resilience.guarded_stream('chat_stream', lambda **kwargs: iter(()), messages=[], stream=True)
+    assert resilience.breaker.failures == 2
+    finish(DeadlineExceeded("Streaming reply exceeded its deadline"))
+    assert resilience.breaker.failures == 3
+
+    stream, finish = resilience.guarded_stream('chat_stream', lambda **kwargs: iter(()), messages=[], stream=True)
+    finish()
+    assert resilience.breaker.failures == 0
+
+
+def test_chat_route_answers_504_on_sdk_timeout(monkeypatch):
+    pytest.importorskip('flask')
+    openai = pytest.importorskip('openai')
+    httpx = pytest.importorskip('httpx')
+    import app as web
+    from cache import MemoryCache
+    from session_store import SessionStore
+
+    class Completions:
+        def create(self, **kwargs):
+            raise openai.APITimeoutError(request=httpx.Request('POST', 'https://example.invalid'))
+
+    class Client:
+        chat = type('Chat', (), {'completions': Completions()})()
+
+    monkeypatch.setattr(web, 'get_client', lambda: Client())
+    monkeypatch.setattr(web, 'build_chat_messages', lambda state, message, sid: ([{'role': 'user', 'content': message}], None))
+    monkeypatch.setattr(web, 'get_session_store', lambda: SessionStore(MemoryCache()))
+
+    response = web.app.test_client().post('/api/chat', json={'message': 'Hello'})
+    assert response.status_code == 504
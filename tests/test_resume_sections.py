@@ -0,0 +1,46 @@
+import pytest
+
+from resume_sections import heading_kind, segment_resume
+
+
+@pytest.mark.parametrize('line, kind', [
+    ('Experience', 'experience'),
+    ('Professional Experience', 'experience'),
+    ('WORK EXPERIENCE', 'experience'),
+    ('Work History:', 'experience'),
+    ('Key Skills', 'skills'),
+    ('Skills & Tools', 'skills'),
+    ('Summary of Qualifications', 'summary'),
+    ('Education and Training', 'education'),
+    ('Academic Projects', 'projects'),
+    ('Awards / Honors', 'achievements'),
+])
+def test_section_headings(line, kind):
+    assert heading_kind(line) == kind
+
+
+@pytest.mark.parametrize('line', [
+    'Project Manager',
+    'Training Coordinator',
+    'Education Consultant',
+    'Customer Experience Lead',
+    'Languages: Python, Go',
+    'Built internal tools for the finance team',
+])
+def test_job_titles_and_labelled_lists_are_not_headings(line):
+    assert heading_kind(line) is None
+
+
+def test_job_title_stays_in_its_experience_entry():
+    resume = "\n".join([
+        "Jane Doe",
+        "Experience",
+        "Project Manager",
+        "Acme Corp, Jan 2020 - Present",
+        "Led delivery of the billing platform.",
+        "Education",
+        "BSc Computer Science, 2015 - 2019",
+    ])
+    sections = segment_resume(resume)
+    assert [section.kind for section in sections] == ['header', 'experience', 'education']
+    assert sections[1].text.startswith("Project Manager")
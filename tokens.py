@@ -0,0 +1,29 @@
+import math
+import re
+
+# Words, numbers and individual punctuation marks, roughly how BPE tokenizers split text
+PIECE_RE = re.compile(r"[A-Za-z]+|\d+|[^\sA-Za-z\d]")
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap local estimate of the LLM token count of a string
+
+    Long words are split into ~4-character pieces and digit runs into groups of 3.
+    It errs slightly high, which is the safe side for budgeting prompts.
+    """
+    if not text:
+        return 0
+    count = 0
+    for piece in PIECE_RE.findall(text):
+        if piece[0].isdigit():
+            count += math.ceil(len(piece) / 3)
+        elif piece[0].isalpha():
+            count += 1 if len(piece) <= 6 else math.ceil(len(piece) / 4)
+        else:
+            count += 1
+    return count
+
+
+def estimate_message_tokens(messages) -> int:
+    """Token estimate for a chat completion request, including per-message overhead"""
+    return sum(4 + estimate_tokens(message.get("content") or "") for message in messages) + 3